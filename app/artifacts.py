@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .storage import Database
+
+
+@dataclass
+class Artifact:
+    digest: str
+    path: Path
+    filename: str
+    size: int
+
+
+class ArtifactStore:
+    # Recently served artifacts are never evicted, so a response that has just looked one up
+    # can still open it.
+    EVICT_GRACE_SECONDS = 60.0
+    TOUCH_INTERVAL_SECONDS = 10.0
+
+    def __init__(self, root: Path, db: Database, max_bytes: int) -> None:
+        self.root = root
+        self.db = db
+        self.max_bytes = max(0, max_bytes)
+        self._staging = self.root / "staging"
+        self._staging.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return self.db.connect()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS session_artifacts (
+                    session_id TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    updated_at INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_artifacts_digest ON session_artifacts (digest)")
+            # Sizes live in the shared database so every worker process enforces one quota.
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_last_used ON artifacts (last_used)")
+            known = {row[0] for row in conn.execute("SELECT digest FROM artifacts")}
+            for path in self.root.glob("*.pdf"):
+                if path.stem in known:
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                conn.execute(
+                    "INSERT OR IGNORE INTO artifacts (digest, size, last_used) VALUES (?, ?, ?)",
+                    (path.stem, stat.st_size, stat.st_mtime),
+                )
+
+    def _path_for(self, digest: str) -> Path:
+        return self.root / f"{digest}.pdf"
+
+    def staging_path(self) -> Path:
+        fd, name = tempfile.mkstemp(dir=self._staging, suffix=".pdf")
+        os.close(fd)
+        return Path(name)
+
+    def commit(self, staged: Path) -> str:
+        digest = hashlib.sha256()
+        with staged.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(chunk)
+        key = digest.hexdigest()
+        target = self._path_for(key)
+        if staged.stat().st_nlink > 1:
+            # A hard link into the compile cache would make the bytes count against both
+            # quotas, and evicting it here would free nothing; keep a private copy instead.
+            private = self.staging_path()
+            shutil.copyfile(staged, private)
+            staged.unlink(missing_ok=True)
+            staged = private
+        now = time.time()
+        conn = self._connect()
+        # The quota check and eviction share one write transaction across processes.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if target.exists():
+                staged.unlink(missing_ok=True)
+            else:
+                os.replace(staged, target)
+            conn.execute(
+                """
+                INSERT INTO artifacts (digest, size, last_used) VALUES (?, ?, ?)
+                ON CONFLICT(digest) DO UPDATE SET size = excluded.size, last_used = excluded.last_used
+                """,
+                (key, target.stat().st_size, now),
+            )
+            self._evict_locked(conn, keep=key, now=now)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            staged.unlink(missing_ok=True)
+            raise
+        return key
+
+    def assign(self, session_id: str, digest: str, filename: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO session_artifacts (session_id, digest, filename, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    digest = excluded.digest,
+                    filename = excluded.filename,
+                    updated_at = excluded.updated_at
+                """,
+                (session_id, digest, filename, int(time.time())),
+            )
+
+    def latest(self, session_id: str) -> Optional[Artifact]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT digest, filename FROM session_artifacts WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        if not row:
+            return None
+        digest, filename = row
+        return self.get(digest, filename)
+
+    def get(self, digest: str, filename: str) -> Optional[Artifact]:
+        path = self._path_for(digest)
+        now = time.time()
+        with self._connect() as conn:
+            # Serving counts as use for LRU eviction; refresh at most every few seconds so
+            # status polling does not turn into a stream of writes.
+            row = conn.execute("SELECT last_used FROM artifacts WHERE digest = ?", (digest,)).fetchone()
+            if row and row[0] < now - self.TOUCH_INTERVAL_SECONDS:
+                conn.execute("UPDATE artifacts SET last_used = ? WHERE digest = ?", (now, digest))
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+        return Artifact(digest=digest, path=path, filename=filename, size=size)
+
+    def _evict_locked(self, conn: sqlite3.Connection, keep: str, now: float) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT digest, size FROM artifacts WHERE digest != ? AND last_used < ? ORDER BY last_used",
+            (keep, now - self.EVICT_GRACE_SECONDS),
+        ).fetchall()
+        evicted: list[str] = []
+        for digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._path_for(digest).unlink(missing_ok=True)
+            total -= size
+            evicted.append(digest)
+        if evicted:
+            conn.executemany("DELETE FROM artifacts WHERE digest = ?", [(d,) for d in evicted])
+            conn.executemany("DELETE FROM session_artifacts WHERE digest = ?", [(d,) for d in evicted])
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        return {"artifacts": count, "bytes": total, "max_bytes": self.max_bytes}
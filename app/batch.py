@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import re
+
+from .job_store import TERMINAL_STATUSES
+
+
+def parse_provider_limits(raw: str) -> dict[str, int]:
+    # "openai=4,gemini=2"
+    limits: dict[str, int] = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        if name and value.strip().isdigit():
+            limits[name] = max(1, int(value.strip()))
+    return limits
+
+
+def batch_slug(label: str, index: int) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-").lower()[:40]
+    return f"{index + 1:02d}-{slug or 'job'}"
+
+
+def batch_lane(provider: str) -> str:
+    return f"batch:{provider}"
+
+
+def summarize_batch(batch: dict, items: list[dict | None]) -> dict:
+    rows = []
+    for idx, (ref, job) in enumerate(zip(batch["items"], items)):
+        job = job or {"status": "failed", "stage": "Missing", "progress": 0, "error": "Job record expired."}
+        rows.append(
+            {
+                "index": idx,
+                "job_id": ref["job_id"],
+                "label": ref["label"],
+                "status": job.get("status"),
+                "stage": job.get("stage"),
+                "progress": job.get("progress") or 0,
+                "error": job.get("error"),
+                "has_latex": bool(job.get("latex")),
+                "has_pdf": bool(job.get("pdf_digest")),
+                "pdf_error": job.get("pdf_error"),
+                "duration_ms": job.get("duration_ms"),
+            }
+        )
+    total = len(rows)
+    completed = sum(1 for row in rows if row["status"] == "completed")
+    failed = sum(1 for row in rows if row["status"] in TERMINAL_STATUSES and row["status"] != "completed")
+    running = sum(1 for row in rows if row["status"] == "running")
+    if completed + failed == total:
+        status = "completed" if failed == 0 else ("failed" if completed == 0 else "partial")
+    else:
+        status = "running" if running or completed or failed else "queued"
+    return {
+        "id": batch["id"],
+        "status": status,
+        "provider": batch["provider"],
+        "include_pdf": batch["include_pdf"],
+        "total": total,
+        "completed": completed,
+        "failed": failed,
+        "running": running,
+        "progress": int(sum(row["progress"] for row in rows) / max(1, total)),
+        "items": rows,
+    }
+
+
+class ArchiveSink:
+    # Write-only file object for zipfile; without tell()/seek() zipfile streams entries
+    # with data descriptors, so each finished entry can be sent immediately.
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        return None
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
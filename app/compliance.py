@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from .latex_edits import latex_problems
+from .line_fit import estimate_fit
+from .resume_index import ResumeEntry, ResumeIndex, index_resume, matching_brace
+
+_NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "eleven": 11,
+    "twelve": 12,
+}
+_NUMBER = r"(\d+|" + "|".join(_NUMBER_WORDS) + r")"
+_SECTION_ORDER = re.compile(r"section order must remain:\s*(.+?)\.?$", re.IGNORECASE)
+_FORBIDDEN = re.compile(r"^no ([a-z/ ]+?) sections?\b", re.IGNORECASE)
+_LOCK = re.compile(r"^(.+?) lock:\s*(.+?)\.?$", re.IGNORECASE)
+_LOCK_FIELD = re.compile(r"(\w+)\s*=\s*(.+?)(?=,\s*\w+\s*=|$)")
+_LOCKED_BULLETS = re.compile(r"^(.+?) bullets must remain unchanged", re.IGNORECASE)
+_BULLET_MODE = re.compile(r"(?:\b" + _NUMBER + r"-line mode:\s*)?(\d+)\s*-\s*(\d+) words per bullet", re.IGNORECASE)
+_SKILLS_LINES = re.compile(r"exactly " + _NUMBER + r" labeled lines", re.IGNORECASE)
+_SKILLS_ITEMS = re.compile(r"max " + _NUMBER + r" items per line", re.IGNORECASE)
+_SKILLS_PARENS = re.compile(r"at most " + _NUMBER + r" parenthetical groups? per line", re.IGNORECASE)
+_SKILLS_LABEL = re.compile(r"\\textbf\s*\{")
+_LATEX_COMMAND = re.compile(r"\\[a-zA-Z]+\*?")
+_LATEX_ESCAPE = re.compile(r"\\([%&$#_])")
+
+
+@dataclass(frozen=True)
+class EntryLock:
+    name: str
+    fields: tuple[tuple[str, str], ...]
+
+
+@dataclass(frozen=True)
+class BulletMode:
+    min_words: int
+    max_words: int
+    max_lines: int | None = None
+
+
+@dataclass
+class ComplianceRules:
+    section_order: list[str] = field(default_factory=list)
+    forbidden_sections: list[str] = field(default_factory=list)
+    locks: list[EntryLock] = field(default_factory=list)
+    # Entries (by name) whose bullets must match the input resume word for word.
+    locked_bullets: list[str] = field(default_factory=list)
+    # One entry per global bullet mode ("one-line", "two-line", ...).
+    bullet_modes: list[BulletMode] = field(default_factory=list)
+    skills_lines: int | None = None
+    skills_max_items: int | None = None
+    skills_max_parentheticals: int | None = None
+    skills_unique: bool = False
+    no_fences: bool = False
+
+    @property
+    def empty(self) -> bool:
+        return self == ComplianceRules()
+
+
+@dataclass(frozen=True)
+class Violation:
+    rule: str
+    message: str
+
+
+def _number(raw: str) -> int:
+    return int(raw) if raw.isdigit() else _NUMBER_WORDS[raw.lower()]
+
+
+def parse_rules(lines: list[str]) -> ComplianceRules:
+    # Picks out the rules in the instruction text that can be checked mechanically;
+    # everything else (truthfulness, keyword placement, tone) stays with the LLM.
+    rules = ComplianceRules()
+    for raw in lines:
+        line = raw.strip()
+        lower = line.lower()
+        if match := _SECTION_ORDER.search(line):
+            rules.section_order = [part.strip() for part in match.group(1).split("->") if part.strip()]
+        elif match := _FORBIDDEN.match(line):
+            rules.forbidden_sections += [part.strip().lower() for part in match.group(1).split("/") if part.strip()]
+        elif match := _LOCK.match(line):
+            fields = tuple((key, value.strip()) for key, value in _LOCK_FIELD.findall(match.group(2)))
+            if fields:
+                rules.locks.append(EntryLock(match.group(1).strip(), fields))
+        elif match := _LOCKED_BULLETS.match(line):
+            rules.locked_bullets.append(match.group(1).strip())
+        if match := _BULLET_MODE.search(line):
+            low, high = int(match.group(2)), int(match.group(3))
+            max_lines = _number(match.group(1)) if match.group(1) else None
+            rules.bullet_modes.append(BulletMode(min(low, high), max(low, high), max_lines))
+        if match := _SKILLS_LINES.search(line):
+            rules.skills_lines = _number(match.group(1))
+        if match := _SKILLS_ITEMS.search(line):
+            rules.skills_max_items = _number(match.group(1))
+        if match := _SKILLS_PARENS.search(line):
+            rules.skills_max_parentheticals = _number(match.group(1))
+        if lower.startswith("no duplicate"):
+            rules.skills_unique = True
+        if "no markdown fences" in lower:
+            rules.no_fences = True
+    return rules
+
+
+def plain_words(latex: str) -> list[str]:
+    text = _LATEX_ESCAPE.sub(r"\1", latex)
+    text = _LATEX_COMMAND.sub(" ", text).replace("{", " ").replace("}", " ").replace("~", " ")
+    return [word for word in text.split() if any(char.isalnum() for char in word)]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def find_entry(index: ResumeIndex, name: str) -> ResumeEntry | None:
+    wanted = _normalize(name).lower()
+    for section in index.sections:
+        for entry in section.entries:
+            if any(_normalize(value).lower() == wanted for value in entry.fields):
+                return entry
+    return None
+
+
+def _section_position(index: ResumeIndex, name: str) -> int:
+    wanted = name.strip().lower()
+    return next((pos for pos, section in enumerate(index.sections) if section.title.lower() == wanted), -1)
+
+
+def _split_items(text: str) -> list[str]:
+    items: list[str] = []
+    depth = 0
+    current = ""
+    for char in text:
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth = max(0, depth - 1)
+        if char == "," and depth == 0:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    items.append(current)
+    return [_normalize(item) for item in items if _normalize(item)]
+
+
+def skills_lines(latex: str, start: int, end: int) -> list[tuple[str, str]]:
+    # (label, items) for each "\textbf{Label}{: a, b, c}" or "\textbf{Label:} a, b, c" line.
+    lines: list[tuple[str, str]] = []
+    for match in _SKILLS_LABEL.finditer(latex, start, end):
+        close = matching_brace(latex, match.end() - 1)
+        if close < 0 or close > end:
+            continue
+        label = latex[match.end() : close].strip().rstrip(":").strip()
+        rest = latex[close + 1 : end]
+        stripped = rest.lstrip(" \t")
+        if stripped.startswith("{"):
+            open_idx = close + 1 + len(rest) - len(stripped)
+            group_end = matching_brace(latex, open_idx)
+            items = latex[open_idx + 1 : group_end] if group_end > 0 else stripped[1:]
+        else:
+            items = re.split(r"\\\\|\n|\\textbf", rest, maxsplit=1)[0]
+        lines.append((label, items.strip().lstrip(":").strip()))
+    return lines
+
+
+def check_resume(latex: str, rules: ComplianceRules, baseline: str | None = None) -> list[Violation]:
+    violations: list[Violation] = []
+    if rules.no_fences and "```" in latex:
+        violations.append(Violation("output_contract", "Output contains markdown code fences."))
+    for problem in latex_problems(latex):
+        violations.append(Violation("output_contract", f"LaTeX is not compile-ready: {problem}."))
+
+    index = index_resume(latex)
+    base_index = index_resume(baseline) if baseline is not None else None
+    violations += _check_sections(index, base_index, rules)
+    violations += _check_locks(index, base_index, rules)
+    violations += _check_bullets(latex, index, rules)
+    violations += _check_skills(latex, index, rules)
+    return violations
+
+
+def _check_sections(index: ResumeIndex, base_index: ResumeIndex | None, rules: ComplianceRules) -> list[Violation]:
+    violations: list[Violation] = []
+    for section in index.sections:
+        title = section.title.lower()
+        banned = next((word for word in rules.forbidden_sections if word in title), None)
+        if banned:
+            violations.append(Violation("sections", f"Remove the '{section.title}' section; no {banned} section."))
+
+    expected = [name for name in rules.section_order if name.lower() != "header"]
+    present = [(name, _section_position(index, name)) for name in expected]
+    for name, pos in present:
+        if pos < 0 and base_index is not None and _section_position(base_index, name) >= 0:
+            violations.append(Violation("sections", f"Section '{name}' is missing."))
+    positions = [(name, pos) for name, pos in present if pos >= 0]
+    if [pos for _, pos in positions] != sorted(pos for _, pos in positions):
+        actual = " -> ".join(name for name, _ in sorted(positions, key=lambda item: item[1]))
+        violations.append(
+            Violation("sections", f"Section order must be {' -> '.join(rules.section_order)} (found {actual}).")
+        )
+    return violations
+
+
+def _check_locks(index: ResumeIndex, base_index: ResumeIndex | None, rules: ComplianceRules) -> list[Violation]:
+    violations: list[Violation] = []
+    for lock in rules.locks:
+        entry = find_entry(index, lock.name)
+        if entry is None:
+            if base_index is None or find_entry(base_index, lock.name) is not None:
+                violations.append(Violation("locks", f"{lock.name} entry is missing."))
+            continue
+        values = {_normalize(value).lower() for value in entry.fields}
+        for key, value in lock.fields:
+            if _normalize(value).lower() not in values:
+                violations.append(Violation("locks", f"{lock.name} {key} must be exactly '{value}'."))
+
+    if base_index is None:
+        return violations
+    for name in rules.locked_bullets:
+        before = find_entry(base_index, name)
+        after = find_entry(index, name)
+        if before is None or after is None:
+            continue
+        if [_normalize(b.text) for b in before.bullets] != [_normalize(b.text) for b in after.bullets]:
+            violations.append(
+                Violation(
+                    "locks",
+                    f"{name} bullets must remain unchanged; restore them exactly:\n"
+                    + "\n".join(f"- {_normalize(b.text)}" for b in before.bullets),
+                )
+            )
+    return violations
+
+
+def _check_bullets(latex: str, index: ResumeIndex, rules: ComplianceRules) -> list[Violation]:
+    if not rules.bullet_modes:
+        return []
+    locked = [find_entry(index, name) for name in rules.locked_bullets]
+    counts = [
+        (bullet, len(plain_words(bullet.text)))
+        for section in index.sections
+        for entry in section.entries
+        if entry not in locked
+        for bullet in entry.bullets
+    ]
+    if not counts:
+        return []
+    # The resume's mode is whichever range most bullets already fit; the rest are out of mode.
+    mode = max(
+        rules.bullet_modes,
+        key=lambda m: sum(1 for _, words in counts if m.min_words <= words <= m.max_words),
+    )
+    violations = [
+        Violation(
+            "bullet_style",
+            f"Bullet has {words} words; this resume's mode needs {mode.min_words}-{mode.max_words}: "
+            f"{_normalize(bullet.text)}",
+        )
+        for bullet, words in counts
+        if not mode.min_words <= words <= mode.max_words
+    ]
+    if mode.max_lines:
+        fit = estimate_fit(latex)
+        for bullet, _ in counts:
+            lines = fit.lines_at(bullet.start) or 1
+            if lines > mode.max_lines:
+                violations.append(
+                    Violation(
+                        "layout",
+                        f"Bullet is estimated to wrap to {lines} lines; this resume's mode allows "
+                        f"{mode.max_lines}: {_normalize(bullet.text)}",
+                    )
+                )
+    return violations
+
+
+def _check_skills(latex: str, index: ResumeIndex, rules: ComplianceRules) -> list[Violation]:
+    section = next(iter(index.sections_matching("skills")), None)
+    if section is None:
+        return []
+    violations: list[Violation] = []
+    lines = skills_lines(latex, section.start, section.end)
+    if rules.skills_lines is not None and len(lines) != rules.skills_lines:
+        violations.append(
+            Violation(
+                "skills",
+                f"{section.title} must have exactly {rules.skills_lines} labeled lines (found {len(lines)}).",
+            )
+        )
+    seen: dict[str, str] = {}
+    for label, text in lines:
+        items = _split_items(text)
+        if rules.skills_max_items is not None and len(items) > rules.skills_max_items:
+            violations.append(
+                Violation("skills", f"'{label}' has {len(items)} items; max {rules.skills_max_items} per line.")
+            )
+        groups = len(re.findall(r"\(", text))
+        if rules.skills_max_parentheticals is not None and groups > rules.skills_max_parentheticals:
+            violations.append(
+                Violation(
+                    "skills",
+                    f"'{label}' has {groups} parenthetical groups; at most {rules.skills_max_parentheticals} per line.",
+                )
+            )
+        if rules.skills_unique:
+            for item in items:
+                key = item.lower()
+                if key in seen:
+                    where = f"twice in '{label}'" if seen[key] == label else f"in both '{seen[key]}' and '{label}'"
+                    violations.append(Violation("skills", f"'{item}' is listed {where}."))
+                else:
+                    seen[key] = label
+    return violations
+
+
+def format_violations(violations: list[Violation]) -> str:
+    return "\n".join(f"{number}. [{v.rule}] {v.message}" for number, v in enumerate(violations, start=1))
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from .prompt_splitter import WorkflowAgent
+
+# Rough BPE approximation: words cost one token per ~4 characters, symbols one each.
+_TOKEN_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_TRUNCATION_MARKER = "\n[... truncated to fit context budget ...]"
+_MIN_PART_TOKENS = 32
+# Default inputs keep the original prompt shape: JD, resume and the last four prior outputs.
+DEFAULT_INPUTS = ("jd", "resume", "prior")
+DEFAULT_PRIOR_LIMIT = 4
+
+
+def _piece_tokens(piece: str) -> int:
+    return max(1, (len(piece) + 3) // 4)
+
+
+def count_tokens(text: str) -> int:
+    return sum(_piece_tokens(m.group(0)) for m in _TOKEN_PIECE.finditer(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max_tokens - count_tokens(_TRUNCATION_MARKER)
+    if keep <= 0:
+        return ""
+    used = 0
+    for match in _TOKEN_PIECE.finditer(text):
+        used += _piece_tokens(match.group(0))
+        if used > keep:
+            return text[: match.start()].rstrip() + _TRUNCATION_MARKER
+    return text
+
+
+@dataclass
+class PriorOutput:
+    step_id: str
+    name: str
+    text: str
+
+
+@dataclass
+class ContextPart:
+    key: str
+    label: str
+    text: str
+    tokens: int = 0
+    trimmed: bool = False
+
+    def __post_init__(self) -> None:
+        self.tokens = count_tokens(self.text)
+
+
+@dataclass
+class ContextReport:
+    agent: str
+    budget: int
+    total_tokens: int = 0
+    parts: dict[str, int] = field(default_factory=dict)
+    trimmed: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "agent": self.agent,
+            "budget": self.budget,
+            "total_tokens": self.total_tokens,
+            "parts": dict(self.parts),
+            "trimmed": list(self.trimmed),
+        }
+
+
+class ContextAssembler:
+    def __init__(self, default_budget: int) -> None:
+        self.default_budget = max(0, default_budget)
+
+    def assemble(
+        self,
+        agent: WorkflowAgent,
+        mode_line: str,
+        job_description: str,
+        current_resume: str,
+        prior: list[PriorOutput],
+        resume_label: str = "Current Resume (LaTeX)",
+    ) -> tuple[str, ContextReport]:
+        inputs = agent.inputs if agent.inputs is not None else list(DEFAULT_INPUTS)
+        budget = agent.max_input_tokens or self.default_budget
+
+        parts: list[ContextPart] = []
+        prior_parts: list[ContextPart] = []
+        by_step = {p.step_id: p for p in prior if p.step_id}
+        for key in inputs:
+            if key == "jd":
+                parts.append(ContextPart("jd", "Job Description", job_description))
+            elif key == "resume":
+                parts.append(ContextPart("resume", resume_label, current_resume))
+            elif key == "prior":
+                for item in prior[-DEFAULT_PRIOR_LIMIT:]:
+                    if all(p.key != item.step_id for p in prior_parts):
+                        prior_parts.append(ContextPart(item.step_id, item.name, item.text))
+            elif key in by_step and all(p.key != key for p in prior_parts):
+                item = by_step[key]
+                prior_parts.append(ContextPart(item.step_id, item.name, item.text))
+
+        include_prior = "prior" in inputs or bool(prior_parts)
+        report = ContextReport(agent=agent.name, budget=budget)
+        if budget:
+            # Headings and the mode line are fixed costs; only part bodies are trimmed.
+            overhead = count_tokens(mode_line) + sum(count_tokens(p.label) + 1 for p in parts + prior_parts)
+            if include_prior:
+                overhead += count_tokens("Prior Agent Outputs: None")
+            self._trim(agent, parts, prior_parts, budget - overhead, report)
+
+        chunks = [mode_line]
+        for part in parts:
+            chunks.append(f"{part.label}:\n{part.text}")
+        if include_prior:
+            prior_text = "\n\n".join(f"{p.label}\n{p.text}" for p in prior_parts if p.text) or "None"
+            chunks.append(f"Prior Agent Outputs:\n{prior_text}")
+        prompt = "\n\n".join(chunks) + "\n"
+
+        for part in parts + prior_parts:
+            report.parts[part.key] = part.tokens
+        report.total_tokens = count_tokens(prompt)
+        return prompt, report
+
+    @staticmethod
+    def _trim(
+        agent: WorkflowAgent,
+        parts: list[ContextPart],
+        prior_parts: list[ContextPart],
+        budget: int,
+        report: ContextReport,
+    ) -> None:
+        over = sum(p.tokens for p in parts + prior_parts) - budget
+        if over <= 0:
+            return
+        # Trim oldest prior outputs first, then the JD. LaTeX-producing agents must
+        # see the whole resume, so it is only trimmed for JSON agents.
+        order = list(prior_parts) + [p for p in parts if p.key == "jd"]
+        if agent.mode == "json":
+            order += [p for p in parts if p.key == "resume"]
+        for part in order:
+            if over <= 0:
+                break
+            target = part.tokens - over
+            if target < _MIN_PART_TOKENS:
+                target = 0
+            part.text = truncate_to_tokens(part.text, target)
+            saved = part.tokens - count_tokens(part.text)
+            part.tokens -= saved
+            part.trimmed = True
+            over -= saved
+            report.trimmed.append(part.key)
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import math
+import queue
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .cancellation import CancelToken, JobCancelled
+
+PROVIDERS = ("openai", "gemini")
+
+
+@dataclass(frozen=True)
+class Target:
+    provider: str
+    model: str | None = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}/{self.model}" if self.model else self.provider
+
+
+def parse_targets(raw: object) -> list[Target]:
+    # "gemini/gemini-2.5-flash" or just "openai" (provider default model).
+    items = raw if isinstance(raw, list) else [raw] if isinstance(raw, str) else []
+    targets: list[Target] = []
+    for item in items:
+        provider, _, model = str(item).strip().partition("/")
+        provider = provider.strip().lower()
+        if provider in PROVIDERS:
+            targets.append(Target(provider, model.strip() or None))
+    return targets
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    targets: tuple[Target, ...]
+    percentile: float = 90.0
+    # Used until the primary has min_samples recorded latencies for this role.
+    delay_seconds: float = 20.0
+    min_delay_seconds: float = 1.0
+    min_samples: int = 20
+
+    @classmethod
+    def from_config(cls, raw: object) -> Optional[HedgePolicy]:
+        if not isinstance(raw, dict):
+            return None
+        targets = tuple(parse_targets(raw.get("targets")))
+        if not targets:
+            return None
+
+        def number(key: str, default: float) -> float:
+            value = raw.get(key)
+            return float(value) if isinstance(value, (int, float)) and value > 0 else default
+
+        return cls(
+            targets=targets,
+            percentile=min(99.9, number("percentile", 90.0)),
+            delay_seconds=number("delay_seconds", 20.0),
+            min_delay_seconds=number("min_delay_seconds", 1.0),
+            min_samples=max(1, int(number("min_samples", 20))),
+        )
+
+
+@dataclass
+class Attempt:
+    target: Target
+    kind: str
+    started_ms: float
+    duration_ms: float | None = None
+    outcome: str = "running"
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "target": self.target.label,
+            "kind": self.kind,
+            "started_ms": self.started_ms,
+            "duration_ms": self.duration_ms,
+            "outcome": self.outcome,
+            "error": self.error,
+        }
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, hedge_max_ratio: float = 0.2) -> None:
+        self.window = max(10, window)
+        self.hedge_max_ratio = max(0.0, min(1.0, hedge_max_ratio))
+        self._lock = threading.Lock()
+        self._samples: dict[tuple[str, str], deque[float]] = {}
+        # One flag per policy call (hedged or not), for the spend cap.
+        self._hedged: deque[bool] = deque(maxlen=self.window)
+        self._outcomes: Counter[tuple[str, str, str]] = Counter()
+
+    def record(self, role: str, target: Target, seconds: float) -> None:
+        with self._lock:
+            self._record_locked(role, target, seconds)
+
+    def _record_locked(self, role: str, target: Target, seconds: float) -> None:
+        key = (role, target.label)
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def hedge_delay(self, policy: HedgePolicy, role: str, target: Target) -> float:
+        with self._lock:
+            samples = list(self._samples.get((role, target.label), ()))
+        if len(samples) < policy.min_samples:
+            return policy.delay_seconds
+        return max(policy.min_delay_seconds, _percentile(samples, policy.percentile))
+
+    def allow_hedge(self) -> bool:
+        with self._lock:
+            if not self._hedged:
+                return self.hedge_max_ratio > 0
+            return sum(self._hedged) / len(self._hedged) < self.hedge_max_ratio
+
+    def note(self, role: str, attempts: list[Attempt]) -> None:
+        with self._lock:
+            self._hedged.append(any(a.kind == "hedge" for a in attempts))
+            for attempt in attempts:
+                self._outcomes[(role, attempt.kind, attempt.outcome)] += 1
+                # Completed calls record themselves. A lost or cancelled one ran at least this long;
+                # dropping it would leave only the fast calls and pull the hedge percentile down.
+                if attempt.outcome in ("lost", "cancelled") and attempt.duration_ms is not None:
+                    self._record_locked(role, attempt.target, attempt.duration_ms / 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+            hedged = list(self._hedged)
+            outcomes = dict(self._outcomes)
+        latency = [
+            {
+                "role": role,
+                "target": label,
+                "samples": len(values),
+                **{f"p{p}": round(_percentile(values, p), 2) for p in (50, 90, 95, 99)},
+            }
+            for (role, label), values in sorted(samples.items())
+            if values
+        ]
+        return {
+            "latency_seconds": latency,
+            "hedges": {
+                "calls": len(hedged),
+                "hedged": sum(hedged),
+                "max_ratio": self.hedge_max_ratio,
+            },
+            "attempts": [
+                {"role": role, "kind": kind, "outcome": outcome, "count": count}
+                for (role, kind, outcome), count in sorted(outcomes.items())
+            ],
+        }
+
+
+def run_hedged(
+    call: Callable[[Target, CancelToken], str],
+    primary: Target,
+    hedges: list[Target],
+    fallbacks: list[Target],
+    hedge_delay: float,
+    allow_hedge: Callable[[], bool],
+    cancel: CancelToken | None = None,
+    validate: Callable[[str], str] | None = None,
+) -> tuple[str, str, Target, list[Attempt]]:
+    # Races the primary against hedge targets started after hedge_delay; the first response
+    # that passes validate wins and the rest are cancelled. When every started attempt has
+    # failed, the next fallback (then any unused hedge target) is tried.
+    started = time.monotonic()
+    attempts: list[Attempt] = []
+    tokens: list[CancelToken] = []
+    results: queue.Queue[tuple[int, str, str, Optional[BaseException], float]] = queue.Queue()
+    pending_hedges = list(hedges)
+    pending_fallbacks = list(fallbacks)
+    running = 0
+
+    def launch(target: Target, kind: str) -> None:
+        nonlocal running
+        idx = len(attempts)
+        attempts.append(Attempt(target, kind, started_ms=round((time.monotonic() - started) * 1000, 1)))
+        token = CancelToken()
+        tokens.append(token)
+        running += 1
+
+        def run() -> None:
+            begun = time.monotonic()
+            try:
+                raw = call(target, token)
+            except Exception as exc:
+                results.put((idx, "", "error", exc, time.monotonic() - begun))
+                return
+            try:
+                output = validate(raw) if validate else raw
+            except Exception as exc:
+                results.put((idx, raw, "invalid", exc, time.monotonic() - begun))
+                return
+            results.put((idx, raw, output, None, time.monotonic() - begun))
+
+        threading.Thread(target=run, name=f"llm-{kind}", daemon=True).start()
+
+    remove = cancel.on_cancel(lambda: results.put((-1, "", "", None, 0.0))) if cancel else None
+    last_error: BaseException | None = None
+    try:
+        launch(primary, "primary")
+        hedge_at = started + hedge_delay if pending_hedges else None
+        while True:
+            timeout = max(0.0, hedge_at - time.monotonic()) if hedge_at is not None else None
+            try:
+                idx, raw, output, exc, elapsed = results.get(timeout=timeout)
+            except queue.Empty:
+                if allow_hedge():
+                    launch(pending_hedges.pop(0), "hedge")
+                hedge_at = time.monotonic() + hedge_delay if pending_hedges else None
+                continue
+            if idx < 0:
+                raise JobCancelled("Job was cancelled.")
+            running -= 1
+            attempt = attempts[idx]
+            attempt.duration_ms = round(elapsed * 1000, 1)
+            if exc is None:
+                attempt.outcome = "won"
+                return raw, output, attempt.target, attempts
+            attempt.outcome = "cancelled" if isinstance(exc, JobCancelled) else output
+            attempt.error = str(exc)[:300]
+            last_error = exc
+            if running:
+                continue
+            if pending_fallbacks or pending_hedges:
+                # Nothing left in flight: fail over now instead of waiting for the hedge timer.
+                launch((pending_fallbacks or pending_hedges).pop(0), "fallback")
+                continue
+            raise last_error
+    finally:
+        if remove:
+            remove()
+        now = time.monotonic()
+        for attempt, token in zip(attempts, tokens):
+            if attempt.outcome == "running":
+                attempt.outcome = "lost"
+                attempt.duration_ms = round((now - started) * 1000 - attempt.started_ms, 1)
+                token.cancel()
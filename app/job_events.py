@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import AsyncIterator
+
+
+class JobChannel:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: list[tuple[str, dict]] = []
+        self._closed = False
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @property
+    def closed(self) -> bool:
+        with self._lock:
+            return self._closed
+
+    def publish(self, event: str, data: dict) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._events.append((event, data))
+            waiters = list(self._waiters)
+        self._wake(waiters)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            waiters = list(self._waiters)
+        self._wake(waiters)
+
+    @staticmethod
+    def _wake(waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]]) -> None:
+        # Publishers run on worker threads; wake async subscribers on their own loops.
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                continue
+
+    async def subscribe(self, start: int = 0, idle_timeout: float | None = None) -> AsyncIterator[tuple[str, dict]]:
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        waiter = (loop, wakeup)
+        with self._lock:
+            self._waiters.append(waiter)
+        index = start
+        try:
+            while True:
+                with self._lock:
+                    pending = self._events[index:]
+                    closed = self._closed
+                    wakeup.clear()
+                for item in pending:
+                    yield item
+                index += len(pending)
+                if closed and not pending:
+                    return
+                if not pending:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), idle_timeout)
+                    except asyncio.TimeoutError:
+                        yield ("ping", {})
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+
+class JobChannels:
+    def __init__(self, retain_seconds: float = 120.0) -> None:
+        self.retain_seconds = retain_seconds
+        self._lock = threading.Lock()
+        self._channels: dict[str, JobChannel] = {}
+
+    def open(self, job_id: str) -> JobChannel:
+        with self._lock:
+            channel = self._channels.get(job_id)
+            if channel is None:
+                channel = JobChannel()
+                self._channels[job_id] = channel
+            return channel
+
+    def get(self, job_id: str) -> JobChannel | None:
+        with self._lock:
+            return self._channels.get(job_id)
+
+    def close(self, job_id: str) -> None:
+        channel = self.get(job_id)
+        if channel is None:
+            return
+        channel.close()
+        # Keep closed channels briefly so late subscribers can replay the tail.
+        timer = threading.Timer(self.retain_seconds, self._discard, args=(job_id, channel))
+        timer.daemon = True
+        timer.start()
+
+    def _discard(self, job_id: str, channel: JobChannel) -> None:
+        with self._lock:
+            if self._channels.get(job_id) is channel:
+                del self._channels[job_id]
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .cancellation import CancelToken
+from .storage import Database
+from .workers import QueueFullError
+
+
+@dataclass
+class QueuedJob:
+    id: str
+    kind: str
+    lane: str
+    payload: dict
+    attempts: int
+    # Set when another process has taken over the job; the handler must not record a result.
+    lease_lost: bool = False
+
+
+class JobQueue:
+    def __init__(
+        self,
+        db: Database,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 2,
+        lane_limit: Callable[[str], Optional[int]] | None = None,
+    ) -> None:
+        self.db = db
+        self.lease_seconds = max(5.0, lease_seconds)
+        self.max_attempts = max(1, max_attempts)
+        # Lane limits are enforced at claim time, so they hold across every process.
+        self.lane_limit = lane_limit or (lambda lane: None)
+        self._durations_lock = threading.Lock()
+        self._durations: deque[float] = deque(maxlen=50)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return self.db.connect()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_queue (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    lane TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    state TEXT NOT NULL,
+                    worker_id TEXT,
+                    lease_expires_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    enqueued_at REAL NOT NULL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(job_queue)")}
+            if "cancel_requested" not in columns:
+                conn.execute("ALTER TABLE job_queue ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+            # Queue order is rowid order: jobs enqueued together share enqueued_at, rowids never tie.
+            conn.execute("DROP INDEX IF EXISTS idx_job_queue_state")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_queue_state_order ON job_queue (state)")
+
+    def enqueue(self, job_id: str, kind: str, lane: str, payload: dict, max_queued: int | None = None) -> None:
+        self.enqueue_many([(job_id, kind, lane, payload)], max_queued)
+
+    def enqueue_many(self, jobs: list[tuple[str, str, str, dict]], max_queued: int | None = None) -> None:
+        now = time.time()
+        rows = [
+            (job_id, kind, lane, zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), 6), now)
+            for job_id, kind, lane, payload in jobs
+        ]
+        conn = self._connect()
+        # Depth check and insert share one write transaction so concurrent processes
+        # cannot both squeeze past the limit.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if max_queued is not None:
+                # Each kind (tailor, compile) has its own depth limit.
+                kind = jobs[0][1] if jobs else ""
+                depth, running = conn.execute(
+                    """
+                    SELECT SUM(state = 'queued'), SUM(state = 'leased' AND lease_expires_at > ?)
+                    FROM job_queue WHERE kind = ?
+                    """,
+                    (now, kind),
+                ).fetchone()
+                depth, running = depth or 0, running or 0
+                if depth + len(rows) > max_queued:
+                    raise QueueFullError(
+                        f"{kind.capitalize()} queue is full ({depth} waiting).",
+                        self.estimated_wait(depth + len(rows), running),
+                    )
+            conn.executemany(
+                """
+                INSERT INTO job_queue (id, kind, lane, payload, state, attempts, enqueued_at)
+                VALUES (?, ?, ?, ?, 'queued', 0, ?)
+                """,
+                rows,
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def claim(self, worker_id: str, kinds: tuple[str, ...] | None = None) -> Optional[QueuedJob]:
+        conn = self._connect()
+        now = time.time()
+        kind_filter = f"AND kind IN ({','.join('?' for _ in kinds)})" if kinds else ""
+        claimable = f"""
+            FROM job_queue
+            WHERE (state = 'queued' OR (state = 'leased' AND lease_expires_at <= ?))
+              AND attempts < ? AND cancel_requested = 0 {kind_filter}
+        """
+        params = (now, self.max_attempts, *(kinds or ()))
+        # Idle polls end on a plain read instead of queueing for the write lock.
+        if conn.execute(f"SELECT 1 {claimable} LIMIT 1", params).fetchone() is None:
+            conn.commit()
+            return None
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes can never
+        # pick the same row. Only small columns are read while it is held.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            busy = dict(
+                conn.execute(
+                    """
+                    SELECT lane, COUNT(*) FROM job_queue
+                    WHERE state = 'leased' AND lease_expires_at > ?
+                    GROUP BY lane
+                    """,
+                    (now,),
+                ).fetchall()
+            )
+            chosen = None
+            # Rows are read lazily, so the scan stops at the first lane with room.
+            for job_id, kind, lane, attempts in conn.execute(
+                f"SELECT id, kind, lane, attempts {claimable} ORDER BY rowid", params
+            ):
+                limit = self.lane_limit(lane)
+                if limit is None or busy.get(lane, 0) < limit:
+                    chosen = (job_id, kind, lane, attempts)
+                    break
+            if chosen is None:
+                conn.commit()
+                return None
+            job_id, kind, lane, attempts = chosen
+            conn.execute(
+                """
+                UPDATE job_queue
+                SET state = 'leased', worker_id = ?, lease_expires_at = ?, attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (worker_id, now + self.lease_seconds, job_id),
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        # The row is ours now, so its payload can be read outside the write lock.
+        row = conn.execute("SELECT payload FROM job_queue WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        return QueuedJob(id=job_id, kind=kind, lane=lane, payload=data, attempts=attempts + 1)
+
+    def heartbeat(self, job_ids: list[str], worker_id: str) -> set[str]:
+        if not job_ids:
+            return set()
+        expires_at = time.time() + self.lease_seconds
+        kept: set[str] = set()
+        with self._connect() as conn:
+            for job_id in job_ids:
+                cursor = conn.execute(
+                    "UPDATE job_queue SET lease_expires_at = ? WHERE id = ? AND worker_id = ? AND state = 'leased'",
+                    (expires_at, job_id, worker_id),
+                )
+                if cursor.rowcount:
+                    kept.add(job_id)
+        return kept
+
+    def finish(self, job_id: str, worker_id: str, duration: float | None = None) -> None:
+        if duration is not None:
+            with self._durations_lock:
+                self._durations.append(duration)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM job_queue WHERE id = ? AND worker_id = ?", (job_id, worker_id))
+
+    def remove(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM job_queue WHERE id = ? AND state = 'queued'", (job_id,)).rowcount > 0
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        # Queued jobs are dropped outright; running ones are flagged for their worker,
+        # which may live in another process, to pick up on its next poll.
+        with self._connect() as conn:
+            if conn.execute("DELETE FROM job_queue WHERE id = ? AND state = 'queued'", (job_id,)).rowcount:
+                return "removed"
+            if conn.execute(
+                "UPDATE job_queue SET cancel_requested = 1 WHERE id = ? AND state = 'leased'", (job_id,)
+            ).rowcount:
+                return "signalled"
+        return None
+
+    def cancel_requested(self, job_ids: list[str]) -> set[str]:
+        if not job_ids:
+            return set()
+        marks = ",".join("?" for _ in job_ids)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id FROM job_queue WHERE cancel_requested = 1 AND id IN ({marks})",
+                job_ids,
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def expire_dead(self) -> dict[str, bool]:
+        # Leases that ran out on their last allowed attempt (or after a cancel) are never reclaimed.
+        # Maps each expired job to whether a cancel had been requested for it.
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, cancel_requested FROM job_queue
+                WHERE state = 'leased' AND lease_expires_at <= ? AND (attempts >= ? OR cancel_requested = 1)
+                """,
+                (now, self.max_attempts),
+            ).fetchall()
+            conn.executemany("DELETE FROM job_queue WHERE id = ?", [(row[0],) for row in rows])
+        return {job_id: bool(cancelled) for job_id, cancelled in rows}
+
+    def position(self, job_id: str) -> Optional[int]:
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(*) FROM job_queue AS other
+                JOIN job_queue AS job ON job.id = ? AND job.state = 'queued'
+                WHERE other.state = 'queued' AND other.kind = job.kind AND other.rowid <= job.rowid
+                """,
+                (job_id,),
+            ).fetchone()
+        return int(row[0]) if row and row[0] else None
+
+    def estimated_wait(self, position: int, running: int) -> float:
+        # Under load every worker slot is busy, so the live lease count approximates total
+        # capacity across processes; durations come from jobs this process finished.
+        with self._durations_lock:
+            avg = sum(self._durations) / len(self._durations) if self._durations else 0.0
+        slots = max(1, running)
+        return round(((position + slots - 1) // slots) * avg, 1)
+
+    def running(self, kind: str) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM job_queue WHERE kind = ? AND state = 'leased' AND lease_expires_at > ?",
+                (kind, time.time()),
+            ).fetchone()
+        return int(row[0])
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT lane,
+                       SUM(state = 'queued'),
+                       SUM(state = 'leased' AND lease_expires_at > ?),
+                       SUM(state = 'leased' AND lease_expires_at <= ?)
+                FROM job_queue GROUP BY lane
+                """,
+                (now, now),
+            ).fetchall()
+        return {
+            lane: {"queued": queued or 0, "running": running or 0, "stale": stale or 0, "limit": self.lane_limit(lane)}
+            for lane, queued, running, stale in rows
+        }
+
+
+class QueueWorkers:
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[QueuedJob, CancelToken], None],
+        concurrency: int,
+        poll_seconds: float = 1.0,
+        on_dead: Callable[[dict[str, bool]], None] | None = None,
+        kinds: tuple[str, ...] | None = None,
+        name: str = "queue",
+    ) -> None:
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = max(0.05, poll_seconds)
+        self.on_dead = on_dead
+        self.kinds = kinds
+        self.name = name
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._active: dict[str, tuple[QueuedJob, CancelToken]] = {}
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for idx in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-worker-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        monitor = threading.Thread(target=self._monitor, name=f"{self.name}-heartbeat", daemon=True)
+        monitor.start()
+        self._threads.append(monitor)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self._stop.clear()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            entry = self._active.get(job_id)
+        if entry is None:
+            return False
+        entry[1].cancel()
+        return True
+
+    def active(self) -> int:
+        with self._lock:
+            return len(self._active)
+
+    def stats(self) -> dict:
+        return {"worker_id": self.worker_id, "concurrency": self.concurrency, "active": self.active()}
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(self.worker_id, self.kinds)
+            except sqlite3.OperationalError:
+                # Another process holds the write lock; try again shortly.
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            token = CancelToken()
+            with self._lock:
+                self._active[job.id] = (job, token)
+            started = time.monotonic()
+            try:
+                self.handler(job, token)
+            except Exception:
+                # The handler records its own failures; never let one job take a worker thread down.
+                pass
+            finally:
+                with self._lock:
+                    self._active.pop(job.id, None)
+                if not job.lease_lost:
+                    self.queue.finish(job.id, self.worker_id, time.monotonic() - started)
+                # A slot just freed up; let an idle sibling look for more work.
+                self._wake.set()
+
+    def _monitor(self) -> None:
+        # Cancel flags are polled every tick; leases are renewed every quarter lease.
+        heartbeat_every = self.queue.lease_seconds / 4
+        next_heartbeat = time.monotonic() + heartbeat_every
+        while not self._stop.wait(self.poll_seconds):
+            with self._lock:
+                active = dict(self._active)
+            try:
+                for job_id in self.queue.cancel_requested(list(active)):
+                    active[job_id][1].cancel()
+                if time.monotonic() < next_heartbeat:
+                    continue
+                next_heartbeat = time.monotonic() + heartbeat_every
+                kept = self.queue.heartbeat(list(active), self.worker_id)
+                for job_id, (job, token) in active.items():
+                    if job_id not in kept:
+                        # The lease ran out (a long pause or a stalled lock) and the job may already be
+                        # running elsewhere; stop here so it still runs to completion only once.
+                        job.lease_lost = True
+                        token.cancel()
+                dead = self.queue.expire_dead()
+            except sqlite3.Error:
+                continue
+            if dead and self.on_dead:
+                self.on_dead(dead)
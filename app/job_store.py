@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from .storage import Database
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+# Small, frequently polled fields get columns; everything else is compressed into `result`.
+_COLUMNS = ("id", "status", "stage", "progress", "error")
+
+
+class JobStore:
+    def __init__(
+        self,
+        db: Database,
+        ttl_seconds: float = 24 * 3600,
+        max_finished: int = 1000,
+        cache_max_entries: int = 256,
+        cache_ttl_seconds: float = 1.0,
+    ) -> None:
+        self.db = db
+        self.ttl_seconds = max(1.0, ttl_seconds)
+        self.max_finished = max(1, max_finished)
+        self.cache_max_entries = max(1, cache_max_entries)
+        # Any process may update a running job or purge a finished one, so every entry is short-lived.
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._cache: OrderedDict[str, tuple[float, str, dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._sweeper_stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return self.db.connect()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress INTEGER,
+                    error TEXT,
+                    result BLOB,
+                    created_at INTEGER NOT NULL,
+                    updated_at INTEGER NOT NULL,
+                    finished_at INTEGER
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at)")
+
+    @staticmethod
+    def _pack(job: dict) -> bytes | None:
+        extra = {k: v for k, v in job.items() if k not in _COLUMNS and v is not None}
+        if not extra:
+            return None
+        return zlib.compress(json.dumps(extra, separators=(",", ":")).encode("utf-8"), 6)
+
+    @staticmethod
+    def _unpack(row: tuple) -> dict:
+        job_id, status, stage, progress, error, result = row
+        job = {"id": job_id, "status": status, "stage": stage, "progress": progress, "error": error}
+        if result:
+            job.update(json.loads(zlib.decompress(result).decode("utf-8")))
+        return {k: v for k, v in job.items() if v is not None}
+
+    def save(self, kind: str, job: dict) -> None:
+        now = int(time.time())
+        status = str(job["status"])
+        finished_at = now if status in TERMINAL_STATUSES else None
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (id, kind, status, stage, progress, error, result, created_at, updated_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    stage = excluded.stage,
+                    progress = excluded.progress,
+                    error = excluded.error,
+                    result = excluded.result,
+                    updated_at = excluded.updated_at,
+                    finished_at = COALESCE(jobs.finished_at, excluded.finished_at)
+                """,
+                (
+                    job["id"],
+                    kind,
+                    status,
+                    job.get("stage"),
+                    job.get("progress"),
+                    job.get("error"),
+                    self._pack(job),
+                    now,
+                    now,
+                    finished_at,
+                ),
+            )
+        self._remember(job["id"], kind, job)
+
+    def load(self, job_id: str, kind: str | None = None) -> Optional[dict]:
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(job_id)
+            if cached and cached[0] > now:
+                self._cache.move_to_end(job_id)
+                if kind is None or cached[1] == kind:
+                    return dict(cached[2])
+                return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT kind, id, status, stage, progress, error, result FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if not row:
+            return None
+        job = self._unpack(row[1:])
+        self._remember(job_id, row[0], job)
+        return job if kind is None or row[0] == kind else None
+
+    def delete(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        with self._cache_lock:
+            self._cache.pop(job_id, None)
+
+    def _remember(self, job_id: str, kind: str, job: dict) -> None:
+        with self._cache_lock:
+            self._cache[job_id] = (time.monotonic() + self.cache_ttl_seconds, kind, dict(job))
+            self._cache.move_to_end(job_id)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def purge(self) -> int:
+        now = int(time.time())
+        cutoff = int(now - self.ttl_seconds)
+        with self._connect() as conn:
+            # A job left queued or running by a crashed process stops updating; once it has been
+            # silent for a whole TTL it is finished as failed and then ages out like any other.
+            expired = conn.execute(
+                """
+                UPDATE jobs SET status = 'failed', stage = 'Failed', error = ?, updated_at = ?, finished_at = ?
+                WHERE finished_at IS NULL AND updated_at < ?
+                """,
+                ("The job stopped updating before it finished.", now, now, cutoff),
+            ).rowcount
+            removed = conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (cutoff,),
+            ).rowcount
+            removed += conn.execute(
+                """
+                DELETE FROM jobs WHERE id IN (
+                    SELECT id FROM jobs WHERE finished_at IS NOT NULL
+                    ORDER BY finished_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_finished,),
+            ).rowcount
+        if removed:
+            with self._connect() as conn:
+                live = {row[0] for row in conn.execute("SELECT id FROM jobs")}
+            with self._cache_lock:
+                for job_id in [job_id for job_id in self._cache if job_id not in live]:
+                    del self._cache[job_id]
+        return removed + expired
+
+    def start_sweeper(self, interval_seconds: float) -> None:
+        if self._sweeper is not None:
+            return
+
+        def sweep() -> None:
+            while not self._sweeper_stop.wait(interval_seconds):
+                try:
+                    self.purge()
+                except sqlite3.Error:
+                    continue
+
+        self._sweeper = threading.Thread(target=sweep, name="job-store-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        self._sweeper_stop.clear()
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*), COALESCE(SUM(LENGTH(result)), 0) FROM jobs GROUP BY status"
+            ).fetchall()
+        with self._cache_lock:
+            cached = len(self._cache)
+        return {
+            "jobs": {status: count for status, count, _ in rows},
+            "result_bytes": sum(size for _, _, size in rows),
+            "cached": cached,
+            "cache_max_entries": self.cache_max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "max_finished": self.max_finished,
+        }
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import json
+import re
+
+from .resume_index import matching_brace
+
+EDIT_SCRIPT_INSTRUCTIONS = (
+    'Return ONLY valid JSON of the form {"edits": [...]}. Each edit is one of:\n'
+    '- {"op": "replace_bullet", "old": "<exact current bullet text>", "new": "<replacement bullet text>"}\n'
+    '- {"op": "replace_skills_line", "label": "<current skills label>", "new": "<comma-separated items>", '
+    '"new_label": "<optional new label>"}\n'
+    '- {"op": "unified_diff", "diff": "<unified diff against the current resume>"}\n'
+    'Edits are applied to the current resume exactly as written. Return {"edits": []} if nothing needs to change.'
+)
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+_ENV = re.compile(r"\\(begin|end)\{([^}]+)\}")
+
+
+class EditApplyError(ValueError):
+    pass
+
+
+def strip_code_fences(text: str) -> str:
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = re.sub(r"^```[a-zA-Z]*\s*", "", cleaned)
+        cleaned = re.sub(r"\s*```$", "", cleaned)
+    return cleaned
+
+
+def parse_edit_script(text: str) -> list[dict]:
+    cleaned = strip_code_fences(text)
+    starts = [pos for pos in (cleaned.find("{"), cleaned.find("[")) if pos >= 0]
+    if not starts:
+        raise EditApplyError("Edit script is not JSON.")
+    try:
+        payload = json.loads(cleaned[min(starts):])
+    except json.JSONDecodeError as exc:
+        raise EditApplyError(f"Edit script is not valid JSON: {exc}") from exc
+    edits = payload.get("edits") if isinstance(payload, dict) else payload
+    if not isinstance(edits, list) or not all(isinstance(edit, dict) for edit in edits):
+        raise EditApplyError("Edit script must contain an 'edits' list of objects.")
+    return edits
+
+
+def apply_edit_script(latex: str, script: str) -> str:
+    edited = latex
+    for number, edit in enumerate(parse_edit_script(script), start=1):
+        op = str(edit.get("op", "")).strip()
+        try:
+            if op == "replace_bullet":
+                edited = _replace_bullet(edited, str(edit.get("old", "")), str(edit.get("new", "")))
+            elif op == "replace_skills_line":
+                edited = _replace_skills_line(
+                    edited,
+                    str(edit.get("label", "")),
+                    str(edit.get("new", "")),
+                    edit.get("new_label"),
+                )
+            elif op == "unified_diff":
+                edited = _apply_unified_diff(edited, str(edit.get("diff", "")))
+            else:
+                raise EditApplyError(f"unknown op '{op}'")
+        except EditApplyError as exc:
+            raise EditApplyError(f"Edit {number} ({op or 'missing op'}): {exc}") from exc
+
+    # Only reject problems the edits introduced; the input may already be imperfect.
+    introduced = [p for p in latex_problems(edited) if p not in latex_problems(latex)]
+    if introduced:
+        raise EditApplyError("Edited resume is not valid LaTeX: " + "; ".join(introduced))
+    return edited
+
+
+def latex_problems(latex: str, require_document: bool = True) -> list[str]:
+    problems: list[str] = []
+    if require_document and ("\\begin{document}" not in latex or "\\end{document}" not in latex):
+        problems.append("missing document environment")
+    depth = 0
+    for line in latex.splitlines():
+        for char in _strip_comment(line).replace("\\\\", "").replace("\\{", "").replace("\\}", ""):
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth < 0:
+                    break
+        if depth < 0:
+            break
+    if depth != 0:
+        problems.append("unbalanced braces")
+    stack: list[str] = []
+    for kind, name in _ENV.findall("\n".join(_strip_comment(line) for line in latex.splitlines())):
+        if kind == "begin":
+            stack.append(name)
+        elif not stack or stack.pop() != name:
+            problems.append(f"mismatched \\end{{{name}}}")
+            break
+    else:
+        if stack:
+            problems.append(f"unclosed \\begin{{{stack[-1]}}}")
+    return problems
+
+
+def _strip_comment(line: str) -> str:
+    match = re.search(r"(?<!\\)%", line)
+    return line[: match.start()] if match else line
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _group_end(text: str, open_idx: int) -> int:
+    close = matching_brace(text, open_idx)
+    if close < 0:
+        raise EditApplyError("unbalanced braces in resume")
+    return close
+
+
+def _bullet_spans(latex: str) -> list[tuple[int, int]]:
+    spans: list[tuple[int, int]] = []
+    for match in re.finditer(r"\\resumeItem\s*\{", latex):
+        open_idx = match.end() - 1
+        spans.append((open_idx + 1, _group_end(latex, open_idx)))
+    if not spans:
+        for match in re.finditer(r"\\item\s+([^\n]*)", latex):
+            spans.append(match.span(1))
+    return spans
+
+
+def _replace_bullet(latex: str, old: str, new: str) -> str:
+    old = re.sub(r"^\\(resumeItem|item)\s*", "", old.strip())
+    if old.startswith("{") and old.endswith("}"):
+        old = old[1:-1]
+    new = re.sub(r"^\\(resumeItem|item)\s*", "", new.strip())
+    if new.startswith("{") and new.endswith("}"):
+        new = new[1:-1]
+    if not _normalize(old) or not _normalize(new):
+        raise EditApplyError("old and new bullet text are required")
+    target = _normalize(old)
+    matches = [span for span in _bullet_spans(latex) if _normalize(latex[span[0] : span[1]]) == target]
+    if not matches:
+        raise EditApplyError("bullet not found in current resume")
+    if len(matches) > 1:
+        raise EditApplyError("bullet text is ambiguous")
+    start, end = matches[0]
+    return latex[:start] + new + latex[end:]
+
+
+def _replace_skills_line(latex: str, label: str, new: str, new_label: object = None) -> str:
+    label = label.strip().rstrip(":").strip()
+    new = new.strip().lstrip(":").strip()
+    if not label or not new:
+        raise EditApplyError("label and new items are required")
+    pattern = re.compile(r"\\textbf\{\s*" + re.escape(label) + r"\s*:?\s*\}", re.IGNORECASE)
+    matches = list(pattern.finditer(latex))
+    if not matches:
+        raise EditApplyError(f"skills line '{label}' not found")
+    if len(matches) > 1:
+        raise EditApplyError(f"skills label '{label}' is ambiguous")
+    match = matches[0]
+    label_text = str(new_label).strip().rstrip(":").strip() if new_label else None
+    head = latex[: match.start()]
+    if label_text:
+        colon = ":" if ":" in match.group(0) else ""
+        head += "\\textbf{" + label_text + colon + "}"
+    else:
+        head += match.group(0)
+
+    rest = latex[match.end() :]
+    stripped = rest.lstrip(" \t")
+    if stripped.startswith("{"):
+        # Jake-style "\textbf{Label}{: items}".
+        open_idx = match.end() + len(rest) - len(stripped)
+        close_idx = _group_end(latex, open_idx)
+        prefix = ": " if latex[open_idx + 1 : close_idx].lstrip().startswith(":") else ""
+        return head + latex[match.end() : open_idx + 1] + prefix + new + latex[close_idx:]
+
+    # Plain "\textbf{Label:} items \\" lines run to the line break.
+    stop = re.search(r"\\\\|\n", rest)
+    end = match.end() + (stop.start() if stop else len(rest))
+    trailing = " " if stop and stop.group(0) == "\\\\" else ""
+    return head + " " + new + trailing + latex[end:]
+
+
+def _apply_unified_diff(latex: str, diff: str) -> str:
+    lines = latex.split("\n")
+    hunks: list[tuple[int, list[str], list[str]]] = []
+    current: tuple[int, list[str], list[str]] | None = None
+    for raw in diff.replace("\r\n", "\n").rstrip("\n").split("\n"):
+        header = _HUNK_HEADER.match(raw)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+            continue
+        if current is None or raw.startswith("\\"):
+            continue
+        tag, body = (raw[:1], raw[1:]) if raw else (" ", "")
+        if tag == " ":
+            current[1].append(body)
+            current[2].append(body)
+        elif tag == "-":
+            current[1].append(body)
+        elif tag == "+":
+            current[2].append(body)
+    if not hunks:
+        raise EditApplyError("diff has no hunks")
+
+    offset = 0
+    for hint, old_block, new_block in hunks:
+        expected = max(0, hint - 1 + offset)
+        if not old_block:
+            start = min(expected, len(lines))
+        else:
+            start = _find_block(lines, old_block, expected)
+        lines[start : start + len(old_block)] = new_block
+        offset += len(new_block) - len(old_block)
+    return "\n".join(lines)
+
+
+def _find_block(lines: list[str], block: list[str], expected: int) -> int:
+    wanted = [line.rstrip() for line in block]
+    stripped = [line.rstrip() for line in lines]
+    size = len(wanted)
+    candidates = [idx for idx in range(len(lines) - size + 1) if stripped[idx : idx + size] == wanted]
+    if not candidates:
+        raise EditApplyError(f"hunk near line {expected + 1} does not match the current resume")
+    # Line numbers from the model are hints; take the closest match.
+    return min(candidates, key=lambda idx: abs(idx - expected))
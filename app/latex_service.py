@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import re
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -12,6 +18,252 @@ class LatexCompileError(RuntimeError):
     pass
 
 
+@dataclass
+class CompileResult:
+    engine: str
+    cached: bool
+    duration_ms: float
+    precompiled: bool = False
+    pages: int | None = None
+    overfull_boxes: int | None = None
+
+
+class CompileCache:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Hit/miss counters are per process; sizes always come from the shared directory.
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key_for(latex_source: str, engine: str, engine_version: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{engine}\0{engine_version}\0".encode("utf-8"))
+        digest.update(latex_source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.root / f"{key}.pdf"
+
+    def get(self, key: str) -> Path | None:
+        path = self._path_for(key)
+        with self._lock:
+            try:
+                # Touch on hit so mtime order doubles as LRU order for eviction.
+                os.utime(path)
+            except FileNotFoundError:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return path
+
+    def put(self, key: str, pdf_path: Path) -> Path:
+        target = self._path_for(key)
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(pdf_path, tmp_name)
+        with self._lock:
+            os.replace(tmp_name, target)
+            self._evict_locked(keep=target)
+        return target
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.root.glob("*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_locked(self, keep: Path) -> None:
+        # Sizes come from the directory itself, so every process sharing it enforces the same cap.
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
+
+
+class FormatCache:
+    # Engines whose -ini/-fmt support can dump a typical resume preamble.
+    # xelatex cannot dump fontspec-loaded fonts and tectonic manages its own formats.
+    SUPPORTED_ENGINES = ("pdflatex",)
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._failed: set[str] = {p.stem for p in self.root.glob("*.failed")}
+        self._builds = 0
+        self._build_failures = 0
+        self._warm_compiles = 0
+        self._warm_ms_total = 0.0
+        self._cold_compiles = 0
+        self._cold_ms_total = 0.0
+
+    @staticmethod
+    def key_for(preamble: str, engine: str, engine_version: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{engine}\0{engine_version}\0".encode("utf-8"))
+        digest.update(preamble.encode("utf-8"))
+        return digest.hexdigest()[:32]
+
+    def _build_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def format_for(self, preamble: str, engine: str, timeout_seconds: int) -> tuple[Path | None, bool]:
+        if engine not in self.SUPPORTED_ENGINES:
+            return None, False
+        key = self.key_for(preamble, engine, _engine_version(engine))
+        fmt_path = self.root / f"fmt-{key}.fmt"
+        if self._touch(fmt_path):
+            return fmt_path, False
+        with self._lock:
+            if key in self._failed:
+                return None, False
+
+        with self._build_lock(key):
+            if self._touch(fmt_path):
+                return fmt_path, False
+            built = self._build(key, preamble, engine, timeout_seconds)
+        with self._lock:
+            self._builds += 1
+            if built is None:
+                self._build_failures += 1
+                self._failed.add(key)
+            else:
+                self._evict_locked(keep=built)
+        if built is None:
+            (self.root / f"{key}.failed").touch()
+        return built, built is not None
+
+    @staticmethod
+    def _touch(fmt_path: Path) -> bool:
+        # Touch on hit so mtime order doubles as LRU order for eviction.
+        try:
+            os.utime(fmt_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _evict_locked(self, keep: Path) -> None:
+        # Sizes come from the directory itself, so every process sharing it enforces the same cap.
+        entries = []
+        for path in self.root.glob("*.fmt"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _build(self, key: str, preamble: str, engine: str, timeout_seconds: int) -> Path | None:
+        jobname = f"fmt-{key}"
+        with tempfile.TemporaryDirectory(dir=self.root) as td:
+            temp_dir = Path(td)
+            (temp_dir / "preamble.tex").write_text(f"{preamble}\n\\dump\n", encoding="utf-8")
+            cmd = [
+                engine,
+                "-ini",
+                "-interaction=nonstopmode",
+                "-halt-on-error",
+                f"-jobname={jobname}",
+                f"&{engine}",
+                "preamble.tex",
+            ]
+            try:
+                proc = subprocess.run(
+                    cmd,
+                    cwd=temp_dir,
+                    capture_output=True,
+                    text=True,
+                    check=False,
+                    timeout=timeout_seconds,
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                return None
+            built = temp_dir / f"{jobname}.fmt"
+            if proc.returncode != 0 or not built.exists():
+                return None
+            target = self.root / built.name
+            os.replace(built, target)
+            return target
+
+    def mark_failed(self, fmt_path: Path) -> None:
+        if not fmt_path.exists():
+            # Evicted before the engine opened it, which says nothing about the format itself.
+            return
+        key = fmt_path.stem.removeprefix("fmt-")
+        fmt_path.unlink(missing_ok=True)
+        (self.root / f"{key}.failed").touch()
+        with self._lock:
+            self._failed.add(key)
+
+    def record(self, warm: bool, duration_ms: float) -> None:
+        with self._lock:
+            if warm:
+                self._warm_compiles += 1
+                self._warm_ms_total += duration_ms
+            else:
+                self._cold_compiles += 1
+                self._cold_ms_total += duration_ms
+
+    def stats(self) -> dict:
+        with self._lock:
+            warm_avg = self._warm_ms_total / self._warm_compiles if self._warm_compiles else None
+            cold_avg = self._cold_ms_total / self._cold_compiles if self._cold_compiles else None
+            sizes = []
+            for path in self.root.glob("*.fmt"):
+                try:
+                    sizes.append(path.stat().st_size)
+                except FileNotFoundError:
+                    continue
+            return {
+                "formats": len(sizes),
+                "bytes": sum(sizes),
+                "max_bytes": self.max_bytes,
+                "builds": self._builds,
+                "build_failures": self._build_failures,
+                "warm_compiles": self._warm_compiles,
+                "warm_avg_ms": round(warm_avg, 1) if warm_avg is not None else None,
+                "cold_compiles": self._cold_compiles,
+                "cold_avg_ms": round(cold_avg, 1) if cold_avg is not None else None,
+                "speedup": round(cold_avg / warm_avg, 2) if warm_avg and cold_avg else None,
+            }
+
+
 def _sanitize_latex_source(latex_source: str) -> str:
     src = latex_source.replace("\ufeff", "").strip()
 
@@ -28,6 +280,38 @@ def _sanitize_latex_source(latex_source: str) -> str:
     return src
 
 
+_PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_PDF_STREAM = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.DOTALL)
+_LOG_PAGES = re.compile(r"Output written on .*?\((\d+) pages?", re.DOTALL)
+_LOG_OVERFULL = re.compile(r"^Overfull \\hbox", re.MULTILINE)
+
+
+def pdf_page_count(pdf_path: Path) -> int | None:
+    try:
+        data = pdf_path.read_bytes()
+    except OSError:
+        return None
+    pages = len(_PDF_PAGE.findall(data))
+    if pages:
+        return pages
+    # pdfTeX puts page objects in compressed object streams by default.
+    for match in _PDF_STREAM.finditer(data):
+        try:
+            pages += len(_PDF_PAGE.findall(zlib.decompress(match.group(1))))
+        except zlib.error:
+            continue
+    return pages or None
+
+
+def _log_summary(log_path: Path) -> tuple[int | None, int | None]:
+    try:
+        log = log_path.read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return None, None
+    match = _LOG_PAGES.search(log)
+    return (int(match.group(1)) if match else None), len(_LOG_OVERFULL.findall(log))
+
+
 def _find_engine() -> str | None:
     for engine in ("tectonic", "pdflatex", "xelatex"):
         if shutil.which(engine):
@@ -35,7 +319,65 @@ def _find_engine() -> str | None:
     return None
 
 
-def compile_resume(latex_source: str, output_pdf: Path) -> None:
+@lru_cache(maxsize=8)
+def _engine_version(engine: str) -> str:
+    try:
+        proc = subprocess.run([engine, "--version"], capture_output=True, text=True, check=False, timeout=15)
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+    lines = (proc.stdout or proc.stderr).strip().splitlines()
+    return lines[0].strip() if lines else "unknown"
+
+
+def _split_preamble(latex_source: str) -> tuple[str, str] | None:
+    idx = latex_source.find(r"\begin{document}")
+    if idx <= 0:
+        return None
+    preamble = latex_source[:idx].rstrip()
+    if r"\documentclass" not in preamble:
+        return None
+    return preamble, latex_source[idx:]
+
+
+def _run_engine(cmd: list[str], cwd: Path, engine: str, timeout_seconds: int) -> subprocess.CompletedProcess:
+    try:
+        return subprocess.run(
+            cmd,
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=timeout_seconds,
+        )
+    except subprocess.TimeoutExpired as exc:
+        tail = ""
+        if exc.stdout or exc.stderr:
+            tail = "\n".join(((exc.stdout or "") + "\n" + (exc.stderr or "")).splitlines()[-30:])
+        message = f"LaTeX compile timed out after {timeout_seconds}s with {engine}."
+        if tail:
+            message = f"{message}\n{tail}"
+        raise LatexCompileError(message) from exc
+
+
+def _write_output(source: Path, output_pdf: Path) -> None:
+    fd, tmp_name = tempfile.mkstemp(dir=output_pdf.parent, suffix=".tmp")
+    os.close(fd)
+    os.unlink(tmp_name)
+    try:
+        # Cached PDFs usually share a filesystem with the output, so link instead of copying bytes.
+        os.link(source, tmp_name)
+    except OSError:
+        shutil.copyfile(source, tmp_name)
+    os.replace(tmp_name, output_pdf)
+
+
+def compile_resume(
+    latex_source: str,
+    output_pdf: Path,
+    cache: CompileCache | None = None,
+    formats: FormatCache | None = None,
+) -> CompileResult:
+    started = time.perf_counter()
     latex_source = _sanitize_latex_source(latex_source)
     engine = _find_engine()
     if not engine:
@@ -46,42 +388,84 @@ def compile_resume(latex_source: str, output_pdf: Path) -> None:
 
     output_pdf.parent.mkdir(parents=True, exist_ok=True)
 
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key_for(latex_source, engine, _engine_version(engine))
+        cached_pdf = cache.get(cache_key)
+        if cached_pdf is not None:
+            _write_output(cached_pdf, output_pdf)
+            return CompileResult(
+                engine=engine,
+                cached=True,
+                duration_ms=(time.perf_counter() - started) * 1000,
+                pages=pdf_page_count(cached_pdf),
+            )
+
     timeout_seconds = int(os.getenv("LATEX_COMPILE_TIMEOUT_SECONDS", "90"))
 
+    fmt_path = None
+    fmt_built = False
+    split = _split_preamble(latex_source) if formats is not None else None
+    if formats is not None and split is not None:
+        fmt_path, fmt_built = formats.format_for(split[0], engine, timeout_seconds)
+
     with tempfile.TemporaryDirectory() as td:
         temp_dir = Path(td)
         tex_path = temp_dir / "resume.tex"
-        tex_path.write_text(latex_source, encoding="utf-8")
+        proc = None
+        precompiled = False
 
-        if engine == "tectonic":
-            cmd = [engine, "--keep-logs", "--outdir", str(temp_dir), str(tex_path)]
-        else:
-            cmd = [engine, "-interaction=nonstopmode", "-halt-on-error", str(tex_path)]
+        if formats is not None and fmt_path is not None and split is not None:
+            # kpathsea looks up formats in the working directory, so link the
+            # cached .fmt next to the body and compile against it.
+            local_fmt = temp_dir / fmt_path.name
+            try:
+                os.symlink(fmt_path, local_fmt)
+            except OSError:
+                shutil.copyfile(fmt_path, local_fmt)
+            tex_path.write_text(split[1], encoding="utf-8")
+            cmd = [engine, f"-fmt={fmt_path.stem}", "-interaction=nonstopmode", "-halt-on-error", str(tex_path)]
+            proc = _run_engine(cmd, temp_dir, engine, timeout_seconds)
+            precompiled = proc.returncode == 0 and (temp_dir / "resume.pdf").exists()
+            if not precompiled:
+                for leftover in temp_dir.glob("resume.*"):
+                    leftover.unlink(missing_ok=True)
 
-        try:
-            proc = subprocess.run(
-                cmd,
-                cwd=temp_dir,
-                capture_output=True,
-                text=True,
-                check=False,
-                timeout=timeout_seconds,
-            )
-        except subprocess.TimeoutExpired as exc:
-            tail = ""
-            if exc.stdout or exc.stderr:
-                tail = "\n".join(((exc.stdout or "") + "\n" + (exc.stderr or "")).splitlines()[-30:])
-            message = f"LaTeX compile timed out after {timeout_seconds}s with {engine}."
-            if tail:
-                message = f"{message}\n{tail}"
-            raise LatexCompileError(message) from exc
-
-        if proc.returncode != 0:
-            tail = "\n".join((proc.stdout + "\n" + proc.stderr).splitlines()[-30:])
-            raise LatexCompileError(f"LaTeX compile failed with {engine}.\n{tail}")
+        if not precompiled:
+            tex_path.write_text(latex_source, encoding="utf-8")
+            if engine == "tectonic":
+                cmd = [engine, "--keep-logs", "--outdir", str(temp_dir), str(tex_path)]
+            else:
+                cmd = [engine, "-interaction=nonstopmode", "-halt-on-error", str(tex_path)]
+            proc = _run_engine(cmd, temp_dir, engine, timeout_seconds)
+
+            if proc.returncode != 0:
+                tail = "\n".join((proc.stdout + "\n" + proc.stderr).splitlines()[-30:])
+                raise LatexCompileError(f"LaTeX compile failed with {engine}.\n{tail}")
+
+            if formats is not None and fmt_path is not None:
+                # Full compile succeeded where the precompiled one did not: the format is unusable.
+                formats.mark_failed(fmt_path)
 
         pdf_path = temp_dir / "resume.pdf"
         if not pdf_path.exists():
             raise LatexCompileError("Compiler finished but resume.pdf was not generated.")
+        pages, overfull_boxes = _log_summary(temp_dir / "resume.log")
+        if pages is None:
+            pages = pdf_page_count(pdf_path)
+
+        if cache is not None and cache_key is not None:
+            pdf_path = cache.put(cache_key, pdf_path)
+        _write_output(pdf_path, output_pdf)
 
-        output_pdf.write_bytes(pdf_path.read_bytes())
+    duration_ms = (time.perf_counter() - started) * 1000
+    if formats is not None:
+        formats.record(precompiled and not fmt_built, duration_ms)
+    return CompileResult(
+        engine=engine,
+        cached=False,
+        duration_ms=duration_ms,
+        precompiled=precompiled,
+        pages=pages,
+        overfull_boxes=overfull_boxes,
+    )
@@ -0,0 +1,536 @@
+from __future__ import annotations
+
+import re
+import shutil
+import struct
+import subprocess
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from .resume_index import ResumeIndex, index_resume, matching_brace
+
+PT_PER_UNIT = {
+    "pt": 1.0,
+    "in": 72.27,
+    "cm": 28.4528,
+    "mm": 2.84528,
+    "bp": 1.00375,
+    "pc": 12.0,
+}
+PAPERS = {
+    "letterpaper": (614.295, 794.96999),
+    "a4paper": (597.50787, 845.04684),
+    "legalpaper": (614.295, 1011.78),
+    "a5paper": (421.10039, 597.50787),
+}
+# \tiny ... \Huge for the 10pt, 11pt and 12pt class options (size1x.clo).
+SIZE_COMMANDS = ("tiny", "scriptsize", "footnotesize", "small", "normalsize", "large", "Large", "LARGE", "huge", "Huge")
+FONT_SIZES = {
+    10: (5, 7, 8, 9, 10, 12, 14.4, 17.28, 20.74, 24.88),
+    11: (6, 8, 9, 10, 10.95, 12, 14.4, 17.28, 20.74, 24.88),
+    12: (6, 8, 10, 10.95, 12, 14.4, 17.28, 20.74, 24.88, 24.88),
+}
+BASELINESKIP = {
+    5: 6,
+    6: 7,
+    7: 8,
+    8: 9.5,
+    9: 11,
+    10: 12,
+    10.95: 13.6,
+    12: 14.5,
+    14.4: 18,
+    17.28: 22,
+    20.74: 25,
+    24.88: 30,
+}
+# Computer Modern design sizes; LaTeX loads the largest one not above the requested size.
+CM_DESIGN_SIZES = (5, 6, 7, 8, 9, 10, 12, 17)
+
+_LENGTH = re.compile(r"^\s*([+-]?(?:\d+\.?\d*|\.\d+))\s*(pt|in|cm|mm|bp|pc|em|ex)\s*$")
+_DOCUMENTCLASS = re.compile(r"\\documentclass\s*(?:\[([^\]]*)\])?\s*\{([^}]*)\}")
+_USEPACKAGE = re.compile(r"\\usepackage\s*(?:\[([^\]]*)\])?\s*\{([^}]*)\}")
+_GEOMETRY = re.compile(r"\\geometry\s*\{([^}]*)\}")
+_LENGTH_CHANGE = re.compile(r"\\(addtolength|setlength)\s*\{?\\(textwidth|textheight)\}?\s*\{([^}]*)\}")
+_SETLIST = re.compile(r"\\setlist\s*(?:\[([^\]]*)\])?\s*\{([^}]*)\}")
+_VSPACE = re.compile(r"\\vspace\*?\s*\{([^}]*)\}")
+_SIZE = re.compile(r"\\(" + "|".join(SIZE_COMMANDS) + r")\b")
+_HREF = re.compile(r"\\href\s*\{[^{}]*\}")
+_ESCAPE = re.compile(r"\\([%&$#_{}])")
+_COMMAND = re.compile(r"\\([a-zA-Z]+)\*?\s*")
+_BOLD_COMMANDS = ("textbf", "bf", "bfseries")
+
+
+@dataclass(frozen=True)
+class FontMetrics:
+    name: str
+    # Character and space widths as a fraction of the font size.
+    widths: dict[str, float]
+    space: float
+    stretch: float
+    shrink: float
+    source: str
+
+    def width(self, text: str) -> float:
+        default = self.widths.get("o", 0.5)
+        return sum(self.widths.get(char, default) for char in text)
+
+
+def _widths(spec: str) -> dict[str, float]:
+    widths: dict[str, float] = {}
+    for item in spec.split():
+        char, _, value = item.rpartition(":")
+        widths[char] = int(value) / 1000
+    return widths
+
+
+# Computer Modern widths (cmr10 / cmbx10), used when kpsewhich or the TFM files are unavailable.
+BUILTIN_METRICS = {
+    "cmr10": FontMetrics(
+        name="cmr10",
+        widths=_widths(
+            "a:500 b:556 c:444 d:556 e:444 f:306 g:500 h:556 i:278 j:306 k:528 l:278 m:833 n:556 o:500 "
+            "p:556 q:528 r:392 s:394 t:389 u:556 v:528 w:722 x:528 y:528 z:444 A:750 B:708 C:722 D:764 "
+            "E:681 F:653 G:785 H:750 I:361 J:514 K:778 L:625 M:917 N:750 O:778 P:681 Q:778 R:736 S:556 "
+            "T:722 U:750 V:750 W:1028 X:750 Y:750 Z:611 !:278 \":500 #:833 $:500 %:833 &:778 ':278 (:389 "
+            "):389 *:500 +:778 ,:278 -:333 .:278 /:500 ::278 ;:278 =:778 ?:472 @:778 [:278 ]:278 "
+            "–:500 —:1000 " + " ".join(f"{d}:500" for d in "0123456789")
+        ),
+        space=0.333,
+        stretch=0.167,
+        shrink=0.111,
+        source="builtin",
+    ),
+    "cmbx10": FontMetrics(
+        name="cmbx10",
+        widths=_widths(
+            "a:559 b:639 c:511 d:639 e:527 f:351 g:575 h:639 i:319 j:351 k:607 l:319 m:958 n:639 o:575 "
+            "p:639 q:607 r:474 s:454 t:447 u:639 v:607 w:831 x:607 y:607 z:511 A:869 B:818 C:831 D:882 "
+            "E:756 F:724 G:904 H:900 I:436 J:594 K:901 L:692 M:1092 N:900 O:864 P:786 Q:864 R:862 S:639 "
+            "T:800 U:885 V:869 W:1189 X:869 Y:869 Z:703 !:319 \":575 #:958 $:575 %:958 &:894 ':319 (:447 "
+            "):447 *:575 +:894 ,:319 -:383 .:319 /:575 ::319 ;:319 =:894 ?:543 @:894 [:319 ]:319 "
+            "–:575 —:1150 " + " ".join(f"{d}:575" for d in "0123456789")
+        ),
+        space=0.383,
+        stretch=0.192,
+        shrink=0.128,
+        source="builtin",
+    ),
+}
+
+
+def _fix_word(data: bytes, offset: int) -> float:
+    return struct.unpack(">i", data[offset : offset + 4])[0] / (1 << 20)
+
+
+def parse_tfm(name: str, data: bytes) -> FontMetrics:
+    lf, lh, bc, ec, nw, nh, nd, ni, nl, nk, ne, np = struct.unpack(">12H", data[:24])
+    if lf * 4 > len(data) or ec < bc or np < 4:
+        raise ValueError(f"{name}: not a TFM file")
+    char_info = 24 + lh * 4
+    width_base = char_info + (ec - bc + 1) * 4
+    table = [_fix_word(data, width_base + 4 * i) for i in range(nw)]
+    widths: dict[str, float] = {}
+    for code in range(bc, ec + 1):
+        width_index = data[char_info + 4 * (code - bc)]
+        if width_index:
+            widths[chr(code)] = table[width_index]
+    param_base = width_base + 4 * (nw + nh + nd + ni + nl + nk + ne)
+    # Font parameters: slant, space, space stretch, space shrink, ...
+    space, stretch, shrink = (_fix_word(data, param_base + 4 * i) for i in (1, 2, 3))
+    # The dashes are ligatures in TeX fonts; OT1 keeps them at 123/124, T1 at 21/22.
+    t1 = "ec-" in name or name.startswith(("ec", "t1")) or name.endswith("8t")
+    for char, code in (("–", 21 if t1 else 123), ("—", 22 if t1 else 124)):
+        if chr(code) in widths:
+            widths[char] = widths[chr(code)]
+    return FontMetrics(name=name, widths=widths, space=space, stretch=stretch, shrink=shrink, source="tfm")
+
+
+def _find_tfm(name: str) -> Path | None:
+    kpsewhich = shutil.which("kpsewhich")
+    if not kpsewhich:
+        return None
+    try:
+        found = subprocess.run([kpsewhich, f"{name}.tfm"], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    path = found.stdout.strip()
+    return Path(path) if found.returncode == 0 and path else None
+
+
+@lru_cache(maxsize=32)
+def load_metrics(name: str, bold: bool = False) -> FontMetrics:
+    path = _find_tfm(name)
+    if path is not None:
+        try:
+            return parse_tfm(name, path.read_bytes())
+        except (OSError, ValueError, struct.error):
+            pass
+    return BUILTIN_METRICS["cmbx10" if bold else "cmr10"]
+
+
+def font_names(packages: dict[str, str], size: float) -> tuple[str, str]:
+    design = max((d for d in CM_DESIGN_SIZES if d <= size), default=10)
+    t1 = "T1" in packages.get("fontenc", "")
+    if "lmodern" in packages:
+        prefix = "ec-" if t1 else "rm-"
+        return f"{prefix}lmr{design}", f"{prefix}lmbx{design if design <= 12 else 12}"
+    if {"times", "mathptmx", "newtxtext"} & packages.keys():
+        return ("ptmr8t", "ptmb8t") if t1 else ("ptmr7t", "ptmb7t")
+    if "charter" in packages:
+        return ("bchr8t", "bchb8t") if t1 else ("bchr7t", "bchb7t")
+    if t1:
+        return f"ecrm{design * 100:04d}", f"ecbx{design * 100:04d}"
+    return f"cmr{design}", f"cmbx{design if design <= 12 else 12}"
+
+
+def to_points(raw: str, em: float) -> float | None:
+    match = _LENGTH.match(raw)
+    if not match:
+        return None
+    value, unit = float(match.group(1)), match.group(2)
+    if unit == "em":
+        return value * em
+    if unit == "ex":
+        return value * em * 0.43
+    return value * PT_PER_UNIT[unit]
+
+
+def _options(raw: str | None) -> dict[str, str]:
+    options: dict[str, str] = {}
+    for part in (raw or "").split(","):
+        key, _, value = part.partition("=")
+        if key.strip():
+            options[key.strip()] = value.strip().strip("{}")
+    return options
+
+
+def _macro_body(latex: str, name: str) -> str:
+    pattern = r"\\(?:re)?newcommand\*?\s*\{?\\" + re.escape(name) + r"\}?\s*(?:\[\d\])?\s*(?:\[[^\]]*\])?\s*\{"
+    match = re.search(pattern, latex)
+    if not match:
+        return ""
+    close = matching_brace(latex, match.end() - 1)
+    return latex[match.end() : close] if close > 0 else ""
+
+
+def _vspace(text: str, em: float) -> float:
+    return sum(to_points(raw, em) or 0.0 for raw in _VSPACE.findall(text))
+
+
+def baselineskip(size: float) -> float:
+    return BASELINESKIP.get(size, round(size * 1.2, 2))
+
+
+@dataclass(frozen=True)
+class PageLayout:
+    paper_width: float
+    paper_height: float
+    text_width: float
+    text_height: float
+    font_size: float
+    bullet_size: float
+    bullet_width: float
+    roman: FontMetrics
+    bold: FontMetrics
+    sizes: tuple[float, ...]
+    # Fixed vertical costs (pt) of the template macros, \vspace included.
+    section_height: float
+    entry_heights: tuple[tuple[str, float], ...]
+    item_gap: float
+    item_list_height: float
+
+    def size(self, command: str) -> float:
+        return self.sizes[SIZE_COMMANDS.index(command)]
+
+    def to_dict(self) -> dict:
+        return {
+            "paper": [round(self.paper_width, 1), round(self.paper_height, 1)],
+            "text_width": round(self.text_width, 1),
+            "text_height": round(self.text_height, 1),
+            "font_size": self.font_size,
+            "bullet_size": self.bullet_size,
+            "bullet_width": round(self.bullet_width, 1),
+            "fonts": [self.roman.name, self.bold.name],
+            "metrics": self.roman.source,
+        }
+
+
+def page_layout(latex: str) -> PageLayout:
+    index = index_resume(latex)
+    return _page_layout(latex[: index.preamble_end])
+
+
+@lru_cache(maxsize=32)
+def _page_layout(preamble: str) -> PageLayout:
+    match = _DOCUMENTCLASS.search(preamble)
+    class_options = _options(match.group(1) if match else None)
+    points = next((int(opt[:-2]) for opt in class_options if opt in ("10pt", "11pt", "12pt")), 10)
+    sizes = FONT_SIZES[points]
+    font_size = sizes[SIZE_COMMANDS.index("normalsize")]
+    em = font_size
+    paper = next((PAPERS[opt] for opt in class_options if opt in PAPERS), PAPERS["letterpaper"])
+    paper_width, paper_height = paper
+    bs = baselineskip(font_size)
+
+    # article.cls: 1in margins capped at a readable measure, height a whole number of lines.
+    text_width = min(paper_width - 2 * 72.27, {10: 345.0, 11: 360.0, 12: 390.0}[points])
+    text_height = int((paper_height - 3.5 * 72.27) // bs) * bs + font_size
+
+    packages: dict[str, str] = {}
+    geometry: dict[str, str] = {}
+    for options, names in _USEPACKAGE.findall(preamble):
+        for name in names.split(","):
+            packages[name.strip()] = options
+            if name.strip() == "fullpage":
+                margin = 1.5 * PT_PER_UNIT["cm"] if "cm" in _options(options) else 72.27
+                text_width = paper_width - 2 * margin
+                text_height = paper_height - 2 * margin
+            elif name.strip() == "geometry":
+                geometry.update(_options(options))
+    for options in _GEOMETRY.findall(preamble):
+        geometry.update(_options(options))
+
+    for op, target, raw in _LENGTH_CHANGE.findall(preamble):
+        value = to_points(raw, em)
+        if value is None:
+            continue
+        if target == "textwidth":
+            text_width = value if op == "setlength" else text_width + value
+        else:
+            text_height = value if op == "setlength" else text_height + value
+
+    # geometry applies its settings at \begin{document}, after any \addtolength.
+    if geometry:
+        for key in geometry:
+            if key in PAPERS:
+                paper_width, paper_height = PAPERS[key]
+        if geometry.get("paper") in PAPERS:
+            paper_width, paper_height = PAPERS[geometry["paper"]]
+
+        def length(*keys: str) -> float | None:
+            return next((v for v in (to_points(geometry.get(k, ""), em) for k in keys) if v is not None), None)
+
+        width = length("textwidth", "width")
+        left = length("left", "lmargin", "inner", "hmargin", "margin")
+        right = length("right", "rmargin", "outer", "hmargin", "margin")
+        if width is not None:
+            text_width = width
+        elif left is not None or right is not None:
+            text_width = paper_width - (left if left is not None else right) - (right if right is not None else left)
+        height = length("textheight", "height")
+        top = length("top", "tmargin", "vmargin", "margin")
+        bottom = length("bottom", "bmargin", "vmargin", "margin")
+        if height is not None:
+            text_height = height
+        elif top is not None or bottom is not None:
+            text_height = paper_height - (top if top is not None else bottom) - (bottom if bottom is not None else top)
+
+    # Bullets sit in \resumeItemListStart nested inside \resumeSubHeadingListStart.
+    list_defaults = {"1": 2.5 * em, "2": 2.2 * em}
+    for levels, options in _SETLIST.findall(preamble):
+        margin = _options(options).get("leftmargin")
+        value = em if margin == "*" else to_points(margin or "", em)
+        if value is not None:
+            for level in re.findall(r"\d", levels) or ["1", "2"]:
+                list_defaults[level] = value
+
+    def list_margin(macro: str, level: str) -> float:
+        body = _macro_body(preamble, macro)
+        options = re.search(r"\\begin\{itemize\}\s*\[([^\]]*)\]", body)
+        margin = _options(options.group(1) if options else "").get("leftmargin")
+        value = em if margin == "*" else to_points(margin or "", em)
+        return value if value is not None else list_defaults[level]
+
+    item_body = _macro_body(preamble, "resumeItem")
+    size_match = _SIZE.search(item_body)
+    bullet_size = sizes[SIZE_COMMANDS.index(size_match.group(1))] if size_match else font_size
+    bullet_width = (
+        text_width - list_margin("resumeSubHeadingListStart", "1") - list_margin("resumeItemListStart", "2")
+    )
+
+    roman_name, bold_name = font_names(packages, bullet_size)
+    section_format = re.search(r"\\titleformat\s*\{\\section\}", preamble)
+    section_extra = _vspace(preamble[section_format.end() : section_format.end() + 200], em) if section_format else 0.0
+    entry_rows = {"resumeSubheading": 2, "resumeSubSubheading": 2, "resumeProjectHeading": 1}
+    return PageLayout(
+        paper_width=paper_width,
+        paper_height=paper_height,
+        text_width=text_width,
+        text_height=text_height,
+        font_size=font_size,
+        bullet_size=bullet_size,
+        bullet_width=bullet_width,
+        roman=load_metrics(roman_name),
+        bold=load_metrics(bold_name, bold=True),
+        sizes=sizes,
+        section_height=baselineskip(sizes[SIZE_COMMANDS.index("large")]) + bs + section_extra,
+        entry_heights=tuple(
+            (name, rows * bs + _vspace(_macro_body(preamble, name), em)) for name, rows in entry_rows.items()
+        ),
+        # List spacing from size1x.clo: \itemsep + \parsep between items, \topsep around lists.
+        item_gap=bs / 3 + _vspace(item_body, em),
+        item_list_height=2 * bs / 3
+        + _vspace(_macro_body(preamble, "resumeItemListStart"), em)
+        + _vspace(_macro_body(preamble, "resumeItemListEnd"), em),
+    )
+
+
+def _words(latex: str) -> list[tuple[str, bool]]:
+    # Plain-text words with a bold flag; \href targets and other command names are dropped.
+    text = _HREF.sub("", latex).replace("---", "—").replace("--", "–").replace("~", "\u00a0")
+    text = _ESCAPE.sub(lambda m: "\x00" + m.group(1), text)
+    words: list[tuple[str, bool]] = []
+    current = ""
+    current_bold = False
+    stack: list[bool] = []
+    bold = False
+    pending_bold = False
+    pos = 0
+    while pos < len(text):
+        char = text[pos]
+        if char == "\\":
+            match = _COMMAND.match(text, pos)
+            if match:
+                name = match.group(1)
+                if name in _BOLD_COMMANDS:
+                    if name == "textbf":
+                        pending_bold = True
+                    else:
+                        bold = True
+                pos = match.end()
+                continue
+            pos += 1
+            continue
+        if char == "\x00":
+            char = text[pos + 1] if pos + 1 < len(text) else ""
+            pos += 1
+        elif char == "{":
+            stack.append(bold)
+            bold = bold or pending_bold
+            pending_bold = False
+            pos += 1
+            continue
+        elif char == "}":
+            bold = stack.pop() if stack else False
+            pos += 1
+            continue
+        elif char == "$":
+            pos += 1
+            continue
+        pos += 1
+        if char.isspace() and char != "\u00a0":
+            if current:
+                words.append((current, current_bold))
+                current = ""
+            continue
+        if not current:
+            current_bold = bold
+        current += " " if char == "\u00a0" else char
+    if current:
+        words.append((current, current_bold))
+    return words
+
+
+@dataclass(frozen=True)
+class BulletFit:
+    start: int
+    end: int
+    lines: int
+    # Fraction of the last line in use.
+    last_line: float
+
+
+def bullet_lines(text: str, layout: PageLayout) -> tuple[int, float]:
+    # Greedy line breaking with TeX's interword shrink; hyphenation is not modelled,
+    # so long words push to the next line a little earlier than pdflatex would.
+    size = layout.bullet_size
+    width = layout.bullet_width
+    space = layout.roman.space * size
+    shrink = layout.roman.shrink * size
+    lines = 1
+    used = 0.0
+    gaps = 0
+    for word, bold in _words(text):
+        metrics = layout.bold if bold else layout.roman
+        word_width = metrics.width(word) * size
+        if used == 0.0:
+            used = word_width
+            continue
+        if used + space + word_width - (gaps + 1) * shrink <= width:
+            used += space + word_width
+            gaps += 1
+        else:
+            lines += 1
+            used = word_width
+            gaps = 0
+    return lines, min(1.0, used / width) if width > 0 else 1.0
+
+
+@dataclass(frozen=True)
+class FitEstimate:
+    layout: PageLayout
+    bullets: tuple[BulletFit, ...]
+    height: float
+
+    @property
+    def pages(self) -> float:
+        return self.height / self.layout.text_height if self.layout.text_height > 0 else 0.0
+
+    def lines_at(self, start: int) -> int | None:
+        return next((b.lines for b in self.bullets if b.start == start), None)
+
+    def to_dict(self) -> dict:
+        counts: dict[str, int] = {}
+        for bullet in self.bullets:
+            counts[str(bullet.lines)] = counts.get(str(bullet.lines), 0) + 1
+        return {
+            "pages": round(self.pages, 2),
+            "height_pt": round(self.height, 1),
+            "bullets": len(self.bullets),
+            "bullet_lines": dict(sorted(counts.items())),
+            "layout": self.layout.to_dict(),
+        }
+
+
+def estimate_fit(latex: str) -> FitEstimate:
+    index = index_resume(latex)
+    layout = _page_layout(latex[: index.preamble_end])
+    bullets = []
+    for section in index.sections:
+        for entry in section.entries:
+            for bullet in entry.bullets:
+                lines, last_line = bullet_lines(bullet.text, layout)
+                bullets.append(BulletFit(bullet.start, bullet.end, lines, last_line))
+    return FitEstimate(layout=layout, bullets=tuple(bullets), height=_height(latex, index, layout, bullets))
+
+
+def _height(latex: str, index: ResumeIndex, layout: PageLayout, bullets: list[BulletFit]) -> float:
+    # A line-count model of the page; good to a few lines, which is enough to tell a
+    # comfortable page from one that is about to spill.
+    bs = baselineskip(layout.font_size)
+    bullet_bs = baselineskip(layout.bullet_size)
+    header = latex[index.header_start : index.header_end]
+    header_rows = header.count("\\\\") + 1
+    big = max((layout.size(m) for m in _SIZE.findall(header)), default=layout.font_size)
+    height = (header_rows - 1) * bs + baselineskip(big) + _vspace(header, layout.font_size)
+
+    lines_by_start = {b.start: b.lines for b in bullets}
+    entry_heights = dict(layout.entry_heights)
+    for section in index.sections:
+        height += layout.section_height
+        if not section.entries:
+            body = latex[section.start : section.end]
+            size_match = _SIZE.search(body)
+            size = layout.size(size_match.group(1)) if size_match else layout.font_size
+            height += (body.count("\\\\") + 1) * baselineskip(size) + _vspace(body, layout.font_size)
+            continue
+        height += 2 * bs / 3
+        for entry in section.entries:
+            height += entry_heights.get(entry.command, bs)
+            if entry.bullets:
+                height += layout.item_list_height
+                for bullet in entry.bullets:
+                    height += lines_by_start.get(bullet.start, 1) * bullet_bs + layout.item_gap
+    return height
@@ -1,11 +1,39 @@
 from __future__ import annotations
 
+import hashlib
 import os
-from typing import Optional
+import queue
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional
 
+import httpx
 from openai import BadRequestError
+from openai import DefaultHttpxClient
 from openai import OpenAI
 
+from .cancellation import CancelToken
+from .context import count_tokens
+from .hedging import Attempt, HedgePolicy, LatencyTracker, Target, run_hedged
+from .rate_limit import RateLimiter, parse_limits
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+
+def _abort_response(response: httpx.Response) -> None:
+    # Closing a socket does not wake a thread blocked reading it, so shut it down first;
+    # the reader then fails at once and the provider sees the disconnect.
+    network_stream = response.extensions.get("network_stream")
+    sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    response.close()
+
 
 class LLMClient:
     def __init__(self) -> None:
@@ -16,12 +44,95 @@ class LLMClient:
         self.default_model = os.getenv("OPENAI_MODEL", "gpt-5")
         self.default_gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-        self.client: Optional[OpenAI] = OpenAI(api_key=self.openai_api_key) if self.openai_api_key else None
+        self.client_cache_size = max(1, int(os.getenv("LLM_CLIENT_CACHE_SIZE", "32")))
+        self.client_idle_seconds = float(os.getenv("LLM_CLIENT_IDLE_SECONDS", "900"))
+        # One keep-alive connection pool shared by every provider client.
+        self.http_client = DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10")),
+                keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "90")),
+            )
+        )
+        self._clients: OrderedDict[tuple[str, str, str], tuple[float, OpenAI]] = OrderedDict()
+        self._clients_lock = threading.Lock()
+        self._janitor: Optional[threading.Thread] = None
+        # Retries live in the limiter, so the SDK clients are created with max_retries=0.
+        self.limiter = RateLimiter(
+            request_limits=parse_limits(os.getenv("LLM_RPM_LIMITS", "")),
+            token_limits=parse_limits(os.getenv("LLM_TPM_LIMITS", "")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_SECONDS", "1")),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_SECONDS", "30")),
+            max_wait=float(os.getenv("LLM_LIMITER_MAX_WAIT_SECONDS", "120")),
+            breaker_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            breaker_cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "60")),
+        )
+        self.output_token_estimate = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1500"))
+        self.latency = LatencyTracker(
+            window=int(os.getenv("LLM_LATENCY_WINDOW", "200")),
+            hedge_max_ratio=float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.2")),
+        )
+
+        self.client: Optional[OpenAI] = self.client_for("openai", self.openai_api_key) if self.openai_api_key else None
 
     @property
     def enabled(self) -> bool:
         return self.openai_api_key is not None or self.gemini_api_key is not None
 
+    def client_for(self, provider: str, api_key: str) -> OpenAI:
+        base_url = GEMINI_BASE_URL if provider == "gemini" else ""
+        # Key by a hash so raw API keys are never held as cache keys.
+        cache_key = (provider, base_url, hashlib.sha256(api_key.encode("utf-8")).hexdigest())
+        now = time.monotonic()
+        with self._clients_lock:
+            self._evict_idle_locked(now)
+            entry = self._clients.get(cache_key)
+            if entry is not None:
+                self._clients[cache_key] = (now, entry[1])
+                self._clients.move_to_end(cache_key)
+                return entry[1]
+
+            client = OpenAI(api_key=api_key, base_url=base_url or None, http_client=self.http_client, max_retries=0)
+            self._clients[cache_key] = (now, client)
+            while len(self._clients) > self.client_cache_size:
+                self._clients.popitem(last=False)
+            self._ensure_janitor_locked()
+            return client
+
+    def _evict_idle_locked(self, now: float) -> None:
+        while self._clients:
+            last_used, _ = next(iter(self._clients.values()))
+            if now - last_used < self.client_idle_seconds:
+                break
+            self._clients.popitem(last=False)
+
+    def _ensure_janitor_locked(self) -> None:
+        if self._janitor is not None:
+            return
+
+        def sweep() -> None:
+            while True:
+                time.sleep(max(1.0, self.client_idle_seconds / 4))
+                with self._clients_lock:
+                    self._evict_idle_locked(time.monotonic())
+
+        self._janitor = threading.Thread(target=sweep, name="llm-client-janitor", daemon=True)
+        self._janitor.start()
+
+    def client_stats(self) -> dict:
+        with self._clients_lock:
+            return {"cached_clients": len(self._clients), "max_clients": self.client_cache_size}
+
+    def resolve_target(self, provider_override: str | None = None, model_override: str | None = None) -> tuple[str, str]:
+        provider = (provider_override or self.default_provider or "openai").lower()
+        if provider == "gemini":
+            return provider, model_override or self.default_gemini_model
+        return "openai", model_override or self.default_model
+
+    def has_key(self, provider: str, api_key: str | None = None) -> bool:
+        return bool(api_key or (self.gemini_api_key if provider == "gemini" else self.openai_api_key))
+
     def complete(
         self,
         system_prompt: str,
@@ -29,21 +140,214 @@ class LLMClient:
         api_key_override: str | None = None,
         provider_override: str | None = None,
         model_override: str | None = None,
+        on_delta: Callable[[str], None] | None = None,
+        cancel: CancelToken | None = None,
+        role: str = "",
+    ) -> str:
+        if cancel:
+            cancel.raise_if_cancelled()
+        started = time.monotonic()
+        provider, model = self.resolve_target(provider_override, model_override)
+        active_key = api_key_override or (self.gemini_api_key if provider == "gemini" else self.openai_api_key) or ""
+        key = self.limiter.key_for(provider, active_key, model)
+        reserved = count_tokens(system_prompt) + count_tokens(user_prompt) + self.output_token_estimate
+        emitted = [False]
+
+        def attempt() -> str:
+            return self._complete_once(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                api_key_override=api_key_override,
+                provider_override=provider_override,
+                model_override=model_override,
+                on_delta=on_delta,
+                emitted=emitted,
+                cancel=cancel,
+            )
+
+        # A streamed attempt cannot be retried once text has reached the caller.
+        result = self.limiter.call(key, reserved, attempt, can_retry=lambda: not emitted[0], cancel=cancel)
+        actual = reserved - self.output_token_estimate + count_tokens(result)
+        self.limiter.settle(key, reserved, actual)
+        self.latency.record(role, Target(provider, model), time.monotonic() - started)
+        return result
+
+    def complete_with_policy(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        api_key_override: str | None = None,
+        provider_override: str | None = None,
+        model_override: str | None = None,
+        role: str = "",
+        hedge: HedgePolicy | None = None,
+        fallback: list[Target] | None = None,
+        cancel: CancelToken | None = None,
+        validate: Callable[[str], str] | None = None,
+    ) -> tuple[str, str, Target, list[Attempt]]:
+        provider, model = self.resolve_target(provider_override, model_override)
+        primary = Target(provider, model)
+
+        def key_for(target: Target) -> str | None:
+            # A session key is only ever sent to the provider it was saved for.
+            return api_key_override if target.provider == provider else None
+
+        def usable(targets: list[Target] | tuple[Target, ...]) -> list[Target]:
+            resolved = [Target(t.provider, self.resolve_target(t.provider, t.model)[1]) for t in targets]
+            return [t for t in resolved if t != primary and self.has_key(t.provider, key_for(t))]
+
+        def call(target: Target, token: CancelToken) -> str:
+            return self.complete(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                api_key_override=key_for(target),
+                provider_override=target.provider,
+                model_override=target.model,
+                cancel=token,
+                role=role,
+            )
+
+        hedges = usable(hedge.targets) if hedge else []
+        raw, output, winner, attempts = run_hedged(
+            call,
+            primary,
+            hedges,
+            usable(fallback or []),
+            self.latency.hedge_delay(hedge, role, primary) if hedge else 0.0,
+            self.latency.allow_hedge,
+            cancel,
+            validate,
+        )
+        self.latency.note(role, attempts)
+        return raw, output, winner, attempts
+
+    def limiter_stats(self) -> list[dict]:
+        return self.limiter.stats()
+
+    def _complete_once(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        api_key_override: str | None,
+        provider_override: str | None,
+        model_override: str | None,
+        on_delta: Callable[[str], None] | None,
+        emitted: list[bool],
+        cancel: CancelToken | None = None,
     ) -> str:
+        # Cancellable calls stream when the provider allows it: closing the stream aborts the
+        # request mid-generation, which a blocking call cannot do.
+        if on_delta is not None or cancel is not None:
+            chunks: list[str] = []
+            try:
+                for delta in self.stream(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    api_key_override=api_key_override,
+                    provider_override=provider_override,
+                    model_override=model_override,
+                    cancel=cancel,
+                ):
+                    chunks.append(delta)
+                    if on_delta is not None:
+                        emitted[0] = True
+                        on_delta(delta)
+                return "".join(chunks).strip()
+            except BadRequestError as exc:
+                # Some models and organizations may not stream, and optional params can be rejected;
+                # fall back to one blocking call (which retries without them) if nothing was sent yet.
+                message = str(exc)
+                if chunks or not ("Unsupported parameter" in message or "stream" in message.lower()):
+                    raise
+            if cancel:
+                cancel.raise_if_cancelled()
+
         provider = (provider_override or self.default_provider or "openai").lower()
         if provider == "gemini":
-            return self._complete_gemini(
+            result = self._complete_gemini(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 api_key_override=api_key_override,
                 model_override=model_override,
             )
-        return self._complete_openai(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            api_key_override=api_key_override,
-            model_override=model_override,
-        )
+        else:
+            result = self._complete_openai(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                api_key_override=api_key_override,
+                model_override=model_override,
+            )
+        if cancel:
+            cancel.raise_if_cancelled()
+        if on_delta is not None and result:
+            emitted[0] = True
+            on_delta(result)
+        return result
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        api_key_override: str | None = None,
+        provider_override: str | None = None,
+        model_override: str | None = None,
+        cancel: CancelToken | None = None,
+    ) -> Iterator[str]:
+        provider = (provider_override or self.default_provider or "openai").lower()
+        if provider == "gemini":
+            deltas = self._stream_gemini(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                api_key_override=api_key_override,
+                model_override=model_override,
+                cancel=cancel,
+            )
+        else:
+            deltas = self._stream_openai(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                api_key_override=api_key_override,
+                model_override=model_override,
+                cancel=cancel,
+            )
+        return deltas if cancel is None else self._cancellable(deltas, cancel)
+
+    @staticmethod
+    def _cancellable(deltas: Iterator[str], cancel: CancelToken) -> Iterator[str]:
+        # The provider stream is read on a helper thread so a cancel releases the caller at
+        # once; the provider stream itself aborts its HTTP response from the same cancel.
+        events: queue.Queue[tuple[str, object]] = queue.Queue()
+        stopped = threading.Event()
+        remove = cancel.on_cancel(lambda: events.put(("cancelled", None)))
+
+        def pump() -> None:
+            try:
+                for delta in deltas:
+                    if cancel.cancelled or stopped.is_set():
+                        break
+                    events.put(("delta", delta))
+            except Exception as exc:
+                events.put(("error", exc))
+            else:
+                events.put(("end", None))
+            finally:
+                deltas.close()
+
+        threading.Thread(target=pump, name="llm-stream", daemon=True).start()
+        try:
+            while True:
+                kind, value = events.get()
+                if isinstance(value, BaseException):
+                    raise value
+                if kind == "end":
+                    return
+                if kind == "cancelled":
+                    cancel.raise_if_cancelled()
+                    continue
+                yield str(value)
+        finally:
+            stopped.set()
+            remove()
 
     def _complete_openai(
         self,
@@ -55,7 +359,7 @@ class LLMClient:
         active_key = api_key_override or self.openai_api_key
         if not active_key:
             raise RuntimeError("No OpenAI API key available for OpenAI provider.")
-        active_client = OpenAI(api_key=active_key)
+        active_client = self.client_for("openai", active_key)
         model = model_override or self.default_model
 
         request_payload = {
@@ -93,10 +397,7 @@ class LLMClient:
             raise RuntimeError("No Gemini API key available for Gemini provider.")
 
         model = model_override or self.default_gemini_model
-        gemini_client = OpenAI(
-            api_key=active_key,
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-        )
+        gemini_client = self.client_for("gemini", active_key)
 
         response = gemini_client.chat.completions.create(
             model=model,
@@ -107,3 +408,76 @@ class LLMClient:
         )
         content = response.choices[0].message.content if response.choices else ""
         return (content or "").strip()
+
+    def _stream_openai(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        api_key_override: str | None = None,
+        model_override: str | None = None,
+        cancel: CancelToken | None = None,
+    ) -> Iterator[str]:
+        active_key = api_key_override or self.openai_api_key
+        if not active_key:
+            raise RuntimeError("No OpenAI API key available for OpenAI provider.")
+        active_client = self.client_for("openai", active_key)
+
+        stream = active_client.responses.create(
+            model=model_override or self.default_model,
+            input=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            stream=True,
+        )
+        # Aborting the response from the cancel callback stops generation (and billing) at once,
+        # even while a reasoning model is sending no events.
+        remove = cancel.on_cancel(lambda: _abort_response(stream.response)) if cancel else (lambda: None)
+        try:
+            for event in stream:
+                event_type = getattr(event, "type", "")
+                if event_type == "response.output_text.delta":
+                    delta = getattr(event, "delta", "")
+                    if delta:
+                        yield delta
+                elif event_type in {"response.failed", "error"}:
+                    error = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", "")
+                    raise RuntimeError(f"OpenAI stream failed: {error}")
+        finally:
+            remove()
+            stream.close()
+
+    def _stream_gemini(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        api_key_override: str | None = None,
+        model_override: str | None = None,
+        cancel: CancelToken | None = None,
+    ) -> Iterator[str]:
+        active_key = api_key_override or self.gemini_api_key
+        if not active_key:
+            raise RuntimeError("No Gemini API key available for Gemini provider.")
+        gemini_client = self.client_for("gemini", active_key)
+
+        stream = gemini_client.chat.completions.create(
+            model=model_override or self.default_gemini_model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            stream=True,
+        )
+        # Aborting the response from the cancel callback stops generation (and billing) at once,
+        # even while a reasoning model is sending no events.
+        remove = cancel.on_cancel(lambda: _abort_response(stream.response)) if cancel else (lambda: None)
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            remove()
+            stream.close()
@@ -1,33 +1,59 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import secrets
-import threading
+import time
 import uuid
 import json
 import re
+import zipfile
 from pathlib import Path
+from typing import AsyncIterator
 from urllib.parse import urlencode
 from urllib.request import Request as UrlRequest, urlopen
 
 from fastapi import FastAPI, HTTPException
 from fastapi import Response
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
 from pydantic import BaseModel
 
-from .latex_service import LatexCompileError, compile_resume
+from .artifacts import Artifact, ArtifactStore
+from .batch import ArchiveSink, batch_lane, batch_slug, parse_provider_limits, summarize_batch
+from .cancellation import CancelToken, JobCancelled
+from .job_events import JobChannels
+from .job_queue import JobQueue, QueuedJob, QueueWorkers
+from .job_store import TERMINAL_STATUSES, JobStore
+from .latex_service import CompileCache, CompileResult, FormatCache, LatexCompileError, compile_resume
 from .llm_client import LLMClient
-from .orchestrator import ResumeOrchestrator
-from .prompt_splitter import build_prompt_bundle, extract_workflow_steps_from_text
-from .storage import SessionKeyStore, StateStore
+from .orchestrator import CompiledPdf, PdfCompiler, ResumeOrchestrator
+from .prompt_splitter import PromptBundleCache, extract_workflow_steps_from_text
+from .response_cache import ResponseCache
+from .storage import Database, SessionKeyStore, StateStore
+from .workers import BoundedExecutor, QueueFullError, default_worker_count
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "data")))
 STATE_DB = DATA_DIR / "state.db"
-OUTPUT_PDF = DATA_DIR / "resume-latest.pdf"
+ARTIFACT_DIR = DATA_DIR / "artifacts"
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(512 * 1024 * 1024)))
+COMPILE_CACHE_DIR = DATA_DIR / "compile-cache"
+COMPILE_CACHE_MAX_BYTES = int(os.getenv("LATEX_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+LATEX_FORMAT_DIR = DATA_DIR / "latex-formats"
+LATEX_FORMAT_MAX_BYTES = int(os.getenv("LATEX_FORMAT_MAX_BYTES", str(256 * 1024 * 1024)))
+LATEX_PRECOMPILE_PREAMBLE = os.getenv("LATEX_PRECOMPILE_PREAMBLE", "true").lower() == "true"
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+# Machine-wide cap on queued compiles; the in-process executor (synchronous compiles, PDFs inside
+# tailor jobs) gets an equal share per worker process.
+COMPILE_WORKERS = int(os.getenv("COMPILE_WORKERS", str(default_worker_count())))
+COMPILE_WORKERS_PER_PROCESS = max(1, -(-COMPILE_WORKERS // WEB_CONCURRENCY))
+COMPILE_QUEUE_MAX = int(os.getenv("COMPILE_QUEUE_MAX", "16"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "2"))
+BATCH_PROVIDER_CONCURRENCY = parse_provider_limits(os.getenv("BATCH_PROVIDER_CONCURRENCY", ""))
 PDF_FILENAME = os.getenv("RESUME_PDF_FILENAME", "FirstLastResume.pdf")
 CUSTOM_INSTRUCTIONS_PATH = DATA_DIR / "instructions.custom.md"
 BUNDLED_INSTRUCTIONS_PATH = BASE_DIR / "data" / "instructions.default.md"
@@ -38,10 +64,49 @@ SESSION_COOKIE_NAME = "rts_session"
 SESSION_TTL_HOURS = int(os.getenv("SESSION_TTL_HOURS", "24"))
 COOKIE_SECURE = os.getenv("COOKIE_SECURE", "false").lower() == "true"
 SESSION_SECRET = os.getenv("SESSION_SECRET", "change-me-in-production")
-
-store = StateStore(STATE_DB)
-session_keys = SessionKeyStore(STATE_DB, SESSION_SECRET)
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "300"))
+SESSION_KEY_CACHE_TTL_SECONDS = float(os.getenv("SESSION_KEY_CACHE_TTL_SECONDS", "30"))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", str(24 * 3600)))
+JOB_MAX_FINISHED = int(os.getenv("JOB_MAX_FINISHED", "1000"))
+JOB_CACHE_MAX_ENTRIES = int(os.getenv("JOB_CACHE_MAX_ENTRIES", "256"))
+JOB_SWEEP_INTERVAL_SECONDS = float(os.getenv("JOB_SWEEP_INTERVAL_SECONDS", "300"))
+TAILOR_WORKERS = int(os.getenv("TAILOR_WORKERS", "4"))
+TAILOR_QUEUE_MAX = int(os.getenv("TAILOR_QUEUE_MAX", "100"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+STATE_CACHE_TTL_SECONDS = float(os.getenv("STATE_CACHE_TTL_SECONDS", "5"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+
+db = Database(STATE_DB)
+store = StateStore(db, cache_ttl_seconds=STATE_CACHE_TTL_SECONDS)
+session_keys = SessionKeyStore(db, SESSION_SECRET, cache_ttl_seconds=SESSION_KEY_CACHE_TTL_SECONDS)
+session_keys.start_sweeper(SESSION_SWEEP_INTERVAL_SECONDS)
+job_store = JobStore(db, JOB_TTL_SECONDS, JOB_MAX_FINISHED, JOB_CACHE_MAX_ENTRIES)
+job_store.start_sweeper(JOB_SWEEP_INTERVAL_SECONDS)
 llm = LLMClient()
+artifacts = ArtifactStore(ARTIFACT_DIR, db, ARTIFACT_MAX_BYTES)
+compile_cache = CompileCache(COMPILE_CACHE_DIR, COMPILE_CACHE_MAX_BYTES)
+format_cache = FormatCache(LATEX_FORMAT_DIR, LATEX_FORMAT_MAX_BYTES) if LATEX_PRECOMPILE_PREAMBLE else None
+prompt_cache = PromptBundleCache()
+response_cache = ResponseCache(db, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES)
+job_channels = JobChannels()
+compile_executor = BoundedExecutor("compile", COMPILE_WORKERS_PER_PROCESS, COMPILE_QUEUE_MAX)
+
+
+def _lane_limit(lane: str) -> int | None:
+    if lane == "compile":
+        return max(1, COMPILE_WORKERS)
+    # Batch lanes share one cap per provider across every worker process.
+    if lane.startswith("batch:"):
+        provider = lane.split(":", 1)[1]
+        return max(1, BATCH_PROVIDER_CONCURRENCY.get(provider, BATCH_DEFAULT_CONCURRENCY))
+    return None
+
+
+job_queue = JobQueue(db, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, _lane_limit)
 
 templates = Jinja2Templates(directory=str(BASE_DIR / "app" / "templates"))
 app = FastAPI(title="Resume Tailor Studio")
@@ -51,7 +116,7 @@ app.mount("/static", StaticFiles(directory=str(BASE_DIR / "app" / "static")), na
 @app.middleware("http")
 async def add_no_store_headers(request: Request, call_next):
     response = await call_next(request)
-    if request.url.path.startswith("/api/"):
+    if request.url.path.startswith("/api/") and "cache-control" not in response.headers:
         response.headers["Cache-Control"] = "no-store, max-age=0"
         response.headers["Pragma"] = "no-cache"
     return response
@@ -65,6 +130,18 @@ class TailorRequest(BaseModel):
     job_description: str
     llm_provider: str | None = None
     llm_model: str | None = None
+    bypass_cache: bool = False
+    fit_to_page: bool = False
+
+
+class TailorBatchRequest(BaseModel):
+    job_descriptions: list[str]
+    labels: list[str] | None = None
+    llm_provider: str | None = None
+    llm_model: str | None = None
+    bypass_cache: bool = False
+    include_pdf: bool = False
+    fit_to_page: bool = False
 
 
 class SessionKeyRequest(BaseModel):
@@ -88,20 +165,50 @@ class TailorJobStatus(BaseModel):
     error: str | None = None
     latex: str | None = None
     jd_analysis: str | None = None
+    token_report: list[dict] | None = None
+    pdf_digest: str | None = None
+    pdf_filename: str | None = None
+    pdf_error: str | None = None
+    pdf_pages: int | None = None
+    duration_ms: float | None = None
+    queue_position: int | None = None
+    estimated_wait_seconds: float | None = None
 
 
-JOBS: dict[str, TailorJobStatus] = {}
-JOBS_LOCK = threading.Lock()
+class CompileJobStatus(BaseModel):
+    id: str
+    status: str
+    queue_position: int | None = None
+    error: str | None = None
+    pdf_url: str | None = None
+    cached: bool | None = None
+    precompiled: bool | None = None
+    duration_ms: float | None = None
 
 
 def _set_job(job: TailorJobStatus) -> None:
-    with JOBS_LOCK:
-        JOBS[job.id] = job
+    job_store.save("tailor", job.model_dump())
 
 
 def _get_job(job_id: str) -> TailorJobStatus | None:
-    with JOBS_LOCK:
-        return JOBS.get(job_id)
+    data = job_store.load(job_id, "tailor")
+    return TailorJobStatus(**data) if data else None
+
+
+def _set_compile_job(job: CompileJobStatus) -> None:
+    job_store.save("compile", job.model_dump())
+
+
+def _get_compile_job(job_id: str) -> CompileJobStatus | None:
+    data = job_store.load(job_id, "compile")
+    return CompileJobStatus(**data) if data else None
+
+
+def _get_batch(batch_id: str) -> tuple[dict, list[dict | None]]:
+    batch = job_store.load(batch_id, "batch")
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return batch, [job_store.load(ref["job_id"], "tailor") for ref in batch["items"]]
 
 
 def _load_initial_resume() -> str:
@@ -154,9 +261,14 @@ def _set_session_cookie(response: Response, sid: str) -> None:
     )
 
 
-def _resolve_request_key_and_provider(request: Request, payload: TailorRequest) -> tuple[str | None, str | None]:
-    sid = request.cookies.get(SESSION_COOKIE_NAME)
-    provider = (payload.llm_provider or "").strip().lower() or None
+def _resolve_request_key_and_provider(
+    request: Request, payload: TailorRequest | TailorBatchRequest
+) -> tuple[str | None, str | None]:
+    return _resolve_session_key_and_provider(request.cookies.get(SESSION_COOKIE_NAME), payload.llm_provider)
+
+
+def _resolve_session_key_and_provider(sid: str | None, requested: str | None) -> tuple[str | None, str | None]:
+    provider = (requested or "").strip().lower() or None
     if not sid:
         return None, provider
     record = session_keys.get(sid)
@@ -257,16 +369,33 @@ def _derive_pdf_filename(latex: str) -> str:
     return _safe_pdf_filename(parsed_name)
 
 
-def _get_latest_pdf_filename() -> str:
-    stored = store.get("latest_pdf_filename")
-    return _safe_pdf_filename(stored if stored else None)
+def _get_session_artifact(request: Request) -> Artifact:
+    sid = request.cookies.get(SESSION_COOKIE_NAME)
+    artifact = artifacts.latest(sid) if sid else None
+    if not artifact:
+        raise HTTPException(status_code=404, detail="No compiled PDF available yet.")
+    return artifact
 
 
-def _discover_openai_models(api_key: str) -> list[str]:
-    from openai import OpenAI
+def _artifact_response(request: Request, artifact: Artifact, disposition: str) -> Response:
+    etag = f'"{artifact.digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'{disposition}; filename="{artifact.filename}"',
+    }
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": headers["Cache-Control"]})
+    try:
+        stat_result = os.stat(artifact.path)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="No compiled PDF available yet.") from exc
+    # FileResponse streams from disk and answers Range requests itself.
+    return FileResponse(str(artifact.path), media_type="application/pdf", headers=headers, stat_result=stat_result)
+
 
-    client = OpenAI(api_key=api_key)
-    resp = client.models.list()
+def _discover_openai_models(api_key: str) -> list[str]:
+    resp = llm.client_for("openai", api_key).models.list()
     names: list[str] = []
     for item in getattr(resp, "data", []):
         model_id = getattr(item, "id", None)
@@ -304,8 +433,9 @@ def healthz() -> dict:
 
 
 @app.get("/api/state")
-def get_state() -> dict:
+def get_state(request: Request) -> dict:
     instructions_path, source = _resolve_instructions_path()
+    sid = request.cookies.get(SESSION_COOKIE_NAME)
     return {
         "resume_latex": _load_initial_resume(),
         "instructions_path": str(instructions_path),
@@ -314,10 +444,25 @@ def get_state() -> dict:
         "llm_provider": llm.default_provider,
         "llm_model": llm.default_model,
         "llm_gemini_model": llm.default_gemini_model,
-        "pdf_available": OUTPUT_PDF.exists(),
+        "pdf_available": bool(sid and artifacts.latest(sid)),
+    }
+
+
+@app.get("/api/llm/stats")
+def llm_stats() -> dict:
+    return {
+        "clients": llm.client_stats(),
+        "prompt_cache": prompt_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "latency": llm.latency.stats(),
     }
 
 
+@app.get("/api/llm/limits")
+def llm_limits() -> dict:
+    return {"limits": llm.limiter_stats()}
+
+
 @app.get("/api/session/status")
 def session_status(request: Request) -> dict:
     sid = request.cookies.get(SESSION_COOKIE_NAME)
@@ -399,6 +544,7 @@ def update_instructions(payload: InstructionsUpdate) -> dict:
     CUSTOM_INSTRUCTIONS_PATH.parent.mkdir(parents=True, exist_ok=True)
     CUSTOM_INSTRUCTIONS_PATH.write_text(payload.content, encoding="utf-8")
     store.set("instructions_mode", "custom")
+    prompt_cache.invalidate()
 
     return {
         "ok": True,
@@ -411,6 +557,7 @@ def update_instructions(payload: InstructionsUpdate) -> dict:
 @app.post("/api/instructions/reset")
 def reset_instructions() -> dict:
     store.set("instructions_mode", "default")
+    prompt_cache.invalidate()
     if not DEFAULT_INSTRUCTIONS_PATH.exists():
         raise HTTPException(status_code=400, detail="Default instructions path does not exist.")
     content = DEFAULT_INSTRUCTIONS_PATH.read_text(encoding="utf-8", errors="ignore")
@@ -441,8 +588,8 @@ def _run_tailor_sync(payload: TailorRequest, request: Request) -> dict:
         raise HTTPException(status_code=400, detail="No resume in cache.")
 
     instructions_path = _load_instructions_path()
-    prompts = build_prompt_bundle(instructions_path)
-    orchestrator = ResumeOrchestrator(llm=llm, prompts=prompts)
+    prompts = prompt_cache.get(instructions_path)
+    orchestrator = ResumeOrchestrator(llm=llm, prompts=prompts, response_cache=response_cache)
     api_key, provider = _resolve_request_key_and_provider(request, payload)
 
     try:
@@ -452,6 +599,7 @@ def _run_tailor_sync(payload: TailorRequest, request: Request) -> dict:
             api_key=api_key,
             llm_provider=provider,
             llm_model=payload.llm_model,
+            bypass_cache=payload.bypass_cache,
         )
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"Tailor request failed: {exc}") from exc
@@ -459,6 +607,7 @@ def _run_tailor_sync(payload: TailorRequest, request: Request) -> dict:
     return {
         "latex": result.latex,
         "jd_analysis": result.jd_analysis,
+        "token_report": result.token_report,
         "llm_enabled": llm.enabled,
     }
 
@@ -470,60 +619,213 @@ def start_tailor_job(payload: TailorRequest, request: Request) -> dict:
         raise HTTPException(status_code=400, detail="No resume in cache.")
 
     job_id = str(uuid.uuid4())
-    _set_job(
-        TailorJobStatus(
-            id=job_id,
-            status="running",
-            stage="Queued",
-            progress=0,
-        )
-    )
+    _set_job(TailorJobStatus(id=job_id, status="queued", stage="Queued", progress=0))
+    sid = request.cookies.get(SESSION_COOKIE_NAME)
+    _admit_tailor_jobs([_tailor_task(job_id, "tailor", resume, payload.job_description, payload, sid)], [job_id])
+    return {"job_id": job_id, **_queue_info(job_id)}
 
-    instructions_path = _load_instructions_path()
-    prompts = build_prompt_bundle(instructions_path)
-    orchestrator = ResumeOrchestrator(llm=llm, prompts=prompts)
-    api_key, provider = _resolve_request_key_and_provider(request, payload)
 
-    def worker() -> None:
-        try:
-
-            def on_progress(stage: str, progress: int, jd_analysis: str | None = None) -> None:
-                existing = _get_job(job_id)
-                if not existing:
-                    return
-                existing.stage = stage
-                existing.progress = progress
-                if jd_analysis is not None:
-                    existing.jd_analysis = jd_analysis
-                _set_job(existing)
+def _admit_tailor_jobs(tasks: list[tuple[str, str, str, dict]], record_ids: list[str]) -> None:
+    try:
+        job_queue.enqueue_many(tasks, TAILOR_QUEUE_MAX)
+    except QueueFullError as exc:
+        for record_id in record_ids:
+            job_store.delete(record_id)
+        raise _queue_full_error(exc) from exc
+    tailor_workers.notify()
+
+
+def _queue_info(job_id: str) -> dict:
+    position = job_queue.position(job_id)
+    if position is None:
+        return {}
+    wait = job_queue.estimated_wait(position, job_queue.running("tailor"))
+    return {"queue_position": position, "estimated_wait_seconds": wait}
+
+
+def _tailor_task(
+    job_id: str,
+    lane: str,
+    resume: str,
+    job_description: str,
+    payload: TailorRequest | TailorBatchRequest,
+    session_id: str | None,
+    **extra,
+) -> tuple[str, str, str, dict]:
+    # Only the session id is queued; whichever process claims the job looks the key up itself.
+    return (
+        job_id,
+        "tailor",
+        lane,
+        {
+            "resume": resume,
+            "job_description": job_description,
+            "llm_provider": payload.llm_provider,
+            "llm_model": payload.llm_model,
+            "bypass_cache": payload.bypass_cache,
+            "fit_to_page": payload.fit_to_page,
+            "session_id": session_id,
+            **extra,
+        },
+    )
 
-            result = orchestrator.tailor(
-                current_resume=resume,
-                job_description=payload.job_description,
-                api_key=api_key,
-                llm_provider=provider,
-                llm_model=payload.llm_model,
-                progress_cb=on_progress,
-            )
 
-            existing = _get_job(job_id)
-            if existing:
-                existing.status = "completed"
-                existing.stage = "Completed"
-                existing.progress = 100
-                existing.latex = result.latex
-                existing.jd_analysis = result.jd_analysis
+def _execute_queued_job(queued: QueuedJob, cancel: CancelToken) -> None:
+    existing = _get_job(queued.id)
+    if not existing or existing.status in TERMINAL_STATUSES:
+        # Finished before its worker died, or purged while waiting.
+        return
+    task = queued.payload
+    channel = job_channels.open(queued.id)
+    started = time.monotonic()
+    last_jd_analysis: list[str | None] = [None]
+    try:
+        existing.status = "running"
+        existing.stage = "Starting" if queued.attempts == 1 else f"Retrying (attempt {queued.attempts})"
+        existing.error = None
+        _set_job(existing)
+        channel.publish("progress", {"status": "running", "stage": existing.stage, "progress": existing.progress})
+
+        def on_progress(
+            stage: str,
+            progress: int,
+            jd_analysis: str | None = None,
+            output_delta: str | None = None,
+        ) -> None:
+            if output_delta is not None:
+                channel.publish("output", {"stage": stage, "delta": output_delta})
+                return
+            existing = _get_job(queued.id)
+            if not existing:
+                return
+            existing.stage = stage
+            existing.progress = progress
+            if jd_analysis is not None:
+                existing.jd_analysis = jd_analysis
+            _set_job(existing)
+
+            delta: dict = {"status": existing.status, "stage": stage, "progress": progress}
+            if jd_analysis is not None and jd_analysis != last_jd_analysis[0]:
+                last_jd_analysis[0] = jd_analysis
+                delta["jd_analysis"] = jd_analysis
+            channel.publish("progress", delta)
+
+        prompts = prompt_cache.get(_load_instructions_path())
+        orchestrator = ResumeOrchestrator(
+            llm=llm,
+            prompts=prompts,
+            response_cache=response_cache,
+            compiler=_pdf_compiler(queued.id),
+        )
+        api_key, provider = _resolve_session_key_and_provider(task.get("session_id"), task.get("llm_provider"))
+        result = orchestrator.tailor(
+            current_resume=task["resume"],
+            job_description=task["job_description"],
+            api_key=api_key,
+            llm_provider=provider,
+            llm_model=task.get("llm_model"),
+            progress_cb=on_progress,
+            bypass_cache=bool(task.get("bypass_cache")),
+            cancel=cancel,
+            fit=bool(task.get("fit_to_page")),
+        )
+        cancel.raise_if_cancelled()
+
+        existing = _get_job(queued.id)
+        if existing:
+            if result.pdf is not None:
+                existing.pdf_digest = result.pdf.digest
+                existing.pdf_filename = _derive_pdf_filename(result.latex)
+                existing.pdf_pages = result.pdf.pages
+                if task.get("session_id") and not task.get("batch_id"):
+                    # The preview picks up the fitted PDF without a separate compile.
+                    artifacts.assign(task["session_id"], existing.pdf_digest, existing.pdf_filename)
+            elif result.pdf_error:
+                existing.pdf_error = result.pdf_error
+            elif task.get("include_pdf"):
+                existing.stage = "Compiling PDF"
+                existing.progress = 97
                 _set_job(existing)
-        except Exception as exc:
-            existing = _get_job(job_id)
+                channel.publish("progress", {"status": "running", "stage": existing.stage, "progress": 97})
+                try:
+                    existing.pdf_digest, compiled = compile_executor.submit(
+                        f"{queued.id}-pdf", _compile_pdf_artifact, result.latex
+                    ).result()
+                    existing.pdf_filename = _derive_pdf_filename(result.latex)
+                    existing.pdf_pages = compiled.pages
+                except (LatexCompileError, QueueFullError) as exc:
+                    existing.pdf_error = str(exc)
+            existing.status = "completed"
+            existing.stage = "Completed"
+            existing.progress = 100
+            existing.latex = result.latex
+            existing.jd_analysis = result.jd_analysis
+            existing.token_report = result.token_report
+            existing.duration_ms = round((time.monotonic() - started) * 1000, 1)
+            _set_job(existing)
+            channel.publish("done", existing.model_dump())
+    except Exception as exc:
+        if queued.lease_lost:
+            # Another process owns the job now and will record its outcome.
+            return
+        if isinstance(exc, JobCancelled) or cancel.cancelled:
+            existing = _mark_cancelled(queued.id, round((time.monotonic() - started) * 1000, 1))
             if existing:
-                existing.status = "failed"
-                existing.stage = "Failed"
-                existing.error = str(exc)
-                _set_job(existing)
+                channel.publish("done", existing.model_dump())
+            return
+        existing = _get_job(queued.id)
+        if existing:
+            existing.status = "failed"
+            existing.stage = "Failed"
+            existing.error = str(exc)
+            existing.duration_ms = round((time.monotonic() - started) * 1000, 1)
+            _set_job(existing)
+            channel.publish("done", existing.model_dump())
+    finally:
+        job_channels.close(queued.id)
+        if task.get("batch_id"):
+            try:
+                _batch_summary(task["batch_id"])
+            except HTTPException:
+                pass
+
+
+def _mark_cancelled(job_id: str, duration_ms: float | None = None) -> TailorJobStatus | None:
+    existing = _get_job(job_id)
+    if not existing or existing.status in TERMINAL_STATUSES:
+        return existing
+    existing.status = "cancelled"
+    existing.stage = "Cancelled"
+    existing.duration_ms = duration_ms
+    _set_job(existing)
+    return existing
+
+
+def _finish_lost_jobs(jobs: dict[str, bool]) -> None:
+    # Any process's monitor may expire any kind of job, so both kinds are handled here.
+    for job_id, cancel_requested in jobs.items():
+        if cancel_requested:
+            _mark_cancelled(job_id)
+            continue
+        error = "The worker running this job stopped before it finished."
+        existing = _get_job(job_id)
+        if existing and existing.status not in TERMINAL_STATUSES:
+            existing.status = "failed"
+            existing.stage = "Failed"
+            existing.error = error
+            _set_job(existing)
+            continue
+        compile_job = _get_compile_job(job_id)
+        if compile_job and compile_job.status not in TERMINAL_STATUSES:
+            compile_job.status = "failed"
+            compile_job.error = error
+            _set_compile_job(compile_job)
 
-    threading.Thread(target=worker, daemon=True).start()
-    return {"job_id": job_id}
+
+tailor_workers = QueueWorkers(
+    job_queue, _execute_queued_job, TAILOR_WORKERS, JOB_POLL_SECONDS, _finish_lost_jobs, kinds=("tailor",)
+)
+tailor_workers.start()
 
 
 @app.get("/api/tailor/status/{job_id}")
@@ -531,36 +833,362 @@ def get_tailor_job_status(job_id: str) -> dict:
     job = _get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found.")
-    return job.model_dump()
+    data = job.model_dump()
+    if data["status"] == "queued":
+        data.update(_queue_info(job_id))
+    return data
+
+
+@app.post("/api/tailor/cancel/{job_id}")
+def cancel_tailor_job(job_id: str) -> dict:
+    job = _get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job.status in TERMINAL_STATUSES:
+        return {"job_id": job_id, "status": job.status}
+    outcome = job_queue.request_cancel(job_id)
+    if outcome == "removed":
+        job = _mark_cancelled(job_id) or job
+        return {"job_id": job_id, "status": job.status}
+    if outcome == "signalled":
+        # Local jobs stop now; a job on another process stops on that process's next poll.
+        tailor_workers.cancel(job_id)
+        return {"job_id": job_id, "status": "cancelling"}
+    job = _get_job(job_id) or job
+    return {"job_id": job_id, "status": job.status}
+
+
+async def _job_events(job_id: str) -> AsyncIterator[tuple[str, dict]]:
+    # Live events exist only in the process running the job. Until (unless) it runs here,
+    # follow the shared job record instead.
+    last: dict | None = None
+    idle = 0.0
+    while True:
+        channel = job_channels.get(job_id)
+        if channel:
+            async for item in channel.subscribe(idle_timeout=15.0):
+                yield item
+            return
+        job = await asyncio.to_thread(_get_job, job_id)
+        if not job:
+            return
+        if job.status in TERMINAL_STATUSES:
+            yield "done", job.model_dump()
+            return
+        snapshot = {"status": job.status, "stage": job.stage, "progress": job.progress}
+        if job.status == "queued":
+            snapshot.update(await asyncio.to_thread(_queue_info, job_id))
+        if snapshot != last:
+            last, idle = snapshot, 0.0
+            yield "progress", snapshot
+        elif idle >= 15.0:
+            idle = 0.0
+            yield "ping", {}
+        await asyncio.sleep(JOB_POLL_SECONDS)
+        idle += JOB_POLL_SECONDS
+
+
+async def _require_job(job_id: str) -> None:
+    if not job_channels.get(job_id) and not await asyncio.to_thread(_get_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+
+@app.get("/api/tailor/stream/{job_id}")
+async def stream_tailor_output(job_id: str) -> StreamingResponse:
+    await _require_job(job_id)
+
+    async def lines():
+        async for event, data in _job_events(job_id):
+            if event == "output":
+                yield json.dumps(data) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/api/tailor/events/{job_id}")
+async def tailor_job_events(job_id: str) -> StreamingResponse:
+    await _require_job(job_id)
+
+    async def events():
+        async for event, data in _job_events(job_id):
+            if event == "ping":
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/tailor/batch")
+def start_tailor_batch(payload: TailorBatchRequest, request: Request) -> dict:
+    resume = _load_initial_resume()
+    if not resume.strip():
+        raise HTTPException(status_code=400, detail="No resume in cache.")
+    descriptions = [jd for jd in payload.job_descriptions if jd.strip()]
+    if not descriptions:
+        raise HTTPException(status_code=400, detail="No job descriptions provided.")
+    if len(descriptions) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_ITEMS} job descriptions.")
+
+    sid = request.cookies.get(SESSION_COOKIE_NAME)
+    _, provider = _resolve_request_key_and_provider(request, payload)
+    resolved_provider, _ = llm.resolve_target(provider, payload.llm_model)
+    lane = batch_lane(resolved_provider)
+    batch_id = str(uuid.uuid4())
+
+    labels = payload.labels or []
+    refs = []
+    for idx, jd in enumerate(descriptions):
+        label = labels[idx].strip() if idx < len(labels) and labels[idx].strip() else jd.strip().splitlines()[0][:60]
+        refs.append({"job_id": str(uuid.uuid4()), "label": label})
+        _set_job(TailorJobStatus(id=refs[-1]["job_id"], status="queued", stage="Queued", progress=0))
+    job_store.save(
+        "batch",
+        {
+            "id": batch_id,
+            "status": "running",
+            "provider": resolved_provider,
+            "include_pdf": payload.include_pdf,
+            "items": refs,
+        },
+    )
+    request_payload = payload.model_copy(update={"llm_provider": provider})
+    tasks = [
+        _tailor_task(
+            ref["job_id"], lane, resume, jd, request_payload, sid, batch_id=batch_id, include_pdf=payload.include_pdf
+        )
+        for ref, jd in zip(refs, descriptions)
+    ]
+    # A batch is admitted whole or not at all.
+    _admit_tailor_jobs(tasks, [batch_id, *(ref["job_id"] for ref in refs)])
+    return {"batch_id": batch_id, "total": len(refs), "concurrency": _lane_limit(lane)}
+
+
+def _compile_pdf_artifact(latex: str) -> tuple[str, CompileResult]:
+    staged = artifacts.staging_path()
+    try:
+        result = compile_resume(latex, staged, cache=compile_cache, formats=format_cache)
+        return artifacts.commit(staged), result
+    finally:
+        staged.unlink(missing_ok=True)
+
+
+def _pdf_compiler(job_id: str) -> PdfCompiler:
+    def compile_pdf(latex: str) -> CompiledPdf:
+        digest, result = compile_executor.submit(
+            f"{job_id}-fit-{uuid.uuid4().hex[:8]}", _compile_pdf_artifact, latex
+        ).result()
+        return CompiledPdf(
+            digest=digest,
+            pages=result.pages,
+            overfull_boxes=result.overfull_boxes,
+            cached=result.cached,
+        )
+
+    return compile_pdf
+
+
+def _batch_summary(batch_id: str) -> dict:
+    batch, items = _get_batch(batch_id)
+    summary = summarize_batch(batch, items)
+    if summary["status"] not in ("queued", "running") and batch["status"] not in TERMINAL_STATUSES:
+        # Only now does the batch record become eligible for TTL eviction.
+        job_store.save("batch", {**batch, "status": "completed"})
+    return summary
+
+
+@app.get("/api/tailor/batch/{batch_id}")
+def get_tailor_batch(batch_id: str) -> dict:
+    return _batch_summary(batch_id)
+
+
+@app.get("/api/tailor/batch/{batch_id}/archive")
+def download_tailor_batch(batch_id: str) -> StreamingResponse:
+    batch, _ = _get_batch(batch_id)
+
+    async def archive():
+        # Entries are written as items finish, so the download starts before the batch does.
+        # Waiting happens on the event loop; only the store reads and zip writes use a thread.
+        sink = ArchiveSink()
+        pending = list(enumerate(batch["items"]))
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            while pending:
+                waiting = []
+                for index, ref in pending:
+                    job = await asyncio.to_thread(job_store.load, ref["job_id"], "tailor")
+                    if job and job["status"] not in TERMINAL_STATUSES:
+                        waiting.append((index, ref))
+                        continue
+                    await asyncio.to_thread(_write_batch_entry, zf, batch_slug(ref["label"], index), job)
+                    yield sink.drain()
+                pending = waiting
+                if pending:
+                    await asyncio.sleep(JOB_POLL_SECONDS)
+            summary = await asyncio.to_thread(_batch_summary, batch_id)
+            zf.writestr("manifest.json", json.dumps(summary, indent=2))
+        yield sink.drain()
+
+    return StreamingResponse(
+        archive(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="tailor-batch-{batch_id[:8]}.zip"'},
+    )
+
+
+def _write_batch_entry(zf: zipfile.ZipFile, folder: str, job: dict | None) -> None:
+    job = job or {"error": "Job record expired."}
+    errors = [job.get("error"), job.get("pdf_error")]
+    if job.get("latex") is not None:
+        zf.writestr(f"{folder}/resume.tex", job["latex"])
+    if job.get("pdf_digest"):
+        pdf = artifacts.get(job["pdf_digest"], job.get("pdf_filename") or PDF_FILENAME)
+        if pdf:
+            zf.write(pdf.path, f"{folder}/{pdf.filename}", compress_type=zipfile.ZIP_STORED)
+        else:
+            errors.append("Compiled PDF was evicted from the artifact store.")
+    errors = [e for e in errors if e]
+    if errors:
+        zf.writestr(f"{folder}/error.txt", "\n".join(errors) + "\n")
+
+
+def _run_compile(latex: str, session_id: str) -> CompileResult:
+    staged = artifacts.staging_path()
+    try:
+        result = compile_resume(latex, staged, cache=compile_cache, formats=format_cache)
+        digest = artifacts.commit(staged)
+    finally:
+        staged.unlink(missing_ok=True)
+    artifacts.assign(session_id, digest, _derive_pdf_filename(latex))
+    return result
+
+
+def _queue_full_error(exc: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"{exc} Retry in about {exc.estimated_wait_seconds:.0f}s.",
+        headers={"Retry-After": str(max(1, int(exc.estimated_wait_seconds)))},
+    )
+
+
+def _submit_compile(job_id: str, fn, *args):
+    try:
+        return compile_executor.submit(job_id, fn, *args)
+    except QueueFullError as exc:
+        raise _queue_full_error(exc) from exc
 
 
 @app.post("/api/compile")
-def compile_latex(payload: CompileRequest) -> dict:
+async def compile_latex(payload: CompileRequest, request: Request, response: Response) -> dict:
+    # Kept for compatibility: awaits the queued job without holding a threadpool thread.
+    sid = _get_or_create_session_id(request)
+    _set_session_cookie(response, sid)
+    future = _submit_compile(str(uuid.uuid4()), _run_compile, payload.latex, sid)
     try:
-        compile_resume(payload.latex, OUTPUT_PDF)
+        result = await asyncio.wrap_future(future)
     except LatexCompileError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    store.set("latest_pdf_filename", _derive_pdf_filename(payload.latex))
+    return {
+        "ok": True,
+        "pdf_url": "/api/pdf/latest",
+        "cached": result.cached,
+        "precompiled": result.precompiled,
+        "duration_ms": round(result.duration_ms, 1),
+    }
+
 
-    return {"ok": True, "pdf_url": "/api/pdf/latest"}
+@app.post("/api/compile/start")
+def start_compile_job(payload: CompileRequest, request: Request, response: Response) -> dict:
+    sid = _get_or_create_session_id(request)
+    _set_session_cookie(response, sid)
+    job_id = str(uuid.uuid4())
+    _set_compile_job(CompileJobStatus(id=job_id, status="queued"))
+    # Queued compiles go through the shared queue so every process sees one queue, one
+    # machine-wide concurrency cap, and orphaned jobs get failed by whichever process notices.
+    try:
+        job_queue.enqueue(job_id, "compile", "compile", {"latex": payload.latex, "session_id": sid}, COMPILE_QUEUE_MAX)
+    except QueueFullError as exc:
+        job_store.delete(job_id)
+        raise _queue_full_error(exc) from exc
+    compile_workers.notify()
+    return {"job_id": job_id}
+
+
+def _execute_compile_job(queued: QueuedJob, cancel: CancelToken) -> None:
+    existing = _get_compile_job(queued.id)
+    if not existing or existing.status in TERMINAL_STATUSES:
+        return
+    existing.status = "running"
+    _set_compile_job(existing)
+    try:
+        result = _run_compile(queued.payload["latex"], queued.payload["session_id"])
+    except Exception as exc:
+        existing.status = "failed"
+        existing.error = str(exc)
+    else:
+        existing.status = "completed"
+        existing.pdf_url = "/api/pdf/latest"
+        existing.cached = result.cached
+        existing.precompiled = result.precompiled
+        existing.duration_ms = round(result.duration_ms, 1)
+    if queued.lease_lost:
+        return
+    _set_compile_job(existing)
+
+
+compile_workers = QueueWorkers(
+    job_queue,
+    _execute_compile_job,
+    COMPILE_WORKERS_PER_PROCESS,
+    JOB_POLL_SECONDS,
+    _finish_lost_jobs,
+    kinds=("compile",),
+    name="compile",
+)
+compile_workers.start()
+
+
+@app.get("/api/compile/status/{job_id}")
+def get_compile_job_status(job_id: str) -> dict:
+    job = _get_compile_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    data = job.model_dump()
+    if data["status"] == "queued":
+        data["queue_position"] = job_queue.position(job_id)
+    return data
+
+
+@app.get("/api/jobs/stats")
+def job_stats() -> dict:
+    return {
+        **job_store.stats(),
+        "queue": job_queue.stats(),
+        "workers": tailor_workers.stats(),
+        "compile_workers": compile_workers.stats(),
+    }
+
+
+@app.get("/api/compile/cache")
+def compile_cache_stats() -> dict:
+    return {
+        "pdf_cache": compile_cache.stats(),
+        "format_cache": format_cache.stats() if format_cache else None,
+        "queue": job_queue.stats().get("compile", {"queued": 0, "running": 0, "stale": 0, "limit": COMPILE_WORKERS}),
+        "local_executor": compile_executor.stats(),
+        "artifacts": artifacts.stats(),
+    }
 
 
 @app.get("/api/pdf/latest")
-def latest_pdf() -> FileResponse:
-    if not OUTPUT_PDF.exists():
-        raise HTTPException(status_code=404, detail="No compiled PDF available yet.")
-    safe_name = _get_latest_pdf_filename()
-    return FileResponse(
-        str(OUTPUT_PDF),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'inline; filename="{safe_name}"'},
-    )
+def latest_pdf(request: Request) -> Response:
+    return _artifact_response(request, _get_session_artifact(request), "inline")
 
 
 @app.get("/api/pdf/download")
-def download_pdf() -> FileResponse:
-    if not OUTPUT_PDF.exists():
-        raise HTTPException(status_code=404, detail="No compiled PDF available yet.")
-    safe_name = _get_latest_pdf_filename()
-    return FileResponse(str(OUTPUT_PDF), media_type="application/pdf", filename=safe_name)
+def download_pdf(request: Request) -> Response:
+    return _artifact_response(request, _get_session_artifact(request), "attachment")
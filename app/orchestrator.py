@@ -1,23 +1,90 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import math
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
 from typing import Callable, Optional
 
+from .cancellation import CancelToken, JobCancelled
+from .compliance import check_resume, find_entry, format_violations
+from .context import ContextAssembler, PriorOutput
+from .hedging import Target
+from .latex_edits import EDIT_SCRIPT_INSTRUCTIONS, EditApplyError, apply_edit_script, latex_problems, strip_code_fences
+from .line_fit import baselineskip, estimate_fit
 from .llm_client import LLMClient
-from .prompt_splitter import PromptBundle, WorkflowAgent
+from .prompt_splitter import PromptBundle, WorkflowAgent, render_system_prompt
+from .response_cache import ResponseCache
+from .resume_index import ResumeEntry, index_resume, replace_spans
+
+# (stage, percent, jd_analysis, output_delta); output_delta carries streamed LaTeX text.
+ProgressCallback = Callable[[str, int, Optional[str], Optional[str]], None]
+
+# Sections whose entries "entries" mode rewrites independently.
+ENTRY_SECTIONS = ("experience", "project")
+ENTRY_REWRITE_INSTRUCTIONS = (
+    "Return ONLY the rewritten LaTeX for this single resume entry: keep its heading command first, "
+    "keep the same list structure, and rewrite only what the plan calls for. No other sections or commentary."
+)
+FIT_AGENT = WorkflowAgent(
+    name="Page Fitter",
+    step_text="Fit to page: shorten or drop the bullets named in the fit report so the PDF fits the page limit.",
+    mode="edits",
+    system_prompt=(
+        "Change only what the fit report asks for. Keep every hard lock, the bullet mode and the strongest "
+        "JD-relevant evidence; prefer tightening wording over dropping bullets."
+    ),
+    step_id="fit",
+    inputs=["jd", "resume", "fit"],
+)
+
+
+@dataclass
+class CompiledPdf:
+    digest: str
+    pages: int | None
+    overfull_boxes: int | None = None
+    cached: bool = False
+
+
+PdfCompiler = Callable[[str], CompiledPdf]
 
 
 @dataclass
 class OrchestrationResult:
     latex: str
     jd_analysis: str
+    token_report: list[dict] = field(default_factory=list)
+    pdf: CompiledPdf | None = None
+    pdf_error: str | None = None
 
 
 class ResumeOrchestrator:
-    def __init__(self, llm: LLMClient, prompts: PromptBundle) -> None:
+    def __init__(
+        self,
+        llm: LLMClient,
+        prompts: PromptBundle,
+        max_parallel: int | None = None,
+        response_cache: ResponseCache | None = None,
+        context_budget: int | None = None,
+        entry_parallel: int | None = None,
+        compiler: PdfCompiler | None = None,
+        fit_max_pages: int | None = None,
+        fit_max_rounds: int | None = None,
+    ) -> None:
         self.llm = llm
         self.prompts = prompts
+        self.response_cache = response_cache
+        if context_budget is None:
+            context_budget = int(os.getenv("CONTEXT_MAX_INPUT_TOKENS", "12000"))
+        self.context = ContextAssembler(context_budget)
+        self.max_parallel = max_parallel or int(os.getenv("ORCHESTRATOR_MAX_PARALLEL", "3"))
+        self.entry_parallel = entry_parallel or int(os.getenv("ORCHESTRATOR_ENTRY_PARALLEL", "4"))
+        self.compiler = compiler
+        self.fit_max_pages = fit_max_pages or int(os.getenv("FIT_MAX_PAGES", "1"))
+        self.fit_max_rounds = fit_max_rounds if fit_max_rounds is not None else int(os.getenv("FIT_MAX_ROUNDS", "3"))
 
     def tailor(
         self,
@@ -26,11 +93,19 @@ class ResumeOrchestrator:
         api_key: str | None = None,
         llm_provider: str | None = None,
         llm_model: str | None = None,
-        progress_cb: Optional[Callable[[str, int, Optional[str]], None]] = None,
+        progress_cb: Optional[ProgressCallback] = None,
+        bypass_cache: bool = False,
+        cancel: CancelToken | None = None,
+        fit: bool = False,
     ) -> OrchestrationResult:
-        def update(stage: str, percent: int, jd_analysis: Optional[str] = None) -> None:
+        def update(
+            stage: str,
+            percent: int,
+            jd_analysis: Optional[str] = None,
+            output_delta: Optional[str] = None,
+        ) -> None:
             if progress_cb:
-                progress_cb(stage, percent, jd_analysis)
+                progress_cb(stage, percent, jd_analysis, output_delta)
 
         update("Preparing orchestration", 5)
         if not self.llm.enabled and not api_key:
@@ -49,64 +124,498 @@ class ResumeOrchestrator:
 
         agents = self.prompts.workflow_agents
         total = max(1, len(agents))
+        deps = self._resolve_dependencies(agents)
+        ancestors = self._ancestors(deps)
+        results: dict[int, str] = {}
+        reports: dict[int, dict] = {}
+        reports_lock = threading.Lock()
         jd_analysis = ""
-        final_latex = current_resume
-        artifacts: list[str] = []
-
-        for idx, agent in enumerate(agents, start=1):
-            start_pct = int(5 + ((idx - 1) / total) * 90)
-            end_pct = int(5 + (idx / total) * 90)
-            update(f"{agent.name}: running ({idx}/{total})", start_pct, jd_analysis or None)
-            result = self.llm.complete(
-                system_prompt=self._build_system_prompt(agent),
-                user_prompt=self._build_user_prompt(
-                    agent=agent,
-                    current_resume=current_resume,
-                    job_description=job_description,
-                    artifacts=artifacts,
-                ),
-                api_key_override=api_key,
-                provider_override=llm_provider,
-                model_override=llm_model,
+        completed = 0
+
+        def percent_done() -> int:
+            return int(5 + (completed / total) * 90)
+
+        def run_agent(idx: int) -> str:
+            if cancel:
+                cancel.raise_if_cancelled()
+            agent = agents[idx]
+            stage = f"{agent.name}: running ({idx + 1}/{total})"
+            start_pct = percent_done()
+            update(stage, start_pct, jd_analysis or None)
+
+            prior = sorted(ancestors[idx])
+            prior_outputs = [PriorOutput(agents[j].step_id, agents[j].name, results[j]) for j in prior]
+            agent_resume = next(
+                (results[j] for j in reversed(prior) if agents[j].mode != "json"),
+                current_resume,
             )
-            artifacts.append(f"{agent.name}\n{result}")
 
-            if "jd analyst" in agent.name.lower() or "analyze jd" in agent.step_text.lower():
-                jd_analysis = result
-                update(f"{agent.name}: completed", end_pct, jd_analysis)
+            def stream_delta(delta: str) -> None:
+                update(stage, start_pct, jd_analysis or None, delta)
+
+            on_delta = stream_delta if progress_cb and agent.mode != "json" else None
+
+            violations = None
+            if agent.skip_if_compliant and self.prompts.rules is not None and agent.mode != "json":
+                violations = check_resume(agent_resume, self.prompts.rules, baseline=current_resume)
+                if not violations:
+                    if on_delta:
+                        on_delta(agent_resume)
+                    with reports_lock:
+                        reports[idx] = {
+                            "agent": agent.name,
+                            "output_mode": "skipped",
+                            "compliance": [],
+                            "layout": self._layout_summary(agent_resume),
+                        }
+                    return agent_resume
+                # The guard only needs the resume and what is wrong with it.
+                prior_outputs = [
+                    PriorOutput("compliance", "Local Compliance Violations", format_violations(violations))
+                ]
+                agent = replace(agent, inputs=["resume", "compliance"])
+
+            def generate(
+                step: WorkflowAgent,
+                resume: str,
+                emit: Callable[[str], None] | None,
+                stream: bool,
+                transform: Callable[[str], str] | None = None,
+            ) -> tuple[str, dict]:
+                system_prompt = self._build_system_prompt(step)
+                user_prompt, report = self._build_user_prompt(
+                    agent=step,
+                    current_resume=resume,
+                    job_description=job_description,
+                    prior=prior_outputs,
+                )
+                cache_key = None
+                if self.response_cache is not None and step.cacheable:
+                    provider, model = self.llm.resolve_target(llm_provider, llm_model)
+                    cache_key = self.response_cache.key_for(provider, model, system_prompt, user_prompt)
+                    if not bypass_cache:
+                        cached = self.response_cache.get(cache_key)
+                        if cached is not None:
+                            try:
+                                output = transform(cached) if transform else cached
+                            except EditApplyError:
+                                output = None
+                            if output is not None:
+                                if emit:
+                                    emit(output)
+                                return output, report
+
+                role = step.step_id or step.name
+                if step.hedge or step.fallback:
+                    # Racing attempts cannot share one output stream, so hedged steps emit
+                    # only the winning text.
+                    result, output, winner, attempts = self.llm.complete_with_policy(
+                        system_prompt=system_prompt,
+                        user_prompt=user_prompt,
+                        api_key_override=api_key,
+                        provider_override=llm_provider,
+                        model_override=llm_model,
+                        role=role,
+                        hedge=step.hedge,
+                        fallback=step.fallback,
+                        cancel=cancel,
+                        validate=transform,
+                    )
+                    report["model"] = winner.label
+                    report["attempts"] = [attempt.to_dict() for attempt in attempts]
+                    if cache_key is not None and result and winner != Target(provider, model):
+                        # Lookups are keyed by the primary target, so the winner's answer is stored
+                        # under that key below and under its own key here.
+                        winner_key = self.response_cache.key_for(
+                            winner.provider, winner.model or "", system_prompt, user_prompt
+                        )
+                        self.response_cache.put(winner_key, result, step.cache_ttl_seconds)
+                    stream = False
+                else:
+                    result = self.llm.complete(
+                        system_prompt=system_prompt,
+                        user_prompt=user_prompt,
+                        api_key_override=api_key,
+                        provider_override=llm_provider,
+                        model_override=llm_model,
+                        on_delta=emit if stream else None,
+                        cancel=cancel,
+                        role=role,
+                    )
+                    output = transform(result) if transform else result
+                if cache_key is not None and result:
+                    self.response_cache.put(cache_key, result, step.cache_ttl_seconds)
+                if emit and not stream:
+                    emit(output)
+                return output, report
+
+            def regenerate(reason: str | None = None) -> tuple[str, dict]:
+                full = replace(agent, mode="latex", rendered_system_prompt="")
+                output, report = generate(full, agent_resume, on_delta, stream=True)
+                report["output_mode"] = "latex"
+                if reason:
+                    report["fallback"] = reason
+                return output, report
+
+            def rewrite_entries() -> tuple[str, dict]:
+                index = index_resume(agent_resume)
+                entries = [e for section in index.sections_matching(*ENTRY_SECTIONS) for e in section.entries]
+                if not entries:
+                    return regenerate("no Experience/Projects entries found")
+
+                def rewrite(entry: ResumeEntry) -> tuple[str, dict, str | None]:
+                    original = agent_resume[entry.start : entry.end]
+                    try:
+                        text, report = generate(
+                            agent,
+                            original,
+                            None,
+                            stream=False,
+                            transform=lambda fragment: self._checked_entry(entry, fragment),
+                        )
+                        return text, report, None
+                    except EditApplyError as exc:
+                        return original, {}, str(exc)
+
+                # Entries are independent, so the step takes as long as the slowest one.
+                with ThreadPoolExecutor(max_workers=max(1, min(self.entry_parallel, len(entries)))) as pool:
+                    rewritten = list(pool.map(rewrite, entries))
+                output = replace_spans(
+                    agent_resume,
+                    [(entry.start, entry.end, text) for entry, (text, _, _) in zip(entries, rewritten)],
+                )
+                if on_delta:
+                    on_delta(output)
+                report = {
+                    "agent": agent.name,
+                    "budget": next((r.get("budget", 0) for _, r, _ in rewritten if r), 0),
+                    "total_tokens": sum(r.get("total_tokens", 0) for _, r, _ in rewritten),
+                    "parts": {},
+                    "trimmed": sorted({key for _, r, _ in rewritten for key in r.get("trimmed", [])}),
+                    "output_mode": "entries",
+                    "entries": [
+                        {"title": entry.title, "total_tokens": r.get("total_tokens", 0), "kept_original": error}
+                        for entry, (_, r, error) in zip(entries, rewritten)
+                    ],
+                }
+                return output, report
+
+            if agent.mode == "edits":
+                # Edit scripts are applied to this agent's input resume; if the script
+                # cannot be applied cleanly, regenerate the full document instead.
+                try:
+                    output, report = generate(
+                        agent,
+                        agent_resume,
+                        on_delta,
+                        stream=False,
+                        transform=lambda script: apply_edit_script(agent_resume, script),
+                    )
+                    report["output_mode"] = "edits"
+                except EditApplyError as exc:
+                    output, report = regenerate(str(exc))
+            elif agent.mode == "entries":
+                output, report = rewrite_entries()
             else:
-                update(f"{agent.name}: completed", end_pct, jd_analysis or None)
+                output, report = generate(agent, agent_resume, on_delta, stream=agent.mode == "latex")
+            if violations is not None:
+                report["compliance"] = [{"rule": v.rule, "message": v.message} for v in violations]
+            if agent.mode != "json":
+                report["layout"] = self._layout_summary(output)
+            with reports_lock:
+                reports[idx] = report
+            return output
+
+        pending = set(range(len(agents)))
+        running: dict[Future, int] = {}
+        error: Exception | None = None
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_parallel, total))) as pool:
+            while pending or running:
+                if error is None and cancel and cancel.cancelled:
+                    error = JobCancelled("Job was cancelled.")
+                    pending.clear()
+                if error is None:
+                    # Start every step whose inputs are ready; the pool bounds concurrency.
+                    for idx in sorted(pending):
+                        if all(dep in results for dep in deps[idx]):
+                            pending.discard(idx)
+                            running[pool.submit(run_agent, idx)] = idx
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    idx = running.pop(future)
+                    agent = agents[idx]
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        if error is None:
+                            error = exc
+                        pending.clear()
+                        continue
+                    results[idx] = result
+                    completed += 1
+                    if "jd analyst" in agent.name.lower() or "analyze jd" in agent.step_text.lower():
+                        jd_analysis = result
+                    update(f"{agent.name}: completed", percent_done(), jd_analysis or None)
+        if error is not None:
+            raise error
 
-            if agent.mode == "latex":
-                final_latex = result
-                current_resume = result
+        final_latex = current_resume
+        for idx, agent in enumerate(agents):
+            if agent.mode != "json" and idx in results:
+                final_latex = results[idx]
+
+        if not jd_analysis and results:
+            jd_analysis = results[min(results)]
 
-        if not jd_analysis and artifacts:
-            jd_analysis = artifacts[0]
+        token_report = [reports[idx] for idx in sorted(reports)]
+        pdf = None
+        pdf_error = None
+        if fit and self.compiler is not None:
+            final_latex, pdf, pdf_error, fit_report = self._fit_to_pages(
+                final_latex, job_description, api_key, llm_provider, llm_model, update, cancel
+            )
+            token_report.append(fit_report)
 
         update("Completed", 100)
-        return OrchestrationResult(latex=final_latex, jd_analysis=jd_analysis)
+        return OrchestrationResult(
+            latex=final_latex,
+            jd_analysis=jd_analysis,
+            token_report=token_report,
+            pdf=pdf,
+            pdf_error=pdf_error,
+        )
 
-    def _build_system_prompt(self, agent: WorkflowAgent) -> str:
-        return (
-            f"{self.prompts.global_rules}\n\n"
-            f"You are {agent.name}.\n"
-            f"Workflow step: {agent.step_text}\n"
-            f"{agent.system_prompt}"
+    def _fit_to_pages(
+        self,
+        latex: str,
+        job_description: str,
+        api_key: str | None,
+        llm_provider: str | None,
+        llm_model: str | None,
+        update: Callable[[str, int], None],
+        cancel: CancelToken | None,
+    ) -> tuple[str, CompiledPdf | None, str | None, dict]:
+        # Compile, and while the PDF runs past the page limit ask for targeted trims and
+        # recompile; identical sources come straight from the compile cache.
+        rounds: list[dict] = []
+        report = {"agent": FIT_AGENT.name, "output_mode": "fit", "max_pages": self.fit_max_pages, "rounds": rounds}
+        pdf = None
+        error = None
+        fitted = latex
+        for round_number in range(self.fit_max_rounds + 1):
+            if cancel:
+                cancel.raise_if_cancelled()
+            update("Compiling PDF" if round_number == 0 else f"Recompiling PDF (fit round {round_number})", 96)
+            try:
+                compiled = self.compiler(latex)
+            except JobCancelled:
+                raise
+            except Exception as exc:
+                # A trimmed source that no longer compiles falls back to the last one that did.
+                if rounds:
+                    rounds[-1]["trim_error"] = str(exc)
+                else:
+                    error = str(exc)
+                break
+            pdf = compiled
+            fitted = latex
+            rounds.append({"pages": pdf.pages, "overfull_boxes": pdf.overfull_boxes, "cached": pdf.cached})
+            if pdf.pages is None or pdf.pages <= self.fit_max_pages or round_number == self.fit_max_rounds:
+                break
+            if cancel:
+                cancel.raise_if_cancelled()
+            update(f"Trimming to {self.fit_max_pages} page(s) (round {round_number + 1})", 97)
+            try:
+                trimmed, usage = self._trim_to_fit(
+                    latex, pdf, round_number, job_description, api_key, llm_provider, llm_model, cancel
+                )
+            except JobCancelled:
+                raise
+            except Exception as exc:
+                # The tailored LaTeX is already done; a failed trim keeps it and its PDF.
+                rounds[-1]["trim_error"] = str(exc)
+                break
+            rounds[-1].update(usage)
+            if trimmed == latex:
+                break
+            latex = trimmed
+        latex = fitted
+        report["pages"] = pdf.pages if pdf else None
+        report["fits"] = bool(pdf and pdf.pages is not None and pdf.pages <= self.fit_max_pages)
+        if error:
+            report["error"] = error
+        return latex, pdf, error, report
+
+    def _trim_to_fit(
+        self,
+        latex: str,
+        pdf: CompiledPdf,
+        round_number: int,
+        job_description: str,
+        api_key: str | None,
+        llm_provider: str | None,
+        llm_model: str | None,
+        cancel: CancelToken | None,
+    ) -> tuple[str, dict]:
+        index = index_resume(latex)
+        fit = estimate_fit(latex)
+        layout = fit.layout
+        line = baselineskip(layout.bullet_size)
+        # The estimate says how far over the page the content runs; later rounds ask for more
+        # since the previous trim was evidently not enough.
+        over = fit.height - self.fit_max_pages * layout.text_height
+        needed = max(round_number + 1, math.ceil(over / line) if over > 0 else 1)
+
+        rules = self.prompts.rules
+        locked = [find_entry(index, name) for name in (rules.locked_bullets if rules else [])]
+        lines_at = {bullet.start: bullet for bullet in fit.bullets}
+        candidates = [
+            (lines_at[bullet.start].last_line, bullet.text, lines_at[bullet.start].lines)
+            for section in index.sections
+            for entry in section.entries
+            if entry not in locked
+            for bullet in entry.bullets
+            if bullet.start in lines_at and lines_at[bullet.start].lines > 1
+        ]
+        # A short last line is the cheapest line to win back.
+        candidates.sort()
+        chosen = candidates[:needed]
+        notes = [
+            f"The compiled PDF has {pdf.pages} pages; the limit is {self.fit_max_pages}. "
+            f"Free about {needed} line(s) of vertical space."
+        ]
+        if chosen:
+            notes.append("Shorten each of these bullets just enough to drop its last line:")
+            notes += [
+                f"- ({lines} lines, last line {round(last_line * 100)}% full) {' '.join(text.split())}"
+                for last_line, text, lines in chosen
+            ]
+        if len(chosen) < needed:
+            notes.append(
+                f"Then remove the {needed - len(chosen)} least JD-relevant bullet(s), starting with Projects."
+            )
+        if rules and any(locked):
+            notes.append("Do not edit locked entries: " + ", ".join(rules.locked_bullets) + ".")
+
+        system_prompt = self._build_system_prompt(FIT_AGENT)
+        user_prompt, usage = self._build_user_prompt(
+            agent=FIT_AGENT,
+            current_resume=latex,
+            job_description=job_description,
+            prior=[PriorOutput("fit", "Fit Report", "\n".join(notes))],
+        )
+        script = self.llm.complete(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            api_key_override=api_key,
+            provider_override=llm_provider,
+            model_override=llm_model,
+            cancel=cancel,
+            role=FIT_AGENT.step_id,
         )
+        return apply_edit_script(latex, script), {
+            "requested_lines": needed,
+            "bullets": len(chosen),
+            "total_tokens": usage.get("total_tokens", 0),
+        }
+
+    @staticmethod
+    def _resolve_dependencies(agents: list[WorkflowAgent]) -> list[list[int]]:
+        index_by_id: dict[str, int] = {}
+        for idx, agent in enumerate(agents):
+            if agent.step_id:
+                index_by_id.setdefault(agent.step_id, idx)
+
+        deps: list[list[int]] = []
+        for idx, agent in enumerate(agents):
+            if agent.depends_on is None:
+                deps.append([idx - 1] if idx > 0 else [])
+                continue
+            resolved: set[int] = set()
+            for ref in agent.depends_on:
+                if ref not in index_by_id:
+                    raise ValueError(f"{agent.name} depends on unknown workflow step '{ref}'.")
+                if index_by_id[ref] == idx:
+                    raise ValueError(f"{agent.name} cannot depend on itself.")
+                resolved.add(index_by_id[ref])
+            deps.append(sorted(resolved))
+
+        # Kahn's algorithm: every step must become ready eventually.
+        remaining = {idx: set(d) for idx, d in enumerate(deps)}
+        ready = [idx for idx, d in remaining.items() if not d]
+        seen = 0
+        while ready:
+            current = ready.pop()
+            seen += 1
+            for idx, d in remaining.items():
+                if current in d:
+                    d.discard(current)
+                    if not d:
+                        ready.append(idx)
+        if seen != len(deps):
+            raise ValueError("Workflow depends_on contains a cycle.")
+        return deps
+
+    @staticmethod
+    def _ancestors(deps: list[list[int]]) -> list[set[int]]:
+        memo: dict[int, set[int]] = {}
+
+        def visit(idx: int) -> set[int]:
+            if idx not in memo:
+                found: set[int] = set()
+                for dep in deps[idx]:
+                    found.add(dep)
+                    found |= visit(dep)
+                memo[idx] = found
+            return memo[idx]
+
+        return [visit(idx) for idx in range(len(deps))]
+
+    def _build_system_prompt(self, agent: WorkflowAgent) -> str:
+        return agent.rendered_system_prompt or render_system_prompt(self.prompts.global_rules, agent)
 
     def _build_user_prompt(
         self,
         agent: WorkflowAgent,
         current_resume: str,
         job_description: str,
-        artifacts: list[str],
-    ) -> str:
-        prior = "\n\n".join(artifacts[-4:]) if artifacts else "None"
-        mode_line = "Return ONLY valid JSON." if agent.mode == "json" else "Return ONLY full LaTeX resume code."
-        return (
-            f"{mode_line}\n\n"
-            f"Job Description:\n{job_description}\n\n"
-            f"Current Resume (LaTeX):\n{current_resume}\n\n"
-            f"Prior Agent Outputs:\n{prior}\n"
+        prior: list[PriorOutput],
+    ) -> tuple[str, dict]:
+        resume_label = "Current Resume (LaTeX)"
+        if agent.mode == "edits":
+            mode_line = EDIT_SCRIPT_INSTRUCTIONS
+        elif agent.mode == "entries":
+            mode_line = ENTRY_REWRITE_INSTRUCTIONS
+            resume_label = "Resume Entry (LaTeX)"
+        elif agent.mode == "json":
+            mode_line = "Return ONLY valid JSON."
+        else:
+            mode_line = "Return ONLY full LaTeX resume code."
+        prompt, report = self.context.assemble(
+            agent=agent,
+            mode_line=mode_line,
+            job_description=job_description,
+            current_resume=current_resume,
+            prior=prior,
+            resume_label=resume_label,
         )
+        return prompt, report.to_dict()
+
+    @staticmethod
+    def _layout_summary(latex: str) -> dict:
+        fit = estimate_fit(latex).to_dict()
+        return {"pages": fit["pages"], "bullet_lines": fit["bullet_lines"]}
+
+    @staticmethod
+    def _checked_entry(entry: ResumeEntry, text: str) -> str:
+        fragment = strip_code_fences(text)
+        if not fragment.startswith(f"\\{entry.command}"):
+            raise EditApplyError(f"rewrite of '{entry.title}' does not start with \\{entry.command}")
+        if "\\section" in fragment or "\\begin{document}" in fragment:
+            raise EditApplyError(f"rewrite of '{entry.title}' spans more than one entry")
+        problems = latex_problems(fragment, require_document=False)
+        if problems:
+            raise EditApplyError(f"rewrite of '{entry.title}': " + "; ".join(problems))
+        return fragment
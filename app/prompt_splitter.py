@@ -2,23 +2,68 @@ from __future__ import annotations
 
 import json
 import re
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Literal
 
+from .compliance import ComplianceRules, parse_rules
+from .hedging import HedgePolicy, Target, parse_targets
+
 
 @dataclass
 class WorkflowAgent:
     name: str
     step_text: str
-    mode: Literal["json", "latex"]
+    mode: Literal["json", "latex", "edits", "entries"]
     system_prompt: str
+    step_id: str = ""
+    # None means "after the previous step"; an empty list means no dependencies.
+    depends_on: list[str] | None = None
+    rendered_system_prompt: str = ""
+    cacheable: bool = False
+    cache_ttl_seconds: int | None = None
+    # Context inputs: "jd", "resume", "prior" or step ids of earlier agents. None keeps the default set.
+    inputs: list[str] | None = None
+    max_input_tokens: int | None = None
+    # Optional latency hedge and hard-failure fallback chain for this role's LLM calls.
+    hedge: HedgePolicy | None = None
+    fallback: list[Target] | None = None
+    # Run the local rule checker first and only call the LLM when it finds violations.
+    skip_if_compliant: bool = False
+
+
+def render_system_prompt(global_rules: str, agent: WorkflowAgent) -> str:
+    prompt = (
+        f"{global_rules}\n\n"
+        f"You are {agent.name}.\n"
+        f"Workflow step: {agent.step_text}\n"
+        f"{agent.system_prompt}"
+    )
+    if agent.mode == "edits":
+        prompt += (
+            "\nOutput override: instead of the full LaTeX document, return only the JSON edit script "
+            "described in the user message. Edits must keep the resume compile-ready."
+        )
+    elif agent.mode == "entries":
+        prompt += (
+            "\nOutput override: you are given one Experience or Projects entry at a time. Return only that "
+            "entry's LaTeX; the other sections are assembled separately."
+        )
+    return prompt
 
 
 @dataclass
 class PromptBundle:
     global_rules: str
     workflow_agents: list[WorkflowAgent]
+    rules: ComplianceRules | None = None
+
+    def __post_init__(self) -> None:
+        # Bundles are cached and shared, so render each agent's system prompt once.
+        for agent in self.workflow_agents:
+            agent.rendered_system_prompt = render_system_prompt(self.global_rules, agent)
 
 
 def _clean_text(text: str) -> str:
@@ -78,6 +123,7 @@ def _build_from_structured_config(config: dict) -> PromptBundle | None:
     global_rules = f"HARD LOCKS (NON-NEGOTIABLE):\n{hard_lock_text}" if hard_lock_text else ""
 
     agents: list[WorkflowAgent] = []
+    seen_ids: set[str] = set()
     for idx, step in enumerate(workflow, start=1):
         if not isinstance(step, dict):
             continue
@@ -87,10 +133,33 @@ def _build_from_structured_config(config: dict) -> PromptBundle | None:
         if not isinstance(role_cfg, dict):
             continue
 
+        step_id = str(step.get("id") or role_id or f"step_{idx}").strip()
+        if step_id in seen_ids:
+            step_id = f"{step_id}_{idx}"
+        seen_ids.add(step_id)
+        depends_raw = step.get("depends_on")
+        depends_on: list[str] | None = None
+        if isinstance(depends_raw, str):
+            depends_on = [depends_raw.strip()] if depends_raw.strip() else []
+        elif isinstance(depends_raw, list):
+            depends_on = [str(dep).strip() for dep in depends_raw if str(dep).strip()]
+
         mode_raw = str(role_cfg.get("mode", "json")).strip().lower()
-        mode: Literal["json", "latex"] = "latex" if mode_raw == "latex" else "json"
+        mode: Literal["json", "latex", "edits", "entries"] = (
+            mode_raw if mode_raw in ("latex", "edits", "entries") else "json"
+        )
         role_name = str(role_cfg.get("name", role_id or f"Role {idx}")).strip() or f"Role {idx}"
         role_instruction = str(role_cfg.get("instruction", "")).strip()
+        cache_ttl_raw = role_cfg.get("cache_ttl_seconds")
+        cache_ttl_seconds = int(cache_ttl_raw) if isinstance(cache_ttl_raw, (int, float)) and cache_ttl_raw > 0 else None
+        cacheable = bool(role_cfg.get("cache", False)) or cache_ttl_seconds is not None
+        inputs_raw = role_cfg.get("inputs")
+        inputs = [str(item).strip() for item in inputs_raw if str(item).strip()] if isinstance(inputs_raw, list) else None
+        budget_raw = role_cfg.get("max_input_tokens")
+        max_input_tokens = int(budget_raw) if isinstance(budget_raw, (int, float)) and budget_raw > 0 else None
+        hedge = HedgePolicy.from_config(role_cfg.get("hedge"))
+        fallback = parse_targets(role_cfg.get("fallback")) or None
+        skip_if_compliant = bool(role_cfg.get("skip_if_compliant", False))
         module_ids = role_cfg.get("modules", [])
         module_chunks: list[str] = []
         if isinstance(module_ids, list):
@@ -116,12 +185,25 @@ def _build_from_structured_config(config: dict) -> PromptBundle | None:
                 step_text=step_text,
                 mode=mode,
                 system_prompt=system_prompt or "Execute assigned step using provided constraints.",
+                step_id=step_id,
+                depends_on=depends_on,
+                cacheable=cacheable,
+                cache_ttl_seconds=cache_ttl_seconds,
+                inputs=inputs,
+                max_input_tokens=max_input_tokens,
+                hedge=hedge,
+                fallback=fallback,
+                skip_if_compliant=skip_if_compliant,
             )
         )
 
     if not agents:
         return None
-    return PromptBundle(global_rules=global_rules, workflow_agents=agents)
+    rule_lines = _join_lines(hard_locks).splitlines()
+    for body in modules.values():
+        rule_lines += _join_lines(body).splitlines()
+    rules = parse_rules(rule_lines)
+    return PromptBundle(global_rules=global_rules, workflow_agents=agents, rules=None if rules.empty else rules)
 
 
 def extract_workflow_steps_from_text(text: str) -> list[str]:
@@ -248,3 +330,47 @@ def build_prompt_bundle(instructions_path: Path) -> PromptBundle:
         global_rules=global_rules,
         workflow_agents=agents,
     )
+
+
+class PromptBundleCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[tuple[int, int], PromptBundle, float]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._saved_ms = 0.0
+
+    def get(self, instructions_path: Path) -> PromptBundle:
+        key = str(instructions_path.resolve())
+        stat = instructions_path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == signature:
+                self._hits += 1
+                self._saved_ms += entry[2]
+                return entry[1]
+
+        started = time.perf_counter()
+        bundle = build_prompt_bundle(instructions_path)
+        parse_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._misses += 1
+            self._entries[key] = (signature, bundle, parse_ms)
+        return bundle
+
+    def invalidate(self, instructions_path: Path | None = None) -> None:
+        with self._lock:
+            if instructions_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(instructions_path.resolve()), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "saved_parse_ms": round(self._saved_ms, 2),
+            }
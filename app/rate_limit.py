@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import hashlib
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, TypeVar
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from .cancellation import CancelToken
+
+T = TypeVar("T")
+LimiterKey = tuple[str, str, str]
+
+
+class RateLimitExceeded(RuntimeError):
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_limits(raw: str) -> dict[str, float]:
+    # "openai=500,gemini=15,gemini/gemini-2.5-pro=5"; model entries override the provider.
+    limits: dict[str, float] = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        try:
+            amount = float(value.strip())
+        except ValueError:
+            continue
+        if name and amount > 0:
+            limits[name] = amount
+    return limits
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    millis = headers.get("retry-after-ms")
+    if millis:
+        try:
+            return max(0.0, float(millis) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_quota_exhausted(exc: BaseException) -> bool:
+    # OpenAI reports an exhausted billing quota as a 429 that retrying will not fix.
+    return getattr(exc, "code", None) == "insufficient_quota" or "insufficient_quota" in str(exc)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A request larger than the bucket only waits for a full bucket, then overdraws it.
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def snapshot(self, now: float) -> dict:
+        self._refill(now)
+        return {"available": round(self.tokens, 1), "capacity": self.capacity}
+
+
+@dataclass
+class _KeyState:
+    requests: TokenBucket | None
+    tokens: TokenBucket | None
+    paused_until: float = 0.0
+    failures: int = 0
+    open_until: float = 0.0
+    cooldown: float = 0.0
+    calls: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    last_error: str | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        request_limits: dict[str, float] | None = None,
+        token_limits: dict[str, float] | None = None,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        max_wait: float = 120.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 60.0,
+    ) -> None:
+        self.request_limits = dict(request_limits or {})
+        self.token_limits = dict(token_limits or {})
+        self.max_retries = max(0, max_retries)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+        self.max_wait = max(0.0, max_wait)
+        self.breaker_threshold = max(1, breaker_threshold)
+        self.breaker_cooldown = max(1.0, breaker_cooldown)
+        self._lock = threading.Lock()
+        self._states: dict[LimiterKey, _KeyState] = {}
+
+    @staticmethod
+    def key_for(provider: str, api_key: str, model: str) -> LimiterKey:
+        return (provider, hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16], model)
+
+    def _limit(self, limits: dict[str, float], key: LimiterKey) -> float | None:
+        provider, _, model = key
+        return limits.get(f"{provider}/{model.lower()}") or limits.get(provider)
+
+    def _state(self, key: LimiterKey) -> _KeyState:
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                rpm = self._limit(self.request_limits, key)
+                tpm = self._limit(self.token_limits, key)
+                state = _KeyState(
+                    requests=TokenBucket(rpm) if rpm else None,
+                    tokens=TokenBucket(tpm) if tpm else None,
+                )
+                self._states[key] = state
+            return state
+
+    def acquire(self, key: LimiterKey, tokens: float, cancel: CancelToken | None = None) -> None:
+        state = self._state(key)
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            if cancel:
+                cancel.raise_if_cancelled()
+            with state.lock:
+                now = time.monotonic()
+                if state.open_until > now:
+                    retry_in = state.open_until - now
+                    raise RateLimitExceeded(
+                        f"Rate limit circuit open for {key[0]}/{key[2]} ({state.last_error or 'repeated 429s'}); "
+                        f"retry in {retry_in:.0f}s.",
+                        retry_in,
+                    )
+                wait = max(
+                    state.paused_until - now,
+                    state.requests.wait_time(1, now) if state.requests else 0.0,
+                    state.tokens.wait_time(tokens, now) if state.tokens else 0.0,
+                )
+                if wait <= 0:
+                    if state.requests:
+                        state.requests.take(1)
+                    if state.tokens:
+                        state.tokens.take(tokens)
+                    state.calls += 1
+                    return
+            if now + wait > deadline:
+                raise RateLimitExceeded(
+                    f"Rate limit for {key[0]}/{key[2]} would delay this request by {wait:.0f}s.",
+                    wait,
+                )
+            if cancel:
+                cancel.wait(min(wait, 1.0))
+            else:
+                time.sleep(min(wait, 1.0))
+
+    def settle(self, key: LimiterKey, reserved: float, actual: float) -> None:
+        state = self._state(key)
+        with state.lock:
+            if state.tokens:
+                state.tokens.take(actual - reserved)
+
+    def record_success(self, key: LimiterKey) -> None:
+        state = self._state(key)
+        with state.lock:
+            state.failures = 0
+            state.cooldown = 0.0
+
+    def record_rate_limited(self, key: LimiterKey, retry_after: float | None, exhausted: bool, error: str) -> None:
+        state = self._state(key)
+        with state.lock:
+            now = time.monotonic()
+            state.rate_limited += 1
+            state.failures += 1
+            state.last_error = error[:200]
+            if retry_after:
+                # Every caller sharing the key waits out the provider's Retry-After together.
+                state.paused_until = max(state.paused_until, now + retry_after)
+            if exhausted or state.failures >= self.breaker_threshold:
+                state.cooldown = min(max(self.breaker_cooldown, state.cooldown * 2, retry_after or 0.0), 3600.0)
+                state.open_until = now + state.cooldown
+                state.failures = 0
+
+    def backoff_delay(self, attempt: int, retry_after: float | None) -> float:
+        # Full jitter on the exponential step, but never sooner than the server asked.
+        ceiling = min(self.max_delay, self.base_delay * (2**attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(
+        self,
+        key: LimiterKey,
+        tokens: float,
+        fn: Callable[[], T],
+        can_retry: Callable[[], bool] | None = None,
+        cancel: CancelToken | None = None,
+    ) -> T:
+        state = self._state(key)
+        attempt = 0
+        while True:
+            self.acquire(key, tokens, cancel)
+            try:
+                result = fn()
+            except RateLimitError as exc:
+                retry_after = retry_after_seconds(exc)
+                exhausted = _is_quota_exhausted(exc)
+                self.record_rate_limited(key, retry_after, exhausted, str(exc))
+                if exhausted or attempt >= self.max_retries or (can_retry and not can_retry()):
+                    raise
+                delay = self.backoff_delay(attempt, retry_after)
+            except (InternalServerError, APIConnectionError) as exc:
+                if attempt >= self.max_retries or (can_retry and not can_retry()):
+                    raise
+                delay = self.backoff_delay(attempt, retry_after_seconds(exc))
+            else:
+                self.record_success(key)
+                return result
+            attempt += 1
+            with state.lock:
+                state.retries += 1
+            if cancel:
+                cancel.wait(delay)
+            else:
+                time.sleep(delay)
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            items = list(self._states.items())
+        out: list[dict[str, Any]] = []
+        now = time.monotonic()
+        for (provider, key_hash, model), state in items:
+            with state.lock:
+                open_for = max(0.0, state.open_until - now)
+                out.append(
+                    {
+                        "provider": provider,
+                        "model": model,
+                        "key": key_hash[:8],
+                        "requests": state.requests.snapshot(now) if state.requests else None,
+                        "tokens": state.tokens.snapshot(now) if state.tokens else None,
+                        "paused_for": round(max(0.0, state.paused_until - now), 1),
+                        "breaker": {
+                            "state": "open" if open_for > 0 else ("half_open" if state.cooldown else "closed"),
+                            "retry_in": round(open_for, 1),
+                            "consecutive_429s": state.failures,
+                        },
+                        "calls": state.calls,
+                        "retries": state.retries,
+                        "rate_limited": state.rate_limited,
+                        "last_error": state.last_error,
+                    }
+                )
+        return out
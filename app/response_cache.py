@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .storage import Database
+
+
+class ResponseCache:
+    def __init__(self, db: Database, default_ttl_seconds: int, max_entries: int) -> None:
+        self.db = db
+        self.default_ttl_seconds = max(1, default_ttl_seconds)
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return self.db.connect()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    cache_key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    last_used_at INTEGER NOT NULL,
+                    expires_at INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses (last_used_at)")
+
+    @staticmethod
+    def key_for(provider: str, model: str, system_prompt: str, user_prompt: str) -> str:
+        digest = hashlib.sha256()
+        for part in (provider, model, system_prompt, user_prompt):
+            encoded = part.encode("utf-8")
+            # Length-prefix each part so boundaries cannot collide.
+            digest.update(len(encoded).to_bytes(8, "big"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        now = int(time.time())
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response FROM llm_responses WHERE cache_key = ? AND expires_at > ?",
+                (cache_key, now),
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE llm_responses SET last_used_at = ? WHERE cache_key = ?", (now, cache_key))
+        with self._lock:
+            if row:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return row[0] if row else None
+
+    def put(self, cache_key: str, response: str, ttl_seconds: int | None = None) -> None:
+        now = int(time.time())
+        expires_at = now + max(1, ttl_seconds or self.default_ttl_seconds)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO llm_responses (cache_key, response, created_at, last_used_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    response = excluded.response,
+                    created_at = excluded.created_at,
+                    last_used_at = excluded.last_used_at,
+                    expires_at = excluded.expires_at
+                """,
+                (cache_key, response, now, now, expires_at),
+            )
+            conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+            conn.execute(
+                """
+                DELETE FROM llm_responses WHERE cache_key IN (
+                    SELECT cache_key FROM llm_responses
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": int(entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+_SECTION = re.compile(r"\\section\*?\s*\{")
+_ENTRY = re.compile(r"\\(resumeSubheading|resumeProjectHeading|resumeSubSubheading)\b")
+_BULLET = re.compile(r"\\resumeItem\s*\{")
+_LIST_END = re.compile(r"\\resumeSubHeadingListEnd\b")
+_BEGIN_DOCUMENT = "\\begin{document}"
+_END_DOCUMENT = "\\end{document}"
+_INDEX_CACHE_MAX = 64
+
+
+def matching_brace(text: str, open_idx: int) -> int:
+    depth = 0
+    idx = open_idx
+    while idx < len(text):
+        char = text[idx]
+        if char == "\\":
+            idx += 2
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return idx
+        idx += 1
+    return -1
+
+
+@dataclass(frozen=True)
+class ResumeBullet:
+    start: int
+    end: int
+    text: str
+
+
+@dataclass(frozen=True)
+class ResumeEntry:
+    command: str
+    start: int
+    end: int
+    fields: tuple[str, ...]
+    bullets: tuple[ResumeBullet, ...]
+
+    @property
+    def title(self) -> str:
+        return self.fields[0] if self.fields else self.command
+
+
+@dataclass(frozen=True)
+class ResumeSection:
+    title: str
+    start: int
+    end: int
+    entries: tuple[ResumeEntry, ...] = field(default_factory=tuple)
+
+
+@dataclass(frozen=True)
+class ResumeIndex:
+    digest: str
+    preamble_end: int
+    header_start: int
+    header_end: int
+    sections: tuple[ResumeSection, ...]
+
+    def section(self, name: str) -> ResumeSection | None:
+        wanted = name.strip().lower()
+        return next((s for s in self.sections if s.title.lower() == wanted), None)
+
+    def sections_matching(self, *keywords: str) -> list[ResumeSection]:
+        lowered = [k.lower() for k in keywords]
+        return [s for s in self.sections if any(k in s.title.lower() for k in lowered)]
+
+    def to_dict(self) -> dict:
+        return {
+            "digest": self.digest,
+            "header": [self.header_start, self.header_end],
+            "sections": [
+                {
+                    "title": s.title,
+                    "span": [s.start, s.end],
+                    "entries": [
+                        {
+                            "title": e.title,
+                            "span": [e.start, e.end],
+                            "bullets": [[b.start, b.end] for b in e.bullets],
+                        }
+                        for e in s.entries
+                    ],
+                }
+                for s in self.sections
+            ],
+        }
+
+
+_cache: OrderedDict[str, ResumeIndex] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def resume_digest(latex: str) -> str:
+    return hashlib.sha256(latex.encode("utf-8")).hexdigest()
+
+
+def index_resume(latex: str) -> ResumeIndex:
+    digest = resume_digest(latex)
+    with _cache_lock:
+        cached = _cache.get(digest)
+        if cached is not None:
+            _cache.move_to_end(digest)
+            return cached
+    index = _build_index(latex, digest)
+    with _cache_lock:
+        _cache[digest] = index
+        _cache.move_to_end(digest)
+        while len(_cache) > _INDEX_CACHE_MAX:
+            _cache.popitem(last=False)
+    return index
+
+
+def _strip_comments(latex: str) -> str:
+    # Blank out comments instead of removing them so offsets stay valid.
+    return re.sub(r"(?<!\\)%[^\n]*", lambda m: " " * len(m.group(0)), latex)
+
+
+def _read_groups(text: str, pos: int, limit: int) -> tuple[list[str], int]:
+    groups: list[str] = []
+    while len(groups) < limit:
+        probe = pos
+        while probe < len(text) and text[probe].isspace():
+            probe += 1
+        if probe >= len(text) or text[probe] != "{":
+            break
+        close = matching_brace(text, probe)
+        if close < 0:
+            break
+        groups.append(text[probe + 1 : close])
+        pos = close + 1
+    return groups, pos
+
+
+def _trim_end(text: str, start: int, end: int) -> int:
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return end
+
+
+def _build_index(latex: str, digest: str) -> ResumeIndex:
+    scan = _strip_comments(latex)
+    begin = scan.find(_BEGIN_DOCUMENT)
+    preamble_end = begin + len(_BEGIN_DOCUMENT) if begin >= 0 else 0
+    end_doc = scan.rfind(_END_DOCUMENT)
+    body_end = end_doc if end_doc >= preamble_end else len(latex)
+
+    starts = [m for m in _SECTION.finditer(scan, preamble_end, body_end)]
+    sections: list[ResumeSection] = []
+    for number, match in enumerate(starts):
+        close = matching_brace(scan, match.end() - 1)
+        title = latex[match.end() : close].strip() if close >= 0 else ""
+        start = match.start()
+        end = starts[number + 1].start() if number + 1 < len(starts) else body_end
+        end = _trim_end(latex, start, end)
+        sections.append(ResumeSection(title, start, end, tuple(_entries(latex, scan, start, end))))
+
+    header_end = _trim_end(latex, preamble_end, starts[0].start() if starts else body_end)
+    return ResumeIndex(
+        digest=digest,
+        preamble_end=preamble_end,
+        header_start=preamble_end,
+        header_end=header_end,
+        sections=tuple(sections),
+    )
+
+
+def _entries(latex: str, scan: str, start: int, end: int) -> list[ResumeEntry]:
+    matches = list(_ENTRY.finditer(scan, start, end))
+    list_end = _LIST_END.search(scan, start, end)
+    entries: list[ResumeEntry] = []
+    for number, match in enumerate(matches):
+        stop = matches[number + 1].start() if number + 1 < len(matches) else end
+        if list_end and match.start() < list_end.start() < stop:
+            stop = list_end.start()
+        stop = _trim_end(latex, match.start(), stop)
+        fields, _ = _read_groups(scan, match.end(), 4)
+        bullets: list[ResumeBullet] = []
+        for bullet in _BULLET.finditer(scan, match.end(), stop):
+            close = matching_brace(scan, bullet.end() - 1)
+            if close < 0 or close > stop:
+                continue
+            bullets.append(ResumeBullet(bullet.end(), close, latex[bullet.end() : close]))
+        entries.append(
+            ResumeEntry(
+                command=match.group(1),
+                start=match.start(),
+                end=stop,
+                fields=tuple(" ".join(f.split()) for f in fields),
+                bullets=tuple(bullets),
+            )
+        )
+    return entries
+
+
+def replace_spans(latex: str, replacements: list[tuple[int, int, str]]) -> str:
+    out: list[str] = []
+    cursor = 0
+    for start, end, text in sorted(replacements):
+        if start < cursor:
+            raise ValueError("Replacement spans overlap.")
+        out.append(latex[cursor:start])
+        out.append(text)
+        cursor = end
+    out.append(latex[cursor:])
+    return "".join(out)
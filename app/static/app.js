@@ -1,5 +1,7 @@
 ﻿let activeJobId = null;
 let pollTimer = null;
+let outputStreamAbort = null;
+let jobEvents = null;
 let tailorJobRunning = false;
 let compileRunning = false;
 
@@ -12,6 +14,7 @@ const MODEL_OPTIONS = {
   openai: ["gpt-5", "gpt-5-mini", "gpt-5.2"],
   gemini: ["gemini-2.5-flash", "gemini-2.5-pro"],
 };
+const ROLE_MODES = ["json", "latex", "edits", "entries"];
 
 let builderState = {
   hardLocks: [],
@@ -118,6 +121,8 @@ function setTailorRunning(running) {
   if (!btn) return;
   btn.disabled = tailorJobRunning;
   btn.textContent = tailorJobRunning ? "Tailoring..." : "Run Multi-Agent Tailor";
+  const cancelBtn = document.getElementById("cancelTailorBtn");
+  if (cancelBtn) cancelBtn.disabled = !tailorJobRunning;
 }
 
 function setSessionKeyMeta(hasKey, provider = "") {
@@ -186,22 +191,53 @@ function extractStructuredConfigFromText(content) {
   }
 }
 
+function dependsOnToText(dependsOn) {
+  if (dependsOn == null) return "";
+  const list = Array.isArray(dependsOn) ? dependsOn : [dependsOn];
+  return list.length ? list.map(String).join(", ") : "none";
+}
+
+function normalizeRoleMode(mode) {
+  const value = String(mode || "json").toLowerCase();
+  return ROLE_MODES.includes(value) ? value : "json";
+}
+
+function dependsTextToValue(text) {
+  const trimmed = (text || "").trim();
+  if (!trimmed) return undefined;
+  if (trimmed.toLowerCase() === "none") return [];
+  return trimmed
+    .split(",")
+    .map((x) => x.trim())
+    .filter((x) => x.length > 0);
+}
+
 function normalizeBuilderFromConfig(config) {
   const modules = Object.entries(config.modules || {}).map(([key, value]) => ({
     key,
     rulesText: Array.isArray(value) ? value.join("\n") : String(value || ""),
   }));
 
-  const roles = Object.entries(config.roles || {}).map(([key, value]) => ({
-    key,
-    name: String(value.name || ""),
-    mode: String(value.mode || "json").toLowerCase() === "latex" ? "latex" : "json",
-    modulesText: Array.isArray(value.modules) ? value.modules.join(", ") : "",
-    instruction: String(value.instruction || ""),
-  }));
+  const roles = Object.entries(config.roles || {}).map(([key, value]) => {
+    // Keep settings the builder has no inputs for (cache, inputs, ...) across edits.
+    const { name, mode, modules, instruction, ...extra } = value || {};
+    return {
+      key,
+      name: String(name || ""),
+      mode: normalizeRoleMode(mode),
+      modulesText: Array.isArray(modules) ? modules.join(", ") : "",
+      instruction: String(instruction || ""),
+      extra,
+    };
+  });
 
   const workflow = Array.isArray(config.workflow)
-    ? config.workflow.map((w) => ({ step: String(w.step || ""), role: String(w.role || "") }))
+    ? config.workflow.map((w) => ({
+      step: String(w.step || ""),
+      role: String(w.role || ""),
+      id: String(w.id || ""),
+      dependsText: dependsOnToText(w.depends_on),
+    }))
     : [];
 
   const hardLocks = Array.isArray(config.global_hard_locks) ? config.global_hard_locks.map(String) : [];
@@ -214,7 +250,7 @@ function makeDefaultBuilderFromLegacyText(content) {
     hardLocks: [],
     modules: [],
     roles: [],
-    workflow: legacySteps.map((step) => ({ step, role: "" })),
+    workflow: legacySteps.map((step) => ({ step, role: "", id: "", dependsText: "" })),
   };
 }
 
@@ -234,8 +270,9 @@ function builderToStructuredConfig() {
     const key = (r.key || "").trim();
     if (!key) return;
     roleMap[key] = {
+      ...(r.extra || {}),
       name: (r.name || "").trim() || key,
-      mode: r.mode === "latex" ? "latex" : "json",
+      mode: normalizeRoleMode(r.mode),
       modules: (r.modulesText || "")
         .split(",")
         .map((x) => x.trim())
@@ -245,7 +282,14 @@ function builderToStructuredConfig() {
   });
 
   const workflow = builderState.workflow
-    .map((w) => ({ step: (w.step || "").trim(), role: (w.role || "").trim() }))
+    .map((w) => {
+      const item = { step: (w.step || "").trim(), role: (w.role || "").trim() };
+      const id = (w.id || "").trim();
+      if (id) item.id = id;
+      const dependsOn = dependsTextToValue(w.dependsText);
+      if (dependsOn !== undefined) item.depends_on = dependsOn;
+      return item;
+    })
     .filter((w) => w.step.length > 0);
 
   return {
@@ -330,13 +374,13 @@ function renderBuilder() {
     const rmLabel = document.createElement("label");
     rmLabel.textContent = "Mode";
     const rm = document.createElement("select");
-    ["json", "latex"].forEach((mode) => {
+    ROLE_MODES.forEach((mode) => {
       const opt = document.createElement("option");
       opt.value = mode;
       opt.textContent = mode;
       rm.appendChild(opt);
     });
-    rm.value = r.mode === "latex" ? "latex" : "json";
+    rm.value = normalizeRoleMode(r.mode);
 
     const modsLabel = document.createElement("label");
     modsLabel.textContent = "Modules (comma-separated keys)";
@@ -409,6 +453,18 @@ function renderBuilder() {
     });
     roleSelect.value = w.role || "";
 
+    const idLabel = document.createElement("label");
+    idLabel.textContent = "Step ID (optional, defaults to role key)";
+    const idInput = document.createElement("input");
+    idInput.type = "text";
+    idInput.value = w.id || "";
+
+    const depsLabel = document.createElement("label");
+    depsLabel.textContent = "Depends On (comma-separated step IDs; blank = previous step, none = no dependencies)";
+    const depsInput = document.createElement("input");
+    depsInput.type = "text";
+    depsInput.value = w.dependsText || "";
+
     const row = document.createElement("div");
     row.className = "row compact";
     const del = document.createElement("button");
@@ -418,6 +474,8 @@ function renderBuilder() {
 
     stepInput.addEventListener("input", (e) => { builderState.workflow[idx].step = e.target.value; });
     roleSelect.addEventListener("change", (e) => { builderState.workflow[idx].role = e.target.value; });
+    idInput.addEventListener("input", (e) => { builderState.workflow[idx].id = e.target.value; });
+    depsInput.addEventListener("input", (e) => { builderState.workflow[idx].dependsText = e.target.value; });
     del.addEventListener("click", () => {
       builderState.workflow.splice(idx, 1);
       renderBuilder();
@@ -427,6 +485,10 @@ function renderBuilder() {
     wrap.appendChild(stepInput);
     wrap.appendChild(roleLabel);
     wrap.appendChild(roleSelect);
+    wrap.appendChild(idLabel);
+    wrap.appendChild(idInput);
+    wrap.appendChild(depsLabel);
+    wrap.appendChild(depsInput);
     wrap.appendChild(row);
     workflowRoot.appendChild(wrap);
   });
@@ -535,33 +597,165 @@ function stopPolling() {
   }
 }
 
-async function pollJobStatus() {
-  if (!activeJobId) return;
-  const job = await api(`/api/tailor/status/${activeJobId}`, { method: "GET" });
+function stopOutputStream() {
+  if (outputStreamAbort) {
+    outputStreamAbort.abort();
+    outputStreamAbort = null;
+  }
+}
+
+async function streamTailorOutput(jobId) {
+  stopOutputStream();
+  const controller = new AbortController();
+  outputStreamAbort = controller;
+  const res = await fetch(`/api/tailor/stream/${jobId}`, { signal: controller.signal });
+  if (!res.ok || !res.body) return;
+
+  const output = document.getElementById("latexOutput");
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let currentStage = null;
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.forEach((line) => {
+      if (!line.trim()) return;
+      const event = JSON.parse(line);
+      // Each LaTeX agent streams a full document; start over when the stage changes.
+      if (event.stage !== currentStage) {
+        currentStage = event.stage;
+        output.value = "";
+      }
+      output.value += event.delta || "";
+    });
+  }
+}
+
+function stopJobEvents() {
+  if (jobEvents) {
+    jobEvents.close();
+    jobEvents = null;
+  }
+}
+
+function describeTailorJob(job) {
+  if (job.status === "queued" && job.queue_position) {
+    const wait = job.estimated_wait_seconds ? `, about ${Math.ceil(job.estimated_wait_seconds)}s` : "";
+    return `Tailor job queued (position ${job.queue_position}${wait})...`;
+  }
+  return `Tailor job ${job.status}: ${job.stage}`;
+}
+
+function applyJobStatus(job) {
   setProgress(job.progress, job.stage);
-  setStatus(`Tailor job ${job.status}: ${job.stage}`);
+  setStatus(describeTailorJob(job));
   if (job.jd_analysis) {
     document.getElementById("analysisOutput").value = job.jd_analysis;
   }
 
   if (job.status === "completed") {
+    stopOutputStream();
     document.getElementById("latexOutput").value = job.latex || "";
     document.getElementById("resumeInput").value = job.latex || "";
     stopPolling();
     activeJobId = null;
     setTailorRunning(false);
-    setStatus("Tailoring complete.");
+    if (job.pdf_digest) {
+      refreshPreview();
+      const pages = job.pdf_pages ? ` (${job.pdf_pages} page${job.pdf_pages === 1 ? "" : "s"})` : "";
+      setStatus(`Tailoring complete; PDF ready${pages}.`);
+    } else {
+      setStatus(job.pdf_error ? `Tailoring complete; PDF failed: ${job.pdf_error}` : "Tailoring complete.");
+    }
     return;
   }
 
-  if (job.status === "failed") {
+  if (job.status === "failed" || job.status === "cancelled") {
+    stopOutputStream();
     stopPolling();
     activeJobId = null;
     setTailorRunning(false);
-    setStatus(`Tailoring failed: ${job.error || "Unknown error"}`);
+    setStatus(job.status === "cancelled" ? "Tailoring cancelled." : `Tailoring failed: ${job.error || "Unknown error"}`);
   }
 }
 
+async function cancelTailor() {
+  if (!activeJobId) return;
+  try {
+    const res = await api(`/api/tailor/cancel/${activeJobId}`, { method: "POST" });
+    setStatus(res.status === "cancelling" ? "Cancelling tailor job..." : `Tailor job ${res.status}.`);
+  } catch (err) {
+    setStatus(`Cancel failed: ${err.message}`);
+  }
+}
+
+async function pollJobStatus() {
+  if (!activeJobId) return;
+  const job = await api(`/api/tailor/status/${activeJobId}`, { method: "GET" });
+  applyJobStatus(job);
+}
+
+function startPolling(jobId) {
+  streamTailorOutput(jobId).catch(() => {
+    // Streaming is best effort; polling still delivers the final LaTeX.
+  });
+  pollJobStatus().catch(() => {});
+  pollTimer = setInterval(() => {
+    pollJobStatus().catch((err) => {
+      stopPolling();
+      stopOutputStream();
+      activeJobId = null;
+      setTailorRunning(false);
+      setStatus(`Progress polling failed: ${err.message}`);
+    });
+  }, 1200);
+}
+
+function followJobEvents(jobId) {
+  if (!window.EventSource) {
+    startPolling(jobId);
+    return;
+  }
+
+  const source = new EventSource(`/api/tailor/events/${jobId}`);
+  jobEvents = source;
+  const output = document.getElementById("latexOutput");
+  let outputStage = null;
+  let finished = false;
+
+  source.addEventListener("progress", (e) => {
+    const delta = JSON.parse(e.data);
+    setProgress(delta.progress, delta.stage);
+    setStatus(describeTailorJob(delta));
+    if (delta.jd_analysis) {
+      document.getElementById("analysisOutput").value = delta.jd_analysis;
+    }
+  });
+  source.addEventListener("output", (e) => {
+    const event = JSON.parse(e.data);
+    if (event.stage !== outputStage) {
+      outputStage = event.stage;
+      output.value = "";
+    }
+    output.value += event.delta || "";
+  });
+  source.addEventListener("done", (e) => {
+    finished = true;
+    stopJobEvents();
+    applyJobStatus(JSON.parse(e.data));
+  });
+  source.onerror = () => {
+    if (finished) return;
+    // Server or proxy does not support SSE for this job; fall back to polling.
+    stopJobEvents();
+    if (activeJobId === jobId) startPolling(jobId);
+  };
+}
+
 async function tailorResume() {
   if (tailorJobRunning) {
     setStatus("A tailor job is already running.");
@@ -577,6 +771,8 @@ async function tailorResume() {
   }
 
   stopPolling();
+  stopJobEvents();
+  stopOutputStream();
   setTailorRunning(true);
   setProgress(0, "Queued");
   setStatus("Starting tailor job...");
@@ -587,20 +783,15 @@ async function tailorResume() {
         job_description: jd,
         llm_provider: llmProvider,
         llm_model: llmModel || null,
+        bypass_cache: document.getElementById("bypassCacheInput").checked,
+        fit_to_page: document.getElementById("fitToPageInput").checked,
       }),
     });
 
     activeJobId = start.job_id;
-    await pollJobStatus();
-    pollTimer = setInterval(() => {
-      pollJobStatus().catch((err) => {
-        stopPolling();
-        activeJobId = null;
-        setTailorRunning(false);
-        setStatus(`Progress polling failed: ${err.message}`);
-      });
-    }, 1200);
+    followJobEvents(start.job_id);
   } catch (err) {
+    stopJobEvents();
     stopPolling();
     activeJobId = null;
     setTailorRunning(false);
@@ -608,6 +799,24 @@ async function tailorResume() {
   }
 }
 
+function sleep(ms) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+async function waitForCompileJob(jobId) {
+  while (true) {
+    const job = await api(`/api/compile/status/${jobId}`, { method: "GET" });
+    if (job.status === "completed") return job;
+    if (job.status === "failed") throw new Error(job.error || "Unknown error");
+    if (job.status === "queued" && job.queue_position) {
+      setStatus(`PDF compile queued (position ${job.queue_position})...`);
+    } else {
+      setStatus("Compiling PDF...");
+    }
+    await sleep(500);
+  }
+}
+
 async function compilePdf() {
   if (compileRunning) {
     setStatus("PDF compile is already running.");
@@ -626,12 +835,13 @@ async function compilePdf() {
   compileBtn.textContent = "Compiling...";
   setStatus("Compiling PDF...");
   try {
-    await api("/api/compile", {
+    const start = await api("/api/compile/start", {
       method: "POST",
       body: JSON.stringify({ latex }),
     });
+    const job = await waitForCompileJob(start.job_id);
     refreshPreview();
-    setStatus("Compiled PDF and refreshed preview.");
+    setStatus(job.cached ? "Loaded cached PDF and refreshed preview." : "Compiled PDF and refreshed preview.");
   } catch (err) {
     setStatus(`PDF compile failed: ${err.message}`);
   } finally {
@@ -671,6 +881,7 @@ async function clearSessionKey() {
 function bindEvents() {
   document.getElementById("saveResumeBtn").addEventListener("click", saveResume);
   document.getElementById("tailorBtn").addEventListener("click", tailorResume);
+  document.getElementById("cancelTailorBtn").addEventListener("click", cancelTailor);
   document.getElementById("compileBtn").addEventListener("click", compilePdf);
 
   document.getElementById("saveInstructionsBtn").addEventListener("click", () => {
@@ -690,7 +901,7 @@ function bindEvents() {
     renderBuilder();
   });
   document.getElementById("addWorkflowBtn").addEventListener("click", () => {
-    builderState.workflow.push({ step: "", role: "" });
+    builderState.workflow.push({ step: "", role: "", id: "", dependsText: "" });
     renderBuilder();
   });
 
@@ -2,21 +2,54 @@ from __future__ import annotations
 
 import base64
 import sqlite3
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 
 from cryptography.fernet import Fernet
 
 
-class StateStore:
+class Database:
+    PRAGMAS = (
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA busy_timeout = 5000",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -8000",
+    )
+
     def __init__(self, db_path: Path) -> None:
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # WAL is persistent in the database file, so it only needs to be set once.
+        conn = self.connect()
+        conn.execute("PRAGMA journal_mode = WAL")
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return conn
+
+
+class StateStore:
+    def __init__(self, db: Database, cache_ttl_seconds: float = 5.0) -> None:
+        self.db = db
+        self.db_path = db.db_path
+        self.cache_ttl_seconds = cache_ttl_seconds
+        # key -> (expires_at, version, value). The version lives in SQLite, so a write from
+        # any process invalidates every other process's copy on its next read.
+        self._cache: dict[str, tuple[float, int, Optional[str]]] = {}
+        self._cache_lock = threading.Lock()
         self._init_db()
 
     def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_path)
+        return self.db.connect()
 
     def _init_db(self) -> None:
         with self._connect() as conn:
@@ -25,39 +58,68 @@ class StateStore:
                 CREATE TABLE IF NOT EXISTS state (
                     key TEXT PRIMARY KEY,
                     value TEXT NOT NULL,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    version INTEGER NOT NULL DEFAULT 0
                 )
                 """
             )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(state)")}
+            if "version" not in columns:
+                conn.execute("ALTER TABLE state ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
 
     def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
         with self._connect() as conn:
-            row = conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
-        return row[0] if row else None
+            if cached and cached[0] > now:
+                row = conn.execute("SELECT version FROM state WHERE key = ?", (key,)).fetchone()
+                if (row[0] if row else -1) == cached[1]:
+                    return cached[2]
+            row = conn.execute("SELECT value, version FROM state WHERE key = ?", (key,)).fetchone()
+        value, version = (row[0], row[1]) if row else (None, -1)
+        with self._cache_lock:
+            self._cache[key] = (now + self.cache_ttl_seconds, version, value)
+        return value
 
     def set(self, key: str, value: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(key, None)
         with self._connect() as conn:
             conn.execute(
                 """
-                INSERT INTO state (key, value, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
+                INSERT INTO state (key, value, updated_at, version)
+                VALUES (?, ?, CURRENT_TIMESTAMP, 1)
                 ON CONFLICT(key) DO UPDATE SET
                     value = excluded.value,
-                    updated_at = CURRENT_TIMESTAMP
+                    updated_at = CURRENT_TIMESTAMP,
+                    version = state.version + 1
                 """,
                 (key, value),
             )
 
 
 class SessionKeyStore:
-    def __init__(self, db_path: Path, secret: str) -> None:
-        self.db_path = db_path
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(
+        self,
+        db: Database,
+        secret: str,
+        cache_ttl_seconds: float = 30.0,
+        cache_max_entries: int = 1024,
+    ) -> None:
+        self.db = db
+        self.db_path = db.db_path
         self._cipher = Fernet(self._fernet_key_from_secret(secret))
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_entries = max(1, cache_max_entries)
+        self._cache: OrderedDict[str, tuple[float, str, dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._sweeper_stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
         self._init_db()
 
     def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_path)
+        return self.db.connect()
 
     @staticmethod
     def _fernet_key_from_secret(secret: str) -> bytes:
@@ -78,16 +140,47 @@ class SessionKeyStore:
                 )
                 """
             )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_keys_expires_at ON session_keys (expires_at)")
 
     def cleanup_expired(self) -> None:
         now = int(time.time())
         with self._connect() as conn:
             conn.execute("DELETE FROM session_keys WHERE expires_at <= ?", (now,))
+        with self._cache_lock:
+            for sid in [sid for sid, (_, _, record) in self._cache.items() if record["expires_at"] <= now]:
+                del self._cache[sid]
+
+    def start_sweeper(self, interval_seconds: float) -> None:
+        if self._sweeper is not None:
+            return
+
+        def sweep() -> None:
+            while not self._sweeper_stop.wait(interval_seconds):
+                try:
+                    self.cleanup_expired()
+                except sqlite3.Error:
+                    # Try again next interval; a locked database must not kill the sweeper.
+                    continue
+
+        self._sweeper = threading.Thread(target=sweep, name="session-key-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        self._sweeper_stop.clear()
+
+    def _invalidate(self, session_id: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
 
     def set(self, session_id: str, provider: str, api_key: str, ttl_seconds: int) -> None:
         now = int(time.time())
         expires_at = now + max(60, ttl_seconds)
         encrypted = self._cipher.encrypt(api_key.encode("utf-8")).decode("utf-8")
+        self._invalidate(session_id)
         with self._connect() as conn:
             conn.execute(
                 """
@@ -101,23 +194,41 @@ class SessionKeyStore:
                 """,
                 (session_id, provider, encrypted, expires_at, now),
             )
+        self._invalidate(session_id)
 
     def get(self, session_id: str) -> Optional[dict]:
-        self.cleanup_expired()
+        now = time.time()
         with self._connect() as conn:
             row = conn.execute(
-                "SELECT provider, encrypted_key, expires_at FROM session_keys WHERE session_id = ?",
-                (session_id,),
+                "SELECT provider, encrypted_key, expires_at FROM session_keys WHERE session_id = ? AND expires_at > ?",
+                (session_id, int(now)),
             ).fetchone()
         if not row:
+            self._invalidate(session_id)
             return None
         provider, encrypted_key, expires_at = row
+        # The row is always re-read so a key cleared or replaced by another worker stops working at once;
+        # the cache only saves the decrypt when the stored ciphertext is unchanged.
+        with self._cache_lock:
+            cached = self._cache.get(session_id)
+            if cached and cached[0] > now and cached[1] == encrypted_key:
+                self._cache.move_to_end(session_id)
+                return dict(cached[2])
         try:
             api_key = self._cipher.decrypt(encrypted_key.encode("utf-8")).decode("utf-8")
         except Exception:
             return None
-        return {"provider": provider, "api_key": api_key, "expires_at": int(expires_at)}
+        record = {"provider": provider, "api_key": api_key, "expires_at": int(expires_at)}
+
+        with self._cache_lock:
+            self._cache[session_id] = (min(now + self.cache_ttl_seconds, float(expires_at)), encrypted_key, record)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+        return dict(record)
 
     def clear(self, session_id: str) -> None:
+        self._invalidate(session_id)
         with self._connect() as conn:
             conn.execute("DELETE FROM session_keys WHERE session_id = ?", (session_id,))
+        self._invalidate(session_id)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class QueueFullError(RuntimeError):
+    def __init__(self, message: str, estimated_wait_seconds: float) -> None:
+        super().__init__(message)
+        self.estimated_wait_seconds = estimated_wait_seconds
+
+
+def default_worker_count() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_queue: int) -> None:
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued: deque[str] = deque()
+        self._running = 0
+        self._durations: deque[float] = deque(maxlen=50)
+
+    def submit(self, job_id: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            if len(self._queued) >= self.max_queue and self._running >= self.max_workers:
+                wait = self._estimate_wait_locked(len(self._queued) + 1)
+                raise QueueFullError(f"{self.name} queue is full ({len(self._queued)} waiting).", wait)
+            self._queued.append(job_id)
+
+        def run() -> Any:
+            with self._lock:
+                try:
+                    self._queued.remove(job_id)
+                except ValueError:
+                    pass
+                self._running += 1
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._durations.append(time.monotonic() - started)
+
+        return self._executor.submit(run)
+
+    def position(self, job_id: str) -> int | None:
+        with self._lock:
+            try:
+                return self._queued.index(job_id) + 1
+            except ValueError:
+                return None
+
+    def _estimate_wait_locked(self, position: int) -> float:
+        avg = sum(self._durations) / len(self._durations) if self._durations else 0.0
+        rounds = (position + self.max_workers - 1) // self.max_workers
+        return round(rounds * avg, 1)
+
+    def estimated_wait(self, position: int) -> float:
+        with self._lock:
+            return self._estimate_wait_locked(position)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": len(self._queued),
+                "max_queue": self.max_queue,
+            }
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.storage import Database, StateStore  # noqa: E402
+
+
+def connect_per_call(db_path: Path, key: str) -> None:
+    # What StateStore.get did before the shared connection layer.
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+
+
+def rate(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="StateStore.get reads per second for a resume-sized value.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--value-bytes", type=int, default=12000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        db_path = Path(td) / "state.db"
+        cached = StateStore(Database(db_path), cache_ttl_seconds=60.0)
+        cached.set("current_resume", "x" * args.value_bytes)
+        uncached = StateStore(Database(db_path), cache_ttl_seconds=0.0)
+
+        rows = [
+            ("connect per call", rate(lambda: connect_per_call(db_path, "current_resume"), args.iterations)),
+            ("shared connection", rate(lambda: uncached.get("current_resume"), args.iterations)),
+            ("shared connection + cache", rate(lambda: cached.get("current_resume"), args.iterations)),
+        ]
+    for label, per_second in rows:
+        print(f"{label:<28} {per_second:>10,.0f} reads/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+from collections import Counter
+from pathlib import Path
+
+from app.job_queue import JobQueue, QueueWorkers
+from app.storage import Database
+
+LEASE_SECONDS = 5.0
+
+
+def _queue(db_path: str) -> JobQueue:
+    return JobQueue(Database(Path(db_path)), lease_seconds=LEASE_SECONDS, max_attempts=3)
+
+
+def _serve(db_path: str, log_path: str, job_seconds: float, idle_exit: bool) -> None:
+    queue = _queue(db_path)
+
+    def handler(job, cancel) -> None:
+        with open(log_path, "a") as fh:
+            fh.write(f"start {job.id} {os.getpid()}\n")
+        time.sleep(job_seconds)
+        with open(log_path, "a") as fh:
+            fh.write(f"done {job.id} {os.getpid()}\n")
+
+    workers = QueueWorkers(queue, handler, concurrency=3, poll_seconds=0.05)
+    workers.start()
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        if idle_exit and not queue.stats():
+            break
+    workers.stop()
+
+
+def _spawn(*args) -> multiprocessing.Process:
+    process = multiprocessing.get_context("spawn").Process(target=_serve, args=args, daemon=True)
+    process.start()
+    return process
+
+
+def _log(log_path: Path) -> list[tuple[str, str, str]]:
+    if not log_path.exists():
+        return []
+    return [tuple(line.split()) for line in log_path.read_text().splitlines()]
+
+
+def test_worker_processes_run_every_job_exactly_once(tmp_path: Path) -> None:
+    db_path, log_path = str(tmp_path / "queue.db"), tmp_path / "runs.log"
+    queue = _queue(db_path)
+    queue.enqueue_many([(f"job-{i}", "tailor", "tailor", {"n": i}) for i in range(60)])
+
+    processes = [_spawn(db_path, str(log_path), 0.05, True) for _ in range(3)]
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    entries = _log(log_path)
+    done = Counter(job_id for event, job_id, _ in entries if event == "done")
+    assert done == {f"job-{i}": 1 for i in range(60)}
+    assert len({pid for _, _, pid in entries}) > 1
+    assert queue.stats() == {}
+
+
+def test_job_of_a_killed_worker_is_reclaimed_by_another(tmp_path: Path) -> None:
+    db_path, log_path = str(tmp_path / "queue.db"), tmp_path / "runs.log"
+    queue = _queue(db_path)
+    queue.enqueue("job-lost", "tailor", "tailor", {})
+
+    crashed = _spawn(db_path, str(log_path), 60.0, False)
+    deadline = time.monotonic() + 30
+    while not _log(log_path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _log(log_path), "first worker never started the job"
+    crashed.kill()
+    crashed.join(5)
+
+    survivor = _spawn(db_path, str(log_path), 0.05, True)
+    survivor.join(60)
+    assert survivor.exitcode == 0
+
+    entries = _log(log_path)
+    assert [(event, job_id) for event, job_id, _ in entries] == [
+        ("start", "job-lost"),
+        ("start", "job-lost"),
+        ("done", "job-lost"),
+    ]
+    assert entries[0][2] == str(crashed.pid)
+    assert entries[2][2] == str(survivor.pid)
+    assert queue.stats() == {}
+
+
+def test_worker_stops_a_job_whose_lease_was_taken_over(tmp_path: Path) -> None:
+    queue = _queue(str(tmp_path / "queue.db"))
+    queue.enqueue("job-stolen", "tailor", "tailor", {})
+    started, outcome = [], []
+
+    def handler(job, cancel) -> None:
+        started.append(job.id)
+        outcome.append("cancelled" if cancel.wait(30) else "finished")
+        outcome.append(job.lease_lost)
+
+    workers = QueueWorkers(queue, handler, concurrency=1, poll_seconds=0.05)
+    workers.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not started and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with queue._connect() as conn:
+            conn.execute("UPDATE job_queue SET worker_id = 'other-process', lease_expires_at = ?", (time.time() + 60,))
+        deadline = time.monotonic() + LEASE_SECONDS
+        while len(outcome) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        workers.stop()
+
+    assert outcome == ["cancelled", True]
+    # The new owner's lease row is left alone.
+    assert queue.stats()["tailor"]["running"] == 1
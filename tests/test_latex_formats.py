@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import statistics
+from pathlib import Path
+
+import pytest
+
+from app.latex_service import FormatCache, _find_engine, compile_resume
+
+RUNS = 3
+
+RESUME = r"""\documentclass[11pt]{article}
+\usepackage[margin=0.7in]{geometry}
+\usepackage[T1]{fontenc}
+\usepackage{enumitem}
+\usepackage{titlesec}
+\usepackage{xcolor}
+\usepackage[hidelinks]{hyperref}
+\titleformat{\section}{\large\bfseries}{}{0em}{}[\titlerule]
+\begin{document}
+\begin{center}{\LARGE Jane Doe}\\ \href{mailto:jane@example.com}{jane@example.com}\end{center}
+\section{Experience}
+\begin{itemize}[leftmargin=*]
+\item Cut p95 latency of the billing API by 40\% by batching ledger writes.
+\item Led the migration of 30 services to a shared deployment pipeline.
+\end{itemize}
+\end{document}
+"""
+
+
+@pytest.mark.skipif(_find_engine() != "pdflatex", reason="precompiled formats need pdflatex")
+def test_cached_format_makes_compiles_faster(tmp_path: Path) -> None:
+    cold = [compile_resume(RESUME, tmp_path / f"cold-{i}.pdf") for i in range(RUNS)]
+
+    formats = FormatCache(tmp_path / "formats", 64 * 1024 * 1024)
+    first = compile_resume(RESUME, tmp_path / "build.pdf", formats=formats)
+    warm = [compile_resume(RESUME, tmp_path / f"warm-{i}.pdf", formats=formats) for i in range(RUNS)]
+
+    assert first.precompiled
+    assert all(result.precompiled for result in warm)
+    assert all(result.pages == 1 for result in cold + warm)
+    cold_ms = statistics.median(result.duration_ms for result in cold)
+    warm_ms = statistics.median(result.duration_ms for result in warm)
+    print(f"cold {cold_ms:.0f} ms, warm {warm_ms:.0f} ms, speedup {cold_ms / warm_ms:.2f}x")
+    assert warm_ms < cold_ms
+    assert formats.stats()["warm_compiles"] == RUNS
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from app.cancellation import CancelToken, JobCancelled
+from app.llm_client import LLMClient
+
+
+class StallingSSEServer:
+    # Sends one text delta, then only SSE comments (like a reasoning model thinking) until the client hangs up.
+    def __init__(self) -> None:
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        self.disconnected_at: float | None = None
+        self.done = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self) -> None:
+        conn, _ = self.sock.accept()
+        with conn:
+            data = b""
+            while b"\r\n\r\n" not in data:
+                data += conn.recv(65536)
+            head, _, body = data.partition(b"\r\n\r\n")
+            length = int(next(
+                line.split(b":")[1] for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")
+            ))
+            while len(body) < length:
+                body += conn.recv(65536)
+            event = {"type": "response.output_text.delta", "delta": "Hello", "item_id": "i", "output_index": 0,
+                     "content_index": 0, "sequence_number": 0}
+            conn.sendall(self._chunk(
+                "HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\ntransfer-encoding: chunked\r\n\r\n",
+                f"event: response.output_text.delta\ndata: {json.dumps(event)}\n\n",
+            ))
+            try:
+                for _ in range(200):
+                    time.sleep(0.05)
+                    conn.sendall(self._chunk("", ": thinking\n\n"))
+            except OSError:
+                self.disconnected_at = time.monotonic()
+            self.done.set()
+
+    @staticmethod
+    def _chunk(prefix: str, text: str) -> bytes:
+        payload = text.encode("utf-8")
+        return prefix.encode("utf-8") + f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n"
+
+
+def test_cancel_closes_stream_without_waiting_for_next_event(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = StallingSSEServer()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.port}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    client = LLMClient()
+    cancel = CancelToken()
+
+    deltas = client.stream("system", "user", cancel=cancel)
+    assert next(deltas) == "Hello"
+    cancelled_at = time.monotonic()
+    cancel.cancel()
+    with pytest.raises(JobCancelled):
+        next(deltas)
+    assert time.monotonic() - cancelled_at < 0.5
+
+    assert server.done.wait(5)
+    assert server.disconnected_at is not None
+    assert server.disconnected_at - cancelled_at < 1.0
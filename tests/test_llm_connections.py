@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app.llm_client as llm_client
+from app.cancellation import CancelToken
+from app.llm_client import LLMClient
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections: list[tuple[str, int]] = []
+    streamed: list[bool] = []
+    reject_stream = False
+
+    def setup(self) -> None:
+        super().setup()
+        self.connections.append(self.client_address)
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        self.streamed.append(bool(body.get("stream")))
+        if body.get("stream") and self.reject_stream:
+            error = {"error": {"message": "Unsupported parameter: 'stream' is not supported with this model.",
+                               "type": "invalid_request_error", "param": "stream", "code": "unsupported_parameter"}}
+            self._send(400, json.dumps(error).encode("utf-8"))
+            return
+        payload = json.dumps({
+            "id": "c",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+        }).encode("utf-8")
+        self._send(200, payload)
+
+    def _send(self, status: int, payload: bytes) -> None:
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    ChatHandler.connections = []
+    ChatHandler.streamed = []
+    ChatHandler.reject_stream = False
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), ChatHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_complete_calls_reuse_one_keepalive_connection(server, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(llm_client, "GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_port}/")
+    client = LLMClient()
+
+    for _ in range(5):
+        assert client.complete("system", "user", api_key_override="key-a", provider_override="gemini") == "ok"
+    # A different key gets its own SDK client but the same shared connection pool.
+    assert client.complete("system", "user", api_key_override="key-b", provider_override="gemini") == "ok"
+
+    assert len(ChatHandler.connections) == 1
+    assert client.client_for("gemini", "key-a") is client.client_for("gemini", "key-a")
+    assert client.client_stats()["cached_clients"] == 2
+
+
+def test_cancellable_call_falls_back_when_streaming_is_rejected(server, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(llm_client, "GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_port}/")
+    ChatHandler.reject_stream = True
+    client = LLMClient()
+    deltas: list[str] = []
+
+    text = client.complete("system", "user", api_key_override="key-a", provider_override="gemini",
+                           on_delta=deltas.append, cancel=CancelToken())
+
+    assert text == "ok"
+    assert deltas == ["ok"]
+    assert ChatHandler.streamed == [True, False]